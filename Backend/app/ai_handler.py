@@ -1,44 +1,303 @@
 
-import google.generativeai as genai
+import hashlib
 import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
 import dotenv
 
+from app.core import tracing
 
 
-def generate(messages, prompt, schema=None, model_str="gemini-1.5-flash-002"):
-    role_map = {"user":"user", "assistant":"model", "system":"user"}
-    #genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-1.5-flash-002') #make it accept an arbitrary model after, with a model factory or something
+ROLE_MAP = {"user":"user", "assistant":"model", "system":"user"}
+DEFAULT_MODEL = "gemini-1.5-flash-002"
+
+# Model clients are reused across calls instead of being rebuilt per request.
+# Tests swap the factory for a local fake with set_model_factory.
+_model_factory = None
+_model_pool = {}
+_model_pool_lock = threading.Lock()
+
+
+def _genai():
+    # google.generativeai pulls in grpc and protobuf, which is a large share of
+    # worker boot time, so it is only imported once a model is actually used.
+    import google.generativeai as genai
+    return genai
+
+
+def set_model_factory(factory):
+    global _model_factory
+    with _model_pool_lock:
+        _model_factory = factory
+        _model_pool.clear()
+
+
+def get_model(model_str=DEFAULT_MODEL):
+    with _model_pool_lock:
+        model = _model_pool.get(model_str)
+        if model is None:
+            factory = _model_factory or _genai().GenerativeModel
+            model = factory(model_str)
+            _model_pool[model_str] = model
+        return model
+
+
+class ResponseCache:
+    """
+    Persistent cache of generated content, stored in a local SQLite file.
+
+    Entries older than `ttl` seconds are ignored and, once there are more than
+    `max_entries`, the least recently used ones are evicted. The file is only
+    opened on first use.
+    """
+
+    def __init__(self, path, ttl=7 * 24 * 3600, max_entries=5000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self):
+        # Called with self._lock held
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, content TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def make_key(model_str, prompt, schema, msgs):
+        history = [
+            {"role": m["role"], "parts": " ".join(m["parts"].split())}
+            for m in msgs
+        ]
+        raw = json.dumps(
+            {"model": model_str, "prompt": prompt.strip(), "schema": schema, "history": history},
+            sort_keys=True,
+        )
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT content, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key, content):
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, content, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(content), now, now),
+            )
+            conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+            conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        with self._lock:
+            self._connection().execute("DELETE FROM responses")
+
+
+# Outside the source tree by default; point AI_CACHE_PATH at a volume to keep it across deploys
+response_cache = ResponseCache(
+    os.getenv("AI_CACHE_PATH", os.path.join(tempfile.gettempdir(), "ai_response_cache.sqlite3")),
+    ttl=int(os.getenv("AI_CACHE_TTL_SECONDS", 7 * 24 * 3600)),
+    max_entries=int(os.getenv("AI_CACHE_MAX_ENTRIES", 5000)),
+)
+
+
+def _build_history(messages):
     msgs = []
     for m in messages:
         if any(f not in m for f in ["role", "content"]):
             raise ValueError(f"Invalid message format: {m}")
-        msgs.append({"role":role_map.get(m.get("role")), "parts":str(m.get("content"))}) #maybe format dict for llm usage instead of str()
+        msgs.append({"role":ROLE_MAP.get(m.get("role")), "parts":str(m.get("content"))}) #maybe format dict for llm usage instead of str()
+    return msgs
+
+
+def _span_attributes(model_str, schema, msgs):
+    return {
+        "gen_ai.system": "gemini",
+        "gen_ai.request.model": model_str,
+        "gen_ai.request.structured": schema is not None,
+        "gen_ai.request.history_length": len(msgs),
+    }
+
+
+def generate(messages, prompt, schema=None, model_str=DEFAULT_MODEL, use_cache=True):
+    msgs = _build_history(messages)
+
+    with tracing.span("gemini.generate", _span_attributes(model_str, schema, msgs)) as span:
+        key = ResponseCache.make_key(model_str, prompt, schema, msgs)
+        if use_cache:
+            cached = response_cache.get(key)
+            span.set_attribute("gen_ai.response.cached", cached is not None)
+            if cached is not None:
+                return {"response": None, "content": cached, "cached": True}
+
+        chat = get_model(model_str).start_chat(
+            history=msgs
+        )
+        if schema:
+          response = chat.send_message(
+              prompt,
+              generation_config=_genai().GenerationConfig(
+                  response_mime_type="application/json",
+                  response_schema = schema),
+
+          )
+
+          content = json.loads(response.candidates[0].content.parts[0].text)
+        else:
+            
+          response = chat.send_message(
+              prompt,
+          )
+
+          content = response.candidates[0].content.parts[0].text
 
-    model = genai.GenerativeModel(model_str)
-    chat = model.start_chat(
+    if use_cache:
+        response_cache.set(key, content)
+    
+    return {"response":response, "content":content, "cached": False}
+
+def generate_stream(messages, prompt, schema=None, model_str=DEFAULT_MODEL, use_cache=True):
+    """
+    Like generate, but yields the raw text as the model produces it.
+
+    The full text is cached once the stream ends, so a repeated request is
+    replayed from the cache as a single chunk.
+    """
+    msgs = _build_history(messages)
+
+    key = ResponseCache.make_key(model_str, prompt, schema, msgs)
+    if use_cache:
+        cached = response_cache.get(key)
+        if cached is not None:
+            yield json.dumps(cached) if schema else cached
+            return
+
+    chat = get_model(model_str).start_chat(
         history=msgs
     )
+    generation_config = None
     if schema:
-      response = chat.send_message(
-          prompt,
-          generation_config=genai.GenerationConfig(
-              response_mime_type="application/json",
-              response_schema = schema),
-
-      )
-
-      content = json.loads(response.candidates[0].content.parts[0].text)
-    else:
-        
-      response = chat.send_message(
-          prompt,
-      )
-
-      content = response.candidates[0].content.parts[0].text
-        
-    
-    return {"response":response, "content":content}
+        generation_config = _genai().GenerationConfig(
+            response_mime_type="application/json",
+            response_schema = schema)
+
+    # The span covers the whole stream; chunk count and time to first chunk
+    # show where a slow generation spends its time
+    span = tracing.start_span("gemini.generate_stream", _span_attributes(model_str, schema, msgs))
+    started = time.perf_counter()
+    parts = []
+    try:
+        for chunk in chat.send_message(prompt, generation_config=generation_config, stream=True):
+            text = chunk.text
+            if text:
+                if not parts:
+                    span.set_attribute("gen_ai.response.first_chunk_ms", (time.perf_counter() - started) * 1000)
+                parts.append(text)
+                yield text
+    except Exception as e:
+        tracing.record_exception(span, e)
+        raise
+    finally:
+        span.set_attribute("gen_ai.response.chunks", len(parts))
+        span.end()
+
+    if use_cache:
+        text = "".join(parts)
+        response_cache.set(key, json.loads(text) if schema else text)
+
+
+class JsonArrayStreamParser:
+    """
+    Incremental parser for a streamed top-level JSON array.
+
+    feed() takes the next piece of text and returns every array element that
+    became complete, so callers can use items before the array is closed.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._item_start = None
+
+    def feed(self, text):
+        items = []
+        self._buffer += text
+        while self._pos < len(self._buffer):
+            ch = self._buffer[self._pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._item_start is None:
+                    self._item_start = self._pos
+            elif ch in "[{":
+                self._depth += 1
+                if self._depth == 2 and self._item_start is None:
+                    self._item_start = self._pos
+            elif ch in "]}":
+                if self._depth == 1 and self._item_start is not None:
+                    items.append(self._take(self._pos))
+                self._depth -= 1
+                if self._depth == 1 and self._item_start is not None:
+                    items.append(self._take(self._pos + 1))
+            elif ch == "," and self._depth == 1:
+                if self._item_start is not None:
+                    items.append(self._take(self._pos))
+            elif self._depth == 1 and self._item_start is None and not ch.isspace():
+                self._item_start = self._pos
+            self._pos += 1
+
+        # Drop text that can no longer be part of an unfinished item
+        keep = self._item_start if self._item_start is not None else self._pos
+        self._buffer = self._buffer[keep:]
+        self._pos -= keep
+        if self._item_start is not None:
+            self._item_start = 0
+        return items
+
+    def _take(self, end):
+        raw = self._buffer[self._item_start:end]
+        self._item_start = None
+        return json.loads(raw)
+
 
 objective_question_schema = {
   "type": "array",
@@ -174,10 +433,7 @@ task_schema = {
     
     
 
-def generate_objective_questions(messages):
-  
-
-    prompt = """As a friendly project manager you will now generate a JSON list with different information to be filled in order to gather all the necessary information from the user to complete the project. You will create various questions to gather all the information from the user. 
+OBJECTIVE_QUESTIONS_PROMPT = """As a friendly project manager you will now generate a JSON list with different information to be filled in order to gather all the necessary information from the user to complete the project. You will create various questions to gather all the information from the user. 
 The user is just starting this project, so they might not have a lot of information about it. Do not ask for steps or tasks to complete the project, as those will be discussed later
 Ask for absolutely necessary information that could help create tasks to complete the project later. 
 Focus on asking about goals, impact, or any other motivation to complete the project. 
@@ -189,13 +445,15 @@ Each entry in the json will be a dictionary with the following keys:
         label: The label of the question to show the user
         description: A description of the question
     """
-    return generate(messages, prompt, schema = objective_question_schema )
 
 
+def generate_objective_questions(messages):
+    return generate(messages, OBJECTIVE_QUESTIONS_PROMPT, schema = objective_question_schema )
 
 
-def generate_tasks(messages):
-    prompt = """As a highly skilled project manager, your task is to generate a detailed JSON list of tasks required to complete the given project. Each task should be thoroughly described and include all necessary information as per the provided schema. Follow these guidelines:
+
+
+TASK_PROMPT = """As a highly skilled project manager, your task is to generate a detailed JSON list of tasks required to complete the given project. Each task should be thoroughly described and include all necessary information as per the provided schema. Follow these guidelines:
 
     1. Analyze the project requirements carefully before creating the task list.
     2. Break down the project into logical, manageable tasks.
@@ -213,4 +471,14 @@ def generate_tasks(messages):
 
     Generate a comprehensive task list that will serve as a solid foundation for project execution. Be specific and thorough in your task descriptions to minimize ambiguity and maximize efficiency in project implementation.
     """
-    return generate(messages, prompt, schema = task_schema ).get("content")
\ No newline at end of file
+
+
+def generate_tasks(messages):
+    return generate(messages, TASK_PROMPT, schema = task_schema ).get("content")
+
+
+def generate_tasks_stream(messages):
+    """Yield task dicts one by one as soon as each is complete in the model output."""
+    parser = JsonArrayStreamParser()
+    for chunk in generate_stream(messages, TASK_PROMPT, schema = task_schema):
+        yield from parser.feed(chunk)
@@ -0,0 +1,41 @@
+"""Payment webhook events
+
+Revision ID: 4c1f7a9e2b3d
+Revises: 0b72ad7011d1
+Create Date: 2026-10-19 09:12:40.118302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '4c1f7a9e2b3d'
+down_revision = '0b72ad7011d1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('paymentwebhookevent',
+    sa.Column('id', sa.Uuid(), nullable=False),
+    sa.Column('provider', sqlmodel.sql.sqltypes.AutoString(length=20), nullable=False),
+    sa.Column('transaction_id', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=False),
+    sa.Column('status', sqlmodel.sql.sqltypes.AutoString(length=20), nullable=False),
+    sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('received_at', sa.DateTime(), nullable=False),
+    sa.Column('processed_at', sa.DateTime(), nullable=True),
+    sa.Column('error', sqlmodel.sql.sqltypes.AutoString(length=1000), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('transaction_id', 'status')
+    )
+    op.create_index(op.f('ix_paymentwebhookevent_transaction_id'), 'paymentwebhookevent', ['transaction_id'], unique=False)
+    op.create_index(op.f('ix_paymentwebhookevent_processed_at'), 'paymentwebhookevent', ['processed_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_paymentwebhookevent_processed_at'), table_name='paymentwebhookevent')
+    op.drop_index(op.f('ix_paymentwebhookevent_transaction_id'), table_name='paymentwebhookevent')
+    op.drop_table('paymentwebhookevent')
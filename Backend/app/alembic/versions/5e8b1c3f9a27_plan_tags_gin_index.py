@@ -0,0 +1,42 @@
+"""Index plan tags with GIN
+
+Revision ID: 5e8b1c3f9a27
+Revises: 9d2e5b7c4a10
+Create Date: 2026-10-19 14:05:48.210395
+
+Changes the plan table from app.old_models, which this chain does not create
+(it builds the app.models schema). On a database without it, such as a
+fresh one, this revision does nothing.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '5e8b1c3f9a27'
+down_revision = '9d2e5b7c4a10'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    if not _has_table('plan'):
+        return
+    op.execute("UPDATE plan SET tags = '{}' WHERE tags IS NULL")
+    op.alter_column('plan', 'tags', nullable=False, server_default=sa.text("'{}'"))
+    with op.get_context().autocommit_block():
+        op.create_index('ix_plan_tags', 'plan', ['tags'], unique=False,
+                        postgresql_using='gin', postgresql_concurrently=True)
+
+
+def downgrade():
+    if not _has_table('plan'):
+        return
+    op.drop_index('ix_plan_tags', table_name='plan')
+    op.alter_column('plan', 'tags', nullable=True, server_default=None)
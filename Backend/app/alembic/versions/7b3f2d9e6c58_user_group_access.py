@@ -0,0 +1,117 @@
+"""Maintain user group access with triggers
+
+Revision ID: 7b3f2d9e6c58
+Revises: 5e8b1c3f9a27
+Create Date: 2026-10-19 15:22:10.948213
+
+Changes the client and clientgroupadminlink tables from app.old_models, which
+this chain does not create (it builds the app.models schema). On a database
+without them, such as a fresh one, this revision does nothing.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '7b3f2d9e6c58'
+down_revision = '5e8b1c3f9a27'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    if not (_has_table('client') and _has_table('clientgroupadminlink')):
+        return
+    op.create_table('usergroupaccess',
+    sa.Column('user_id', sa.Uuid(), nullable=False),
+    sa.Column('client_group_id', sa.Uuid(), nullable=False),
+    sa.Column('via', sqlmodel.sql.sqltypes.AutoString(length=20), nullable=False),
+    sa.ForeignKeyConstraint(['client_group_id'], ['clientgroup.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'client_group_id', 'via')
+    )
+    op.create_index(op.f('ix_usergroupaccess_client_group_id'), 'usergroupaccess', ['client_group_id'], unique=False)
+    # Used by the membership trigger to check whether any other client still links the pair
+    op.create_index('ix_client_user_id_group_id', 'client', ['user_id', 'group_id'], unique=False)
+
+    op.execute("""
+        CREATE FUNCTION refresh_member_access(p_user uuid, p_group uuid) RETURNS void AS $$
+        BEGIN
+            IF p_user IS NULL OR p_group IS NULL THEN
+                RETURN;
+            END IF;
+            IF EXISTS (SELECT 1 FROM client WHERE user_id = p_user AND group_id = p_group) THEN
+                INSERT INTO usergroupaccess (user_id, client_group_id, via)
+                VALUES (p_user, p_group, 'member') ON CONFLICT DO NOTHING;
+            ELSE
+                DELETE FROM usergroupaccess
+                WHERE user_id = p_user AND client_group_id = p_group AND via = 'member';
+            END IF;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE FUNCTION client_group_access_trigger() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                PERFORM refresh_member_access(OLD.user_id, OLD.group_id);
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                PERFORM refresh_member_access(NEW.user_id, NEW.group_id);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE TRIGGER client_group_access
+        AFTER INSERT OR DELETE OR UPDATE OF user_id, group_id ON client
+        FOR EACH ROW EXECUTE FUNCTION client_group_access_trigger();
+
+        CREATE FUNCTION admin_link_access_trigger() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                DELETE FROM usergroupaccess
+                WHERE user_id = OLD.admin_id AND client_group_id = OLD.client_group_id
+                  AND via = 'admin_link';
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO usergroupaccess (user_id, client_group_id, via)
+                VALUES (NEW.admin_id, NEW.client_group_id, 'admin_link') ON CONFLICT DO NOTHING;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE TRIGGER admin_link_access
+        AFTER INSERT OR DELETE OR UPDATE ON clientgroupadminlink
+        FOR EACH ROW EXECUTE FUNCTION admin_link_access_trigger();
+    """)
+
+    op.execute("""
+        INSERT INTO usergroupaccess (user_id, client_group_id, via)
+        SELECT DISTINCT user_id, group_id, 'member' FROM client
+        WHERE user_id IS NOT NULL AND group_id IS NOT NULL
+        UNION ALL
+        SELECT admin_id, client_group_id, 'admin_link' FROM clientgroupadminlink
+        ON CONFLICT DO NOTHING
+    """)
+
+
+def downgrade():
+    if not (_has_table('client') and _has_table('clientgroupadminlink')):
+        return
+    op.execute("""
+        DROP TRIGGER admin_link_access ON clientgroupadminlink;
+        DROP FUNCTION admin_link_access_trigger();
+        DROP TRIGGER client_group_access ON client;
+        DROP FUNCTION client_group_access_trigger();
+        DROP FUNCTION refresh_member_access(uuid, uuid);
+    """)
+    op.drop_index('ix_client_user_id_group_id', table_name='client')
+    op.drop_index(op.f('ix_usergroupaccess_client_group_id'), table_name='usergroupaccess')
+    op.drop_table('usergroupaccess')
@@ -0,0 +1,68 @@
+"""Store form data as JSONB
+
+Revision ID: 9d2e5b7c4a10
+Revises: 4c1f7a9e2b3d
+Create Date: 2026-10-19 11:40:02.531877
+
+Changes the form table from app.old_models, which this chain does not create
+(it builds the app.models schema). On a database without it, such as a
+fresh one, this revision does nothing.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '9d2e5b7c4a10'
+down_revision = '4c1f7a9e2b3d'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+
+def _has_table(name):
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def _copy_in_batches(sql):
+    # Each batch commits on its own so the table is never locked for the whole copy
+    connection = op.get_bind()
+    while True:
+        with op.get_context().autocommit_block():
+            result = connection.execute(sa.text(sql), {"batch_size": BATCH_SIZE})
+        if result.rowcount == 0:
+            break
+
+
+def upgrade():
+    if not _has_table('form'):
+        return
+    op.add_column('form', sa.Column('form_data_jsonb', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+    _copy_in_batches(
+        "UPDATE form SET form_data_jsonb = COALESCE(NULLIF(form_data, ''), '{}')::jsonb "
+        "WHERE id IN (SELECT id FROM form WHERE form_data_jsonb IS NULL LIMIT :batch_size)"
+    )
+    op.drop_column('form', 'form_data')
+    op.alter_column('form', 'form_data_jsonb', new_column_name='form_data', nullable=False,
+                    server_default=sa.text("'{}'::jsonb"))
+    with op.get_context().autocommit_block():
+        op.create_index('ix_form_form_data', 'form', ['form_data'], unique=False,
+                        postgresql_using='gin', postgresql_concurrently=True)
+
+
+def downgrade():
+    if not _has_table('form'):
+        return
+    op.drop_index('ix_form_form_data', table_name='form')
+    op.add_column('form', sa.Column('form_data_text', sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+    _copy_in_batches(
+        "UPDATE form SET form_data_text = form_data::text "
+        "WHERE id IN (SELECT id FROM form WHERE form_data_text IS NULL LIMIT :batch_size)"
+    )
+    op.drop_column('form', 'form_data')
+    op.alter_column('form', 'form_data_text', new_column_name='form_data', nullable=False,
+                    server_default="{}")
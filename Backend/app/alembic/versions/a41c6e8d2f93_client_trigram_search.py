@@ -0,0 +1,57 @@
+"""Trigram search over clients
+
+Revision ID: a41c6e8d2f93
+Revises: 7b3f2d9e6c58
+Create Date: 2026-10-19 16:48:37.104556
+
+Changes the client table from app.old_models, which this chain does not create
+(it builds the app.models schema). On a database without it, such as a
+fresh one, only the extensions and f_unaccent are created.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'a41c6e8d2f93'
+down_revision = '7b3f2d9e6c58'
+branch_labels = None
+depends_on = None
+
+SEARCH_TEXT = (
+    "f_unaccent(lower(coalesce(full_name, '') || ' ' || coalesce(email, '') || ' ' "
+    "|| coalesce(identification, '') || ' ' || coalesce(phone, '')))"
+)
+
+
+def _has_table(name):
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    # unaccent() is only STABLE (it depends on the search path), so generated
+    # columns and indexes need an IMMUTABLE wrapper pinned to the dictionary.
+    op.execute("""
+        CREATE FUNCTION f_unaccent(text) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+        AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+    """)
+    if not _has_table('client'):
+        return
+    # Adding a stored generated column rewrites the table once
+    op.add_column('client', sa.Column('search_text', sa.Text(), sa.Computed(SEARCH_TEXT, persisted=True)))
+    with op.get_context().autocommit_block():
+        op.create_index('ix_client_search_text', 'client', ['search_text'], unique=False,
+                        postgresql_using='gin', postgresql_ops={'search_text': 'gin_trgm_ops'},
+                        postgresql_concurrently=True)
+
+
+def downgrade():
+    if _has_table('client'):
+        op.drop_index('ix_client_search_text', table_name='client')
+        op.drop_column('client', 'search_text')
+    op.execute("DROP FUNCTION f_unaccent(text)")
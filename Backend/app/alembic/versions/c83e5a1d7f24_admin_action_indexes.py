@@ -0,0 +1,45 @@
+"""Time-range indexes on admin actions
+
+Revision ID: c83e5a1d7f24
+Revises: a41c6e8d2f93
+Create Date: 2026-10-19 18:05:12.530418
+
+Changes the adminaction table from app.old_models, which this chain does not create
+(it builds the app.models schema). On a database without it, such as a
+fresh one, this revision does nothing.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'c83e5a1d7f24'
+down_revision = 'a41c6e8d2f93'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    if not _has_table('adminaction'):
+        return
+    with op.get_context().autocommit_block():
+        op.create_index('ix_adminaction_timestamp_brin', 'adminaction', ['timestamp'], unique=False,
+                        postgresql_using='brin', postgresql_concurrently=True)
+        op.create_index('ix_adminaction_admin_id_timestamp', 'adminaction', ['admin_id', 'timestamp'],
+                        unique=False, postgresql_concurrently=True)
+        op.create_index('ix_adminaction_entity', 'adminaction', ['entity_type', 'entity_id'],
+                        unique=False, postgresql_concurrently=True)
+
+
+def downgrade():
+    if not _has_table('adminaction'):
+        return
+    op.drop_index('ix_adminaction_entity', table_name='adminaction')
+    op.drop_index('ix_adminaction_admin_id_timestamp', table_name='adminaction')
+    op.drop_index('ix_adminaction_timestamp_brin', table_name='adminaction')
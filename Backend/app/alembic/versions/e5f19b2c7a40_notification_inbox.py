@@ -0,0 +1,69 @@
+"""Notification inbox, read cursors and group targets
+
+Revision ID: e5f19b2c7a40
+Revises: c83e5a1d7f24
+Create Date: 2026-10-19 19:22:47.918305
+
+Changes the notification and client tables from app.old_models, which this
+chain does not create (it builds the app.models schema). On a database without
+them, such as a fresh one, this revision does nothing.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5f19b2c7a40'
+down_revision = 'c83e5a1d7f24'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade():
+    if not (_has_table('notification') and _has_table('client')):
+        return
+    op.add_column('notification', sa.Column('target_group_id', sa.Uuid(), nullable=True))
+    op.create_foreign_key(None, 'notification', 'clientgroup', ['target_group_id'], ['id'])
+    op.create_table('notificationinbox',
+    sa.Column('client_id', sa.Uuid(), nullable=False),
+    sa.Column('notification_id', sa.Uuid(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['client_id'], ['client.id'], ),
+    sa.ForeignKeyConstraint(['notification_id'], ['notification.id'], ),
+    sa.PrimaryKeyConstraint('client_id', 'notification_id')
+    )
+    op.create_index('ix_notificationinbox_client_id_created_at', 'notificationinbox',
+                    ['client_id', 'created_at'], unique=False)
+    op.create_table('notificationreadcursor',
+    sa.Column('client_id', sa.Uuid(), nullable=False),
+    sa.Column('read_until', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['client_id'], ['client.id'], ),
+    sa.PrimaryKeyConstraint('client_id')
+    )
+    # Existing targeted notifications move into the inbox
+    op.execute(
+        "INSERT INTO notificationinbox (client_id, notification_id, created_at) "
+        "SELECT target_client_id, id, created_at FROM notification "
+        "WHERE target_client_id IS NOT NULL AND NOT is_broadcast"
+    )
+    with op.get_context().autocommit_block():
+        op.create_index('ix_notification_broadcast_created_at', 'notification', ['created_at'],
+                        unique=False, postgresql_where=sa.text('is_broadcast'),
+                        postgresql_concurrently=True)
+
+
+def downgrade():
+    if not (_has_table('notification') and _has_table('client')):
+        return
+    op.drop_index('ix_notification_broadcast_created_at', table_name='notification')
+    op.drop_table('notificationreadcursor')
+    op.drop_index('ix_notificationinbox_client_id_created_at', table_name='notificationinbox')
+    op.drop_table('notificationinbox')
+    op.drop_constraint('notification_target_group_id_fkey', 'notification', type_='foreignkey')
+    op.drop_column('notification', 'target_group_id')
@@ -0,0 +1,28 @@
+"""Index webhook events by invoice
+
+Revision ID: f2a7c91d4e68
+Revises: e5f19b2c7a40
+Create Date: 2026-10-19 21:14:36.218904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a7c91d4e68'
+down_revision = 'e5f19b2c7a40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index('ix_paymentwebhookevent_invoice', 'paymentwebhookevent',
+                        [sa.text("(payload ->> 'x_id_invoice')")], unique=False,
+                        postgresql_concurrently=True)
+
+
+def downgrade():
+    op.drop_index('ix_paymentwebhookevent_invoice', table_name='paymentwebhookevent')
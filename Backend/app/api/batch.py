@@ -0,0 +1,260 @@
+import asyncio
+import json
+import logging
+import re
+from contextlib import AsyncExitStack
+from typing import Any, Dict, List, Sequence
+from urllib.parse import urlencode
+
+import anyio.from_thread
+from fastapi import BackgroundTasks, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+# Private FastAPI helpers, the same ones APIRoute uses to serve a request.
+# fastapi is pinned below 0.110 for them; test_batch checks their signatures.
+from fastapi.dependencies.utils import solve_dependencies
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute, run_endpoint_function, serialize_response
+from sqlmodel import Session
+from starlette.routing import BaseRoute, Match
+
+from app.api.deps import get_admin_user, get_current_user, get_db
+from app.core.config import settings
+from app.core.db import engine
+from app.old_models import BatchOperationResult, BatchRequest, BatchResponse, User
+from app.services import audit
+from app.services.plan_catalogue import catalogue
+
+logger = logging.getLogger(__name__)
+
+ADMIN_PREFIX = f"{settings.API_V1_STR}/admin"
+# "$0.id" or "$2.plan.id": a value from the body of an earlier operation
+_REFERENCE = re.compile(r"\$(\d+)((?:\.\w+)*)")
+
+
+class _Overrides:
+    """Stands in for the app as dependency_overrides_provider."""
+
+    def __init__(self, overrides: Dict[Any, Any]):
+        self.dependency_overrides = overrides
+
+
+def _lookup(results: List[BatchOperationResult], index: str, path: str) -> Any:
+    position = int(index)
+    if position >= len(results) or results[position].status >= 400:
+        raise ValueError(f"${index} does not refer to an earlier successful operation")
+    value = results[position].body
+    for key in filter(None, path.split(".")):
+        value = value[int(key)] if isinstance(value, list) else value[key]
+    return value
+
+
+def _resolve(value: Any, results: List[BatchOperationResult]) -> Any:
+    if isinstance(value, str):
+        match = _REFERENCE.fullmatch(value)
+        if match:
+            return _lookup(results, *match.groups())
+        return value
+    if isinstance(value, dict):
+        return {k: _resolve(v, results) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_resolve(v, results) for v in value]
+    return value
+
+
+def _resolve_path(path: str, results: List[BatchOperationResult]) -> str:
+    path = path.removeprefix(ADMIN_PREFIX)
+    return _REFERENCE.sub(lambda m: str(_lookup(results, *m.groups())), path)
+
+
+def _match(routes: Sequence[BaseRoute], scope: Dict[str, Any]) -> APIRoute:
+    partial = None
+    for route in routes:
+        if not isinstance(route, APIRoute) or route.path == "/batch":
+            continue
+        match, child_scope = route.matches(scope)
+        if match == Match.FULL:
+            scope.update(child_scope)
+            return route
+        if match == Match.PARTIAL and partial is None:
+            partial = route
+    if partial is not None:
+        raise HTTPException(status_code=405, detail="Method Not Allowed")
+    raise HTTPException(status_code=404, detail="Not Found")
+
+
+def _decode(response: Response) -> Any:
+    if not response.body:
+        return None
+    if response.media_type == "application/json":
+        return json.loads(response.body)
+    return response.body.decode(response.charset)
+
+
+async def _run(
+    request: Request,
+    routes: Sequence[BaseRoute],
+    index: int,
+    method: str,
+    path: str,
+    params: Dict[str, Any],
+    body: Any,
+    overrides: _Overrides,
+    background_tasks: BackgroundTasks,
+) -> BatchOperationResult:
+    scope = {
+        "type": "http",
+        "app": request.app,
+        "method": method,
+        "path": path,
+        "root_path": request.scope.get("root_path", ""),
+        "query_string": urlencode(params, doseq=True).encode(),
+        "headers": request.scope["headers"],
+    }
+    route = _match(routes, scope)
+    scope["route"] = route
+    sub_request = Request(scope)
+
+    async with AsyncExitStack() as stack:
+        values, errors, _, sub_response, _ = await solve_dependencies(
+            request=sub_request,
+            dependant=route.dependant,
+            body=body,
+            background_tasks=background_tasks,
+            dependency_overrides_provider=overrides,
+            async_exit_stack=stack,
+        )
+        if errors:
+            raise RequestValidationError(errors, body=body)
+        is_coroutine = asyncio.iscoroutinefunction(route.dependant.call)
+        raw = await run_endpoint_function(
+            dependant=route.dependant, values=values, is_coroutine=is_coroutine
+        )
+
+    if isinstance(raw, StreamingResponse):
+        # Its body is produced while sending, which a batch result can't hold
+        raise HTTPException(status_code=400, detail="Streaming responses can't be batched")
+    if isinstance(raw, Response):
+        return BatchOperationResult(index=index, status=raw.status_code, body=_decode(raw))
+    content = await serialize_response(
+        field=route.response_field,
+        response_content=raw,
+        include=route.response_model_include,
+        exclude=route.response_model_exclude,
+        by_alias=route.response_model_by_alias,
+        exclude_unset=route.response_model_exclude_unset,
+        exclude_defaults=route.response_model_exclude_defaults,
+        exclude_none=route.response_model_exclude_none,
+        is_coroutine=is_coroutine,
+    )
+    status = sub_response.status_code or route.status_code or 200
+    return BatchOperationResult(index=index, status=status, body=content)
+
+
+def run_batch(
+    request: Request,
+    routes: Sequence[BaseRoute],
+    batch: BatchRequest,
+    current_user: User,
+    background_tasks: BackgroundTasks,
+) -> BatchResponse:
+    """
+    Run `batch.operations` against the admin routes, in order, in one
+    database transaction.
+
+    Every operation gets the same session and the user resolved once for the
+    batch request, through dependency overrides, so the routes run unchanged.
+    The session joins the batch's connection with savepoints: a route's own
+    session.commit() only releases its savepoint, and each operation is
+    wrapped in one more savepoint so a failed operation is undone completely.
+    In atomic mode the first failure rolls back the whole batch and the
+    remaining operations are skipped (status 424); in best_effort mode the
+    batch commits whatever succeeded. Background tasks and audit events
+    from the routes are only released once the batch has committed.
+
+    This blocks on the database, so it must be called from a worker thread,
+    as FastAPI does for plain `def` endpoints. Each operation is still
+    resolved and run on the event loop, like a normal request.
+    """
+    results: List[BatchOperationResult] = []
+    deferred = BackgroundTasks()
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        with Session(bind=connection, join_transaction_mode="create_savepoint") as session:
+            # Route commits only release savepoints; audit events wait for the real commit
+            session.info[audit.HOLD_KEY] = True
+            user = session.get(User, current_user.id)
+            # Close the session's savepoint so each operation's opens inside its own
+            session.commit()
+            overrides = _Overrides({
+                **request.app.dependency_overrides,
+                get_db: lambda: session,
+                get_current_user: lambda: user,
+                get_admin_user: lambda: user,
+            })
+            failed = False
+            for operation in batch.operations:
+                if failed and batch.mode == "atomic":
+                    results.append(BatchOperationResult(
+                        index=len(results), status=424,
+                        body={"detail": "Skipped after an earlier operation failed"},
+                    ))
+                    continue
+                index = len(results)
+                try:
+                    path = _resolve_path(operation.path, results)
+                    params = _resolve(operation.params, results)
+                    body = _resolve(operation.body, results)
+                except (ValueError, KeyError, IndexError, TypeError) as e:
+                    failed = True
+                    results.append(BatchOperationResult(
+                        index=index, status=400, body={"detail": f"Bad reference: {e}"}
+                    ))
+                    continue
+
+                savepoint = connection.begin_nested()
+                queued = len(deferred.tasks)
+                audited = len(audit.pending(session))
+                try:
+                    result = anyio.from_thread.run(
+                        _run, request, routes, index, operation.method, path, params, body,
+                        overrides, deferred,
+                    )
+                except HTTPException as e:
+                    result = BatchOperationResult(
+                        index=index, status=e.status_code, body={"detail": e.detail}
+                    )
+                except RequestValidationError as e:
+                    result = BatchOperationResult(
+                        index=index, status=422, body={"detail": jsonable_encoder(e.errors())}
+                    )
+                except Exception:
+                    logger.exception("Batch operation %s %s failed", operation.method, operation.path)
+                    result = BatchOperationResult(
+                        index=index, status=500, body={"detail": "Internal Server Error"}
+                    )
+                if result.status >= 400:
+                    failed = True
+                    session.rollback()
+                    savepoint.rollback()
+                    del deferred.tasks[queued:]
+                    del audit.pending(session)[audited:]
+                else:
+                    session.commit()
+                    savepoint.commit()
+                results.append(result)
+
+            committed = not (failed and batch.mode == "atomic")
+            if committed:
+                transaction.commit()
+                background_tasks.tasks.extend(deferred.tasks)
+                audit.publish(session)
+            else:
+                transaction.rollback()
+                audit.discard(session)
+
+    if committed and any(op.method != "GET" for op in batch.operations):
+        # Route commits only released savepoints, so the plan catalogue was told
+        # about changes before they were visible to other sessions
+        catalogue.invalidate()
+    return BatchResponse(mode=batch.mode, committed=committed, results=results)
@@ -1,5 +1,5 @@
-from collections.abc import Generator
-from typing import Annotated, Optional
+from collections.abc import Callable, Generator
+from typing import Annotated, Optional, Type
 
 import uuid
 import jwt
@@ -7,16 +7,21 @@ from fastapi import Depends, HTTPException, status, Query, Body, Path
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
 from pydantic import ValidationError, BaseModel
-from sqlmodel import Session, select
+from sqlmodel import Session, SQLModel, select
 
 from app.core import security
 from app.core.config import settings
 from app.core.db import engine
-from app.old_models import TokenPayload, User, AdminUser, Client, ClientGroup, ClientGroupAdminLink
+from app.old_models import TokenPayload, User, AdminUser, Client, ClientGroup
+from app.services.group_access import accessible_group_ids, can_access_group
+from app.utils.serialization import Projection, parse_fields
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/login/access-token"
 )
+optional_oauth2 = OAuth2PasswordBearer(
+    tokenUrl=f"{settings.API_V1_STR}/login/access-token", auto_error=False
+)
 
 
 def get_db() -> Generator[Session, None, None]:
@@ -50,6 +55,22 @@ def get_current_user(session: SessionDep, token: TokenDep) -> User:
 CurrentUser = Annotated[User, Depends(get_current_user)]
 
 
+def get_stream_user(
+    session: SessionDep,
+    token: Annotated[Optional[str], Depends(optional_oauth2)],
+    access_token: Optional[str] = Query(None),
+) -> User:
+    # EventSource can't send headers, so streams also take the token as ?access_token=
+    if not (token or access_token):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated"
+        )
+    return get_current_user(session, token or access_token)
+
+
+StreamUser = Annotated[User, Depends(get_stream_user)]
+
+
 def get_current_active_superuser(current_user: CurrentUser) -> User:
     if not current_user.is_superuser:
         raise HTTPException(
@@ -78,7 +99,29 @@ async def get_admin_user(
     return current_user
 
 GetAdminUser = Annotated[User,Depends(get_admin_user)]
-async def get_client(
+
+def sparse_fields(
+    model: Type[SQLModel], schema: Type[SQLModel]
+) -> Callable[..., Optional[Projection]]:
+    """
+    Dependency for list routes that accept `fields=id,name` (comma-separated,
+    `relation.column` for nested many-to-one fields). Resolves to None when
+    the parameter is absent, so the route returns full rows.
+    """
+    def dependency(
+        fields: Optional[str] = Query(
+            None, description=f"Comma-separated {schema.__name__} fields to return"
+        )
+    ) -> Optional[Projection]:
+        if not fields:
+            return None
+        try:
+            return parse_fields(fields, model, schema)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return dependency
+
+def get_client(
     client_id: Optional[uuid.UUID] = None,
     session: SessionDep = Depends(),
     current_user: User = Depends(get_current_user),
@@ -105,15 +148,10 @@ async def get_client(
             return client
         
         # Check if user is admin of client's group
-        if client.group_id:
-            is_group_admin = session.exec(
-                select(ClientGroupAdminLink)
-                .where(ClientGroupAdminLink.client_group_id == client.group_id)
-                .where(ClientGroupAdminLink.admin_id == current_user.id)
-            ).first() is not None
-            
-            if is_group_admin:
-                return client
+        if client.group_id and can_access_group(
+            session, current_user.id, client.group_id, via="admin_link"
+        ):
+            return client
         
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -132,7 +170,7 @@ async def get_client(
             )
         return client
 
-async def get_client_group(
+def get_client_group(
     group_id: Optional[uuid.UUID] = None,
     session: SessionDep = Depends(),
     current_user: User = Depends(get_current_user),
@@ -141,6 +179,9 @@ async def get_client_group(
     Get a client group by ID or the user's default group.
     - If group_id is provided, check permissions and return that group
     - If no group_id is provided, find the user's only accessible group
+
+    Group admins (ClientGroupAdminLink) and clients in the group both have
+    access; both come from one lookup in UserGroupAccess.
     """
     if group_id:
         
@@ -155,23 +196,7 @@ async def get_client_group(
         if current_user.admin_user:
             return client_group
      
-        is_group_admin = session.exec(
-            select(ClientGroupAdminLink)
-            .where(ClientGroupAdminLink.client_group_id == group_id)
-            .where(ClientGroupAdminLink.admin_id == current_user.id)
-        ).first() is not None
-        
-        if is_group_admin:
-            return client_group
-        
-     
-        is_client_in_group = session.exec(
-            select(Client)
-            .where(Client.user_id == current_user.id)
-            .where(Client.group_id == group_id)
-        ).first() is not None
-        
-        if is_client_in_group:
+        if can_access_group(session, current_user.id, group_id):
             return client_group
         
         raise HTTPException(
@@ -186,24 +211,11 @@ async def get_client_group(
                 detail="Superusers must specify a group_id"
             )
         
-        
-        admin_groups_query = (
-            select(ClientGroup)
-            .join(ClientGroupAdminLink)
-            .where(ClientGroupAdminLink.admin_id == current_user.id)
-        )
-        
-       
-        client_groups_query = (
-            select(ClientGroup)
-            .join(Client)
-            .where(Client.user_id == current_user.id)
-            .where(Client.group_id == ClientGroup.id)
-        )
-        
-        # Combine both queries with UNION to get unique results
+        # Two rows are enough to tell "one group" from "several"
         accessible_groups = session.exec(
-            admin_groups_query.union(client_groups_query)
+            select(ClientGroup)
+            .where(ClientGroup.id.in_(accessible_group_ids(current_user.id)))
+            .limit(2)
         ).all()
         
         if not accessible_groups:
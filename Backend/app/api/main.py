@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api.routes import forms, items, login, users, utils, admin, clients
+from app.api.routes import forms, items, login, users, utils, admin, clients, payments, ai
 
 api_router = APIRouter()
 api_router.include_router(login.router, tags=["login"])
@@ -9,4 +9,6 @@ api_router.include_router(utils.router, prefix="/utils", tags=["utils"])
 api_router.include_router(items.router, prefix="/items", tags=["items"])
 api_router.include_router(clients.router, prefix="/clients", tags=["clients"])
 api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
-api_router.include_router(forms.router, prefix="/forms", tags=["forms"])
\ No newline at end of file
+api_router.include_router(forms.router, prefix="/forms", tags=["forms"])
+api_router.include_router(payments.router, prefix="/payments", tags=["payments"])
+api_router.include_router(ai.router, prefix="/ai", tags=["ai"])
\ No newline at end of file
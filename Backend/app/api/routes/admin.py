@@ -1,4 +1,5 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Query, Request
+from sqlalchemy.orm import selectinload
 from sqlmodel import select, func, SQLModel, desc
 from typing import Any
 from datetime import timedelta
@@ -6,30 +7,49 @@ from datetime import datetime
 import random
 import string
 
-from app.api.deps import CurrentUser, SessionDep, GetAdminUser
+from app.api.batch import run_batch
+from app.api.deps import CurrentUser, SessionDep, GetAdminUser, sparse_fields
 from app.old_models import (
     Client,  Visit, Notification, NotificationCreate,
-    Plan, Subscription, Payment, ClientPublic, PlanCreate, VisitPublic, QRCode, 
+    Plan, Subscription, Payment, ClientPublic, PlanCreate, PlanUpdate, VisitPublic, QRCode, 
     SubscriptionCreate, ClientGroup, Reservation, ReservationPublic, ClientGroupPublic,
     SubscriptionPublic, PlanToken, PlanTokenCreate, PlanTokenUse, PlanTokenUseCreate,
-    PlanInstance, PlanInstanceCreate, PlanInstancePublic, PlanTokenPublic
+    PlanInstance, PlanInstanceCreate, PlanInstancePublic, PlanTokenPublic, ClientSearchResult,
+    BatchRequest, BatchResponse, AdminActionPublic
 )
+from app.services import audit, credits, notifications
+from app.services.client_search import DEFAULT_LIMIT, MAX_LIMIT, MIN_QUERY_LENGTH, search_clients
+from app.services.plan_catalogue import TagMatch, tag_filter
+from app.utils.serialization import ORJSONResponse, Projection, projection_response, rows_response
 import uuid
 from typing import Optional, List, Dict, Any
 
 router = APIRouter()
 # Client Management Routes
-@router.get("/clients", response_model=list[ClientPublic])
+@router.get("/clients", response_model=list[ClientPublic], response_class=ORJSONResponse)
 def get_all_clients(
     session: SessionDep,
     current_user: GetAdminUser,
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    projection: Optional[Projection] = Depends(sparse_fields(Client, ClientPublic))
 ) -> Any:
     """Get all clients with filtering options"""
     statement = select(Client).offset(skip).limit(limit)
+    if projection:
+        return projection_response(session, statement, projection)
     clients = session.exec(statement).all()
-    return clients
+    return rows_response(clients, ClientPublic)
+
+@router.get("/clients/search", response_model=list[ClientSearchResult])
+def search_all_clients(
+    session: SessionDep,
+    current_user: GetAdminUser,
+    q: str = Query(..., min_length=MIN_QUERY_LENGTH, max_length=255),
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT)
+) -> Any:
+    """Front-desk lookup by name, email, identification or phone, best matches first"""
+    return search_clients(session, q, limit)
 
 # Client Management Routes
 @router.get("/client-groups", response_model=list[ClientGroupPublic])
@@ -44,17 +64,24 @@ def get_all_clients(
     clients = session.exec(statement).all()
     return clients
 
+@router.get("/client-groups/{group_id}/time-balance", response_model=dict)
+def get_group_time_balance(
+    session: SessionDep,
+    current_user: GetAdminUser,
+    group_id: uuid.UUID
+) -> Any:
+    """Subscription seconds the group can still use (cached for up to a minute)"""
+    return credits.get_balance(session, group_id)._asdict()
+
 @router.post("/notifications", response_model=Notification)
 def create_notification(
     *, session: SessionDep, current_user: GetAdminUser, notification_in: NotificationCreate
 ) -> Any:
-    """Create a new notification"""
-    notification = Notification.model_validate(notification_in)
-    notification.created_by = current_user.id
-    session.add(notification)
-    session.commit()
-    session.refresh(notification)
-    return notification
+    """Create a notification for one client, a client group or everyone"""
+    try:
+        return notifications.create_notification(session, notification_in, current_user.id)
+    except notifications.InvalidNotification as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 # Visit Management Routes
 @router.post("/visits/check-in", response_model=Visit)
@@ -100,6 +127,7 @@ def check_in_client(
     )
     
     session.add(visit)
+    audit.record(session, current_user.id, "check_in", "visit", visit.id, f"Client {client_id} checked in")
     session.commit()
     session.refresh(visit)
     return visit
@@ -109,8 +137,9 @@ def check_in_client(
 def check_out_client(
     *, session: SessionDep, current_user: GetAdminUser, visit_id: uuid.UUID
 ) -> Any:
-    """Check out a client and update the group subscription accordingly"""
-    visit = session.get(Visit, visit_id)
+    """Check out a client and charge the visit to the group's subscription time"""
+    # Locked so two check-outs of the same visit cannot both charge it
+    visit = session.exec(select(Visit).where(Visit.id == visit_id).with_for_update()).first()
     if not visit:
         raise HTTPException(status_code=404, detail="Visit not found")
     if visit.check_out:
@@ -122,31 +151,15 @@ def check_out_client(
     duration = (check_out - visit.check_in).total_seconds()
     visit.duration = max(duration, 3600)  # Enforcing a minimum duration if required
     
-    session.add(visit)
-    session.commit()
-    session.refresh(visit)
-    
-    # Retrieve the client to access the associated group subscription
     client = session.get(Client, visit.client_id)
     if not client or not client.group_id:
-        raise HTTPException(status_code=400, detail="Client is not assigned to a group with a subscription")
-    
-    subscription = session.exec(
-        select(Subscription)
-        .where(Subscription.client_group_id == client.group_id)
-        .where(Subscription.is_active == True)
-    ).first()
-    
-    if subscription:
-        if subscription.remaining_time is not None and subscription.remaining_time >= duration:
-            subscription.remaining_time -= duration
-        else:
-            subscription.remaining_time = 0
-        if subscription.remaining_time is not None and subscription.remaining_time <= 0:
-            subscription.is_active = False
-        session.add(subscription)
+        session.add(visit)
         session.commit()
+        raise HTTPException(status_code=400, detail="Client is not assigned to a group with a subscription")
     
+    audit.record(session, current_user.id, "check_out", "visit", visit_id, "Visit checked out")
+    credits.charge_visit(session, visit, client.group_id)
+    session.refresh(visit)
     return visit
 
 
@@ -179,6 +192,7 @@ def check_qr_code(
         select(Visit)
         .where(Visit.client_id == client_id)
         .where(Visit.check_out == None)
+        .with_for_update()
     ).first()
     
     if active_visit:
@@ -189,31 +203,14 @@ def check_qr_code(
         duration = (check_out_time - active_visit.check_in).total_seconds()
         active_visit.duration = duration
 
-        session.add(active_visit)
-        session.commit()
-        session.refresh(active_visit)
-        
         if not client.group_id:
-            raise HTTPException(status_code=400, detail="Client is not assigned to a group with a subscription")
-        
-        subscription = session.exec(
-            select(Subscription)
-            .where(Subscription.client_group_id == client.group_id)
-            .where(Subscription.is_active == True)
-        ).first()
-        
-        if subscription:
-            if subscription.remaining_time is not None:
-                if subscription.remaining_time >= duration:
-                    subscription.remaining_time -= duration
-                else:
-                    subscription.remaining_time = 0
-            # If remaining_time is now 0 or less, deactivate the subscription
-            if subscription.remaining_time is not None and subscription.remaining_time <= 0:
-                subscription.is_active = False
-            session.add(subscription)
+            session.add(active_visit)
             session.commit()
+            raise HTTPException(status_code=400, detail="Client is not assigned to a group with a subscription")
         
+        audit.record(session, current_user.id, "check_out", "visit", active_visit.id, f"Client {client_id} checked out by QR code")
+        credits.charge_visit(session, active_visit, client.group_id)
+        session.refresh(active_visit)
         return active_visit
 
     else:
@@ -235,22 +232,26 @@ def check_qr_code(
             subscription_id=subscription.id
         )
         session.add(new_visit)
+        audit.record(session, current_user.id, "check_in", "visit", new_visit.id, f"Client {client_id} checked in by QR code")
         session.commit()
         session.refresh(new_visit)
         return new_visit
     
 
 
-@router.get("/all-visits", response_model=list[VisitPublic])
+@router.get("/all-visits", response_model=list[VisitPublic], response_class=ORJSONResponse)
 def get_all_visits(
     session: SessionDep,
     current_user: GetAdminUser,
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    projection: Optional[Projection] = Depends(sparse_fields(Visit, VisitPublic))
 ) -> Any:
     statement = select(Visit).offset(skip).limit(limit)
+    if projection:
+        return projection_response(session, statement, projection)
     visits = session.exec(statement).all()
-    return visits
+    return rows_response(visits, VisitPublic)
 
 
 @router.get("/all-payments", response_model=list[VisitPublic])
@@ -294,7 +295,8 @@ def create_plan(
     *, session: SessionDep, current_user: GetAdminUser, plan_in: PlanCreate
 ) -> Any:
     """Create a new service plan"""
-    plan = Plan.model_validate(plan_in)
+    # addons, limits and tags left out keep the table's empty defaults
+    plan = Plan.model_validate(plan_in.model_dump(exclude_none=True))
 
     session.add(plan)
     session.commit()
@@ -500,12 +502,17 @@ def get_all_plans(
     current_user: GetAdminUser,
     skip: int = 0,
     limit: int = 100,
-    active_only: bool = False
+    active_only: bool = False,
+    tags: List[str] = Query(default=[]),
+    match: TagMatch = "all"
 ) -> Any:
     query = select(Plan)
     
     if active_only:
         query = query.where(Plan.is_active == True)
+
+    if tags:
+        query = query.where(tag_filter(tags, match))
     
     query = query.offset(skip).limit(limit)
     plans = session.exec(query).all()
@@ -523,6 +530,22 @@ def get_plan_by_id(
         raise HTTPException(status_code=404, detail="Plan not found")
     return plan
 
+@router.put("/plans/{plan_id}", response_model=Plan)
+def update_plan(
+    *, session: SessionDep, current_user: GetAdminUser, plan_id: uuid.UUID, plan_in: PlanUpdate
+) -> Any:
+    """
+    Update a plan. The client plan catalogue is refreshed on commit.
+    """
+    plan = session.get(Plan, plan_id)
+    if not plan:
+        raise HTTPException(status_code=404, detail="Plan not found")
+    plan.sqlmodel_update(plan_in.model_dump(exclude_unset=True))
+    session.add(plan)
+    session.commit()
+    session.refresh(plan)
+    return plan
+
 @router.post("/plans/{plan_id}/tokens", response_model=PlanTokenPublic)
 def create_plan_token(
     *, session: SessionDep, current_user: GetAdminUser, plan_id: uuid.UUID, token_in: PlanTokenCreate
@@ -659,9 +682,9 @@ def use_token(
         if "time" in plan.limits:
             plan.limits["time"] = max(0, plan.limits.get("time", 0) - 1)
     
+    audit.record(session, current_user.id, "redeem", "plan_token", token_use.token_id, f"Client {token_use.client_id} used the token")
     session.commit()
     session.refresh(token_use_db)
-    
     return token_use_db
 
 # Get all reservations endpoint
@@ -738,7 +761,7 @@ def create_plan_instance(
     
     return plan_instance
 
-@router.get("/plan-instances", response_model=list[PlanInstancePublic])
+@router.get("/plan-instances", response_model=list[PlanInstancePublic], response_class=ORJSONResponse)
 def get_all_plan_instances(
     session: SessionDep,
     current_user: GetAdminUser,
@@ -746,7 +769,8 @@ def get_all_plan_instances(
     limit: int = 100,
     active_only: bool = False,
     client_group_id: Optional[uuid.UUID] = None,
-    plan_id: Optional[uuid.UUID] = None
+    plan_id: Optional[uuid.UUID] = None,
+    projection: Optional[Projection] = Depends(sparse_fields(PlanInstance, PlanInstancePublic))
 ) -> Any:
     """
     Get all plan instances with optional filtering
@@ -763,9 +787,20 @@ def get_all_plan_instances(
         query = query.where(PlanInstance.plan_id == plan_id)
     
     query = query.offset(skip).limit(limit).order_by(desc(PlanInstance.created_at))
+    if projection:
+        return projection_response(session, query, projection)
+    # Load what PlanInstancePublic nests in a few queries instead of per row
+    group = selectinload(PlanInstance.client_group)
+    query = query.options(
+        selectinload(PlanInstance.plan),
+        group.selectinload(ClientGroup.clients),
+        group.selectinload(ClientGroup.subscriptions),
+        group.selectinload(ClientGroup.reservations),
+        group.selectinload(ClientGroup.admins),
+    )
     
     plan_instances = session.exec(query).all()
-    return plan_instances
+    return rows_response(plan_instances, PlanInstancePublic)
 
 @router.get("/plan-instances/{instance_id}", response_model=PlanInstancePublic)
 def get_plan_instance(
@@ -809,9 +844,9 @@ def add_payment_to_plan_instance(
     if payment.status == "completed":
         plan_instance.paid_amount += payment.amount
     
+    audit.record(session, current_user.id, "create", "payment", payment.id, f"{payment.status} payment of {payment.amount} for plan instance {instance_id}")
     session.commit()
     session.refresh(payment)
-    
     return payment
 
 @router.post("/plan-instances/{instance_id}/tokens", response_model=PlanTokenPublic)
@@ -978,9 +1013,9 @@ def use_token(
         if "time" in plan_instance.remaining_limits:
             plan_instance.remaining_limits["time"] = max(0, plan_instance.remaining_limits.get("time", 0) - 1)
     
+    audit.record(session, current_user.id, "redeem", "plan_token", token_use.token_id, f"Client {token_use.client_id} used the token")
     session.commit()
     session.refresh(token_use_db)
-    
     return token_use_db
 
 # Get all reservations endpoint
@@ -1002,4 +1037,40 @@ def get_all_reservations(
     statement = statement.offset(skip).limit(limit).order_by(Reservation.date)
     reservations = session.exec(statement).all()
     return reservations
+
+@router.get("/audit-log", response_model=list[AdminActionPublic])
+def get_audit_log(
+    session: SessionDep,
+    current_user: GetAdminUser,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    admin_id: Optional[uuid.UUID] = None,
+    action_type: Optional[str] = None,
+    entity_type: Optional[str] = None,
+    entity_id: Optional[uuid.UUID] = None,
+    limit: int = Query(100, ge=1, le=1000)
+) -> Any:
+    """
+    Admin actions in a time range, newest first (last 24 hours by default).
+    Actions reach this list within a few seconds, once the audit buffer is flushed.
+    """
+    return audit.query_actions(
+        session, start=start, end=end, admin_id=admin_id, action_type=action_type,
+        entity_type=entity_type, entity_id=entity_id, limit=limit,
+    )
+
+@router.post("/batch", response_model=BatchResponse)
+def run_admin_batch(
+    request: Request,
+    batch: BatchRequest,
+    current_user: GetAdminUser,
+    background_tasks: BackgroundTasks
+) -> Any:
+    """
+    Run several admin operations in one request and one transaction.
+
+    Operations run in order; a string like "$0.id" in a later operation's
+    path, params or body is replaced with that field of an earlier result.
+    """
+    return run_batch(request, router.routes, batch, current_user, background_tasks)
 # Get client_groups
\ No newline at end of file
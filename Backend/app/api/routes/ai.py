@@ -0,0 +1,75 @@
+import json
+import logging
+from typing import Any, Dict, List
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlmodel import SQLModel
+
+from app import ai_handler
+from app.api.deps import CurrentUser
+from app.services.llm_dispatcher import DispatcherFull, DispatcherTimeout, dispatcher
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+class ConversationIn(SQLModel):
+    messages: List[Dict[str, Any]]
+
+
+async def _dispatch(messages, prompt, schema):
+    try:
+        result = await dispatcher.generate(messages, prompt, schema)
+    except DispatcherFull:
+        raise HTTPException(status_code=503, detail="Too many generation requests, try again shortly")
+    except DispatcherTimeout:
+        raise HTTPException(status_code=504, detail="Generation timed out")
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return result["content"]
+
+
+@router.post("/objective-questions", response_model=List[Dict[str, Any]])
+async def objective_questions(current_user: CurrentUser, conversation: ConversationIn) -> Any:
+    """Generate the intake questions for a project conversation."""
+    return await _dispatch(
+        conversation.messages, ai_handler.OBJECTIVE_QUESTIONS_PROMPT, ai_handler.objective_question_schema
+    )
+
+
+@router.post("/tasks", response_model=List[Dict[str, Any]])
+async def tasks(current_user: CurrentUser, conversation: ConversationIn) -> Any:
+    """Generate the full project task list in one response."""
+    return await _dispatch(conversation.messages, ai_handler.TASK_PROMPT, ai_handler.task_schema)
+
+
+async def _task_events(messages):
+    try:
+        async for task in dispatcher.stream(ai_handler.generate_tasks_stream, messages):
+            yield f"event: task\ndata: {json.dumps(task)}\n\n"
+    except (DispatcherFull, DispatcherTimeout, ValueError) as e:
+        yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+        return
+    except Exception:
+        # The 200 and headers are already sent, so the client can only learn
+        # about the failure from an event
+        logger.exception("Task stream failed")
+        yield f"event: error\ndata: {json.dumps({'detail': 'Generation failed'})}\n\n"
+        return
+    yield "event: done\ndata: {}\n\n"
+
+
+@router.post("/tasks/stream")
+async def stream_tasks(current_user: CurrentUser, conversation: ConversationIn) -> Any:
+    """
+    Generate the project task list as Server-Sent Events.
+
+    Each task is sent as a `task` event as soon as the model has finished
+    writing it; a final `done` event closes the stream.
+    """
+    return StreamingResponse(
+        _task_events(conversation.messages),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
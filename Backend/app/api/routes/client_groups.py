@@ -1,13 +1,16 @@
 from fastapi import APIRouter, HTTPException, Depends, status
-from sqlmodel import select, Session
+from sqlmodel import select, update, Session
 from typing import Any, List, Optional
 from datetime import datetime
 from app.api.deps import (CurrentUser, SessionDep, GetAdminUser, GetClientGroupFromPath, 
                           GetClientFromPath, GetClientGroupFromQuery)
 from app.old_models import (
     Client, ClientPublic, ClientCreate, ClientUpdate,
-    ClientGroup, Subscription, SubscriptionPublic, User, ClientGroupPublic, QRCode
+    ClientGroup, Subscription, SubscriptionPublic, User, ClientGroupPublic, QRCode,
+    GroupClientIds, GroupClientMove, GroupAdminIds, BulkMembershipResult
 )
+from app.services.group_access import accessible_group_ids
+from app.services.group_membership import add_group_admins, remove_group_admins, set_clients_group
 import uuid
 
 router = APIRouter()
@@ -22,20 +25,9 @@ async def get_my_client_groups(
     skip: int = 0,
     limit: int = 100
 ) -> Any:
-    """Get all client groups where the current user is an admin"""
-    # Get the client associated with the current user
-    client = session.exec(
-        select(Client).where(Client.user_id == current_user.id)
-    ).first()
-    
-    if not client:
-        raise HTTPException(status_code=404, detail="Client not found for current user")
-    
-    # Get groups where this client is an admin
+    """Get all client groups the current user belongs to or administers"""
     statement = select(ClientGroup).where(
-        ClientGroup.id.in_(
-            select(ClientGroup.id).join(Client, ClientGroup.admins).where(Client.id == client.id)
-        )
+        ClientGroup.id.in_(accessible_group_ids(current_user.id))
     ).offset(skip).limit(limit)
     
     groups = session.exec(statement).all()
@@ -116,14 +108,11 @@ def delete_client_group(
             detail="Cannot delete group with active subscriptions"
         )
     
-    # If no active subscriptions, set all clients' group_id to None
-    clients = session.exec(
-        select(Client).where(Client.group_id == group_id)
-    ).all()
-    
-    for client in clients:
-        client.group_id = None
-        session.add(client)
+    # If no active subscriptions, detach all clients in one UPDATE
+    session.exec(
+        update(Client).where(Client.group_id == group_id).values(group_id=None),
+        execution_options={"synchronize_session": False},
+    )
     
     session.delete(client_group)
     session.commit()
@@ -331,4 +320,64 @@ def remove_client_admin_from_group(
         raise HTTPException(
             status_code=400,
             detail="Client is not an admin of this group"
-        )
\ No newline at end of file
+        )
+
+
+# Bulk membership routes: one statement per request, whatever the number of ids
+def _require_group(session: Session, group_id: uuid.UUID) -> None:
+    if not session.get(ClientGroup, group_id):
+        raise HTTPException(status_code=404, detail="Client group not found")
+
+@router.post("/{group_id}/bulk/clients/add", response_model=BulkMembershipResult)
+def bulk_add_clients_to_group(
+    *, session: SessionDep, current_user: GetAdminUser,
+    group_id: uuid.UUID, body: GroupClientIds
+) -> Any:
+    """Move clients into a group, from whatever group they were in (admin only)"""
+    _require_group(session, group_id)
+    return set_clients_group(session, body.client_ids, group_id)
+
+@router.post("/{group_id}/bulk/clients/remove", response_model=BulkMembershipResult)
+def bulk_remove_clients_from_group(
+    *, session: SessionDep, current_user: GetAdminUser,
+    group_id: uuid.UUID, body: GroupClientIds
+) -> Any:
+    """Remove clients from a group; clients in other groups are left alone (admin only)"""
+    _require_group(session, group_id)
+    return set_clients_group(session, body.client_ids, None, from_group_id=group_id)
+
+@router.post("/{group_id}/bulk/clients/move", response_model=BulkMembershipResult)
+def bulk_move_clients(
+    *, session: SessionDep, current_user: GetAdminUser,
+    group_id: uuid.UUID, body: GroupClientMove
+) -> Any:
+    """Move clients of this group into another group (admin only)"""
+    _require_group(session, group_id)
+    _require_group(session, body.target_group_id)
+    return set_clients_group(
+        session, body.client_ids, body.target_group_id, from_group_id=group_id
+    )
+
+@router.post("/{group_id}/bulk/admins/add", response_model=BulkMembershipResult)
+def bulk_add_admins_to_group(
+    *, session: SessionDep, current_user: GetAdminUser,
+    group_id: uuid.UUID, body: GroupAdminIds
+) -> Any:
+    """Link users as admins of a group; unknown users are skipped (admin only)"""
+    _require_group(session, group_id)
+    return add_group_admins(session, group_id, body.admin_ids)
+
+@router.post("/{group_id}/bulk/admins/remove", response_model=BulkMembershipResult)
+def bulk_remove_admins_from_group(
+    *, session: SessionDep, current_user: GetAdminUser,
+    group_id: uuid.UUID, body: GroupAdminIds
+) -> Any:
+    """Unlink admins from a group (admin only)"""
+    _require_group(session, group_id)
+    result = remove_group_admins(session, group_id, body.admin_ids)
+    if result is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Cannot remove the last admin from a group"
+        )
+    return result
@@ -1,60 +1,86 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Response, status
+from sqlalchemy.orm import selectinload
 from sqlmodel import select, func
 from typing import Any, Optional, List
 from datetime import datetime
 import uuid
 import os
 from app.api.deps import (CurrentUser, SessionDep, GetAdminUser, GetClientGroupFromPath, 
-                          GetClientFromPath, GetClientGroupFromQuery)
+                          GetClientFromPath, GetClientGroupFromQuery, sparse_fields)
 from app.old_models import (
     Client, Plan, PlanInstance, PlanInstanceCreate, PlanInstancePublic,
-    Payment, Visit, ClientGroup, QRCode
+    Payment, Visit, ClientGroup, QRCode, PlanTagCount
 )
+from app.core.profiler import query_budget
 from app.services.epayco import generate_payment_url
+from app.services.group_access import accessible_group_ids, can_access_group
+from app.services.plan_catalogue import (
+    CACHE_CONTROL, Rendered, TagMatch, catalogue, etag_matches, tag_counts
+)
+from app.utils.serialization import ORJSONResponse, Projection, projection_response
 
 router = APIRouter()
 
 # Plan-related Routes
-@router.get("/available-plans", response_model=List[Plan])
+def _catalogue_response(rendered: Rendered, if_none_match: Optional[str]) -> Response:
+    headers = {"ETag": rendered.etag, "Cache-Control": CACHE_CONTROL}
+    if etag_matches(if_none_match, rendered.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return ORJSONResponse(rendered.body, headers=headers)
+
+
+@router.get("/available-plans", response_model=List[Plan], response_class=ORJSONResponse)
 def get_available_plans(
     session: SessionDep,
-    current_user: Optional[CurrentUser] = None,
     skip: int = 0,
     limit: int = 100,
     active_only: bool = True,
-    tag: Optional[str] = None
+    tag: Optional[str] = None,
+    tags: List[str] = Query(default=[]),
+    match: TagMatch = "all",
+    if_none_match: Optional[str] = Header(default=None),
 ) -> Any:
     """
     Get all available plans for clients with optional filtering by tag
-    
+
+    Served from the in-process plan catalogue; send the ETag back in
+    If-None-Match to get a 304 when nothing changed.
+
     Query parameters:
     - skip: number of plans to skip (for pagination)
     - limit: maximum number of plans to return
     - active_only: if true, only return active plans
     - tag: filter plans by specific tag category (e.g., 'party', 'class')
+    - tags: repeat to filter by several tags (?tags=party&tags=kids)
+    - match: "all" for plans with every tag, "any" for plans with at least one
     """
-    from sqlalchemy import any_
-    
-    statement = select(Plan)
-    
-    # Filter active plans
-    if active_only:
-        statement = statement.where(Plan.is_active == True)
-    
-    # Filter by tag if provided and not "all"
-    if tag and tag.lower() != "all":
-        statement = statement.where(tag == any_(Plan.tags))
-    
-    statement = statement.offset(skip).limit(limit)
-    plans = session.exec(statement).all()
-    return plans
+    rendered = catalogue.list_plans(
+        session, tags=[tag, *tags] if tag else tags, match=match,
+        active_only=active_only, skip=skip, limit=limit,
+    )
+    return _catalogue_response(rendered, if_none_match)
+
+@router.get("/plan-tags", response_model=List[PlanTagCount])
+def get_plan_tag_counts(
+    session: SessionDep,
+    tags: List[str] = Query(default=[]),
+    match: TagMatch = "all",
+    active_only: bool = True,
+) -> Any:
+    """
+    Number of plans per tag, e.g. for "party (4), class (12)" filters.
+
+    With `tags`, counts only plans matching them (see `match`), so the
+    numbers reflect what narrowing the current selection would return.
+    """
+    return tag_counts(session, tags=tags, match=match, active_only=active_only)
 
-@router.get("/available-plans/{plan_id}", response_model=Plan)
+@router.get("/available-plans/{plan_id}", response_model=Plan, response_class=ORJSONResponse)
 def get_available_plan_by_id(
     session: SessionDep,
     plan_id: uuid.UUID,
-    current_user: Optional[CurrentUser] = None,
-    active_only: bool = True
+    active_only: bool = True,
+    if_none_match: Optional[str] = Header(default=None),
 ) -> Any:
     """
     Get a specific plan by ID for clients
@@ -62,16 +88,11 @@ def get_available_plan_by_id(
     Query parameters:
     - active_only: if true, only return the plan if it's active
     """
-    statement = select(Plan).where(Plan.id == plan_id)
-    
-    if active_only:
-        statement = statement.where(Plan.is_active == True)
-    
-    plan = session.exec(statement).first()
-    if not plan:
+    rendered = catalogue.get_plan(session, plan_id, active_only=active_only)
+    if not rendered:
         raise HTTPException(status_code=404, detail="Plan not found")
     
-    return plan
+    return _catalogue_response(rendered, if_none_match)
 
 # Plan Instances Routes
 @router.post("/plan-instances", response_model=PlanInstancePublic)
@@ -90,16 +111,8 @@ async def create_plan_instance(
     if not client:
         raise HTTPException(status_code=404, detail="Client not found for current user")
     
-    # Check if client is admin of the group
-    client_group = session.exec(
-        select(ClientGroup)
-        .where(ClientGroup.id == instance_in.client_group_id)
-        .where(ClientGroup.id.in_(
-            select(ClientGroup.id).join(Client, ClientGroup.admins).where(Client.id == client.id)
-        ))
-    ).first()
-    
-    if not client_group:
+    # Check if the user has access to the group
+    if not can_access_group(session, current_user.id, instance_in.client_group_id):
         raise HTTPException(
             status_code=403, 
             detail="You don't have permission to create plan instances for this group"
@@ -229,27 +242,22 @@ async def get_client_visits(
     visits = session.exec(statement).all()
     return visits
 
-@router.get("/plan-instances", response_model=List[PlanInstancePublic])
+@router.get(
+    "/plan-instances", response_model=List[PlanInstancePublic],
+    dependencies=[Depends(query_budget(10))],
+)
 async def get_client_plan_instances(
     session: SessionDep,
     current_user: CurrentUser,
     skip: int = 0,
     limit: int = 100,
-    active_only: bool = False
+    active_only: bool = False,
+    projection: Optional[Projection] = Depends(sparse_fields(PlanInstance, PlanInstancePublic))
 ) -> Any:
-    """Get all plan instances for client groups where the current user is an admin"""
-    # Get the client associated with the current user
-    client = session.exec(
-        select(Client).where(Client.user_id == current_user.id)
-    ).first()
-    
-    if not client:
-        raise HTTPException(status_code=404, detail="Client not found for current user")
-    
-    # Get plan instances for groups where this client is an admin
+    """Get all plan instances for client groups the current user can access"""
     statement = select(PlanInstance).where(
         PlanInstance.client_group_id.in_(
-            select(ClientGroup.id).join(Client, ClientGroup.admins).where(Client.id == client.id)
+            accessible_group_ids(current_user.id)
         )
     )
     
@@ -257,6 +265,17 @@ async def get_client_plan_instances(
         statement = statement.where(PlanInstance.is_active == True)
     
     statement = statement.offset(skip).limit(limit)
+    if projection:
+        return projection_response(session, statement, projection)
+    # Load what PlanInstancePublic nests in a few queries instead of per row
+    group = selectinload(PlanInstance.client_group)
+    statement = statement.options(
+        selectinload(PlanInstance.plan),
+        group.selectinload(ClientGroup.clients),
+        group.selectinload(ClientGroup.subscriptions),
+        group.selectinload(ClientGroup.reservations),
+        group.selectinload(ClientGroup.admins),
+    )
     plan_instances = session.exec(statement).all()
     return plan_instances
 
@@ -268,20 +287,12 @@ async def get_plan_instance(
     instance_id: uuid.UUID
 ) -> Any:
     """Get a specific plan instance"""
-    # Get the client associated with the current user
-    client = session.exec(
-        select(Client).where(Client.user_id == current_user.id)
-    ).first()
-    
-    if not client:
-        raise HTTPException(status_code=404, detail="Client not found for current user")
-    
     # Get the plan instance and verify access
     plan_instance = session.exec(
         select(PlanInstance)
         .where(PlanInstance.id == instance_id)
         .where(PlanInstance.client_group_id.in_(
-            select(ClientGroup.id).join(Client, ClientGroup.admins).where(Client.id == client.id)
+            accessible_group_ids(current_user.id)
         ))
     ).first()
     
@@ -293,7 +304,10 @@ async def get_plan_instance(
     
     return plan_instance
 
-@router.get("/plan-instances/{instance_id}/visits", response_model=List[Visit])
+@router.get(
+    "/plan-instances/{instance_id}/visits", response_model=List[Visit],
+    dependencies=[Depends(query_budget(5))],
+)
 async def get_plan_instance_visits(
     *,
     session: SessionDep,
@@ -303,20 +317,12 @@ async def get_plan_instance_visits(
     limit: int = 100
 ) -> Any:
     """Get all visits for a specific plan instance"""
-    # Get the client associated with the current user
-    client = session.exec(
-        select(Client).where(Client.user_id == current_user.id)
-    ).first()
-    
-    if not client:
-        raise HTTPException(status_code=404, detail="Client not found for current user")
-    
     # Verify access to the plan instance
     plan_instance = session.exec(
         select(PlanInstance)
         .where(PlanInstance.id == instance_id)
         .where(PlanInstance.client_group_id.in_(
-            select(ClientGroup.id).join(Client, ClientGroup.admins).where(Client.id == client.id)
+            accessible_group_ids(current_user.id)
         ))
     ).first()
     
@@ -341,20 +347,12 @@ async def get_plan_instance_payments(
     limit: int = 100
 ) -> Any:
     """Get all payments for a specific plan instance"""
-    # Get the client associated with the current user
-    client = session.exec(
-        select(Client).where(Client.user_id == current_user.id)
-    ).first()
-    
-    if not client:
-        raise HTTPException(status_code=404, detail="Client not found for current user")
-    
     # Verify access to the plan instance
     plan_instance = session.exec(
         select(PlanInstance)
         .where(PlanInstance.id == instance_id)
         .where(PlanInstance.client_group_id.in_(
-            select(ClientGroup.id).join(Client, ClientGroup.admins).where(Client.id == client.id)
+            accessible_group_ids(current_user.id)
         ))
     ).first()
     
@@ -398,7 +396,7 @@ async def make_payment(
         select(PlanInstance)
         .where(PlanInstance.id == plan_instance_id)
         .where(PlanInstance.client_group_id.in_(
-            select(ClientGroup.id).join(Client, ClientGroup.admins).where(Client.id == client.id)
+            accessible_group_ids(current_user.id)
         ))
     ).first()
     
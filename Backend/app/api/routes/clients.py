@@ -1,9 +1,10 @@
 from fastapi import APIRouter
-from app.api.routes import client_management, client_groups, client_plans
+from app.api.routes import client_management, client_groups, client_plans, notifications
 
 router = APIRouter()
 
 # Include the sub-routers
 router.include_router(client_management.router, prefix="/management", tags=["client-management"])
 router.include_router(client_groups.router, prefix="/groups", tags=["client-groups"])
-router.include_router(client_plans.router, prefix="/plans", tags=["client-plans"]) 
\ No newline at end of file
+router.include_router(client_plans.router, prefix="/plans", tags=["client-plans"])
+router.include_router(notifications.router, prefix="/notifications", tags=["client-notifications"]) 
\ No newline at end of file
@@ -1,43 +1,157 @@
 import json
+import re
+from typing import Any, Dict, List, Optional
+
 from app.api.deps import CurrentUser, SessionDep
 from fastapi import APIRouter, HTTPException, status
+from sqlalchemy import Numeric, and_, cast, literal, or_, true
+from sqlalchemy.dialects.postgresql import JSONPATH
+from sqlmodel import func, select
 
-from app.old_models import Form, FormSubmission, SuccessResponse
+from app.old_models import (
+    Form, FormFilter, FormPublic, FormQuery, FormSubmission, SuccessResponse
+)
 
 router = APIRouter()
 
+_PATH_SEGMENT = re.compile(r"^[A-Za-z0-9_\- ]+$")
+_JSONPATH_OPS = {"ne": "!=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+
+def _split_path(path: str) -> List[str]:
+    segments = path.split(".")
+    if not all(_PATH_SEGMENT.match(s) for s in segments):
+        raise HTTPException(status_code=422, detail=f"Invalid field path: {path}")
+    return segments
+
+
+def _nest(segments: List[str], value: Any) -> Dict[str, Any]:
+    for segment in reversed(segments):
+        value = {segment: value}
+    return value
+
+
+def _jsonpath(segments: List[str], condition: Optional[str] = None) -> Any:
+    # Segments are validated above and quoted, values are embedded as JSON literals
+    path = "$" + "".join(f'."{s}"' for s in segments)
+    if condition:
+        path += f" ? ({condition})"
+    return cast(literal(path), JSONPATH)
+
+
+def _filter_clause(f: FormFilter) -> Any:
+    segments = _split_path(f.path)
+    if f.op == "eq":
+        # Containment is answered straight from the GIN index
+        return Form.form_data.contains(_nest(segments, f.value))
+    if f.op == "in":
+        if not isinstance(f.value, list) or not f.value:
+            raise HTTPException(status_code=422, detail="'in' needs a non-empty list")
+        return or_(*(Form.form_data.contains(_nest(segments, v)) for v in f.value))
+    if f.op == "exists":
+        return Form.form_data.op("@?")(_jsonpath(segments))
+    if isinstance(f.value, (dict, list)) or f.value is None:
+        raise HTTPException(status_code=422, detail=f"'{f.op}' needs a scalar value")
+    return Form.form_data.op("@?")(
+        _jsonpath(segments, f"@ {_JSONPATH_OPS[f.op]} {json.dumps(f.value)}")
+    )
+
+
 @router.post("/", response_model=SuccessResponse, status_code=status.HTTP_201_CREATED)
 def create_form(
     *, session: SessionDep, current_user: CurrentUser,
     form_submission: FormSubmission,
-    
+
 ):
     """
     Save form data to database.
-    
+
     Returns the ID of the created form and a success message.
     """
 
     try:
-        serialized_form_data = json.dumps(form_submission.form_data)
+        json.dumps(form_submission.form_data)
     except Exception:
         raise HTTPException(status_code=422, detail="Not valid JSON")
-    
+
     # Create form object
     new_form = Form(
         form_type=form_submission.form_type,
-        form_data=serialized_form_data,
+        form_data=form_submission.form_data,
         user_id=current_user.id
     )
-    
+
     # Add to database and commit
     session.add(new_form)
     session.commit()
     session.refresh(new_form)
-    
+
     # Return success response with form ID
     return SuccessResponse(
         success=True,
         message="Form saved successfully",
         data={"id": str(new_form.id)}
     )
+
+
+@router.post("/query", response_model=SuccessResponse)
+def query_forms(
+    *, session: SessionDep, current_user: CurrentUser, query: FormQuery
+) -> Any:
+    """
+    Filter and aggregate forms by fields inside form_data, in the database.
+
+    Filters are ANDed; `path` is a dotted path such as "budget" or
+    "contact.city". Without `aggregate` the matching forms are returned,
+    otherwise `aggregate.func` over `aggregate.path`, optionally grouped by
+    `aggregate.group_by`. Non-superusers only see their own forms.
+
+    Example, all intake forms where budget > 1000:
+    {"form_type": "intake", "filters": [{"path": "budget", "op": "gt", "value": 1000}]}
+    """
+    conditions = [_filter_clause(f) for f in query.filters]
+    if query.form_type:
+        conditions.append(Form.form_type == query.form_type)
+    if not current_user.is_superuser:
+        conditions.append(Form.user_id == current_user.id)
+    where = and_(true(), *conditions)
+
+    if not query.aggregate:
+        forms = session.exec(
+            select(Form).where(where)
+            .order_by(Form.created_at.desc())
+            .offset(query.skip).limit(query.limit)
+        ).all()
+        return SuccessResponse(
+            message=f"{len(forms)} forms found",
+            data={"forms": [FormPublic.model_validate(f).model_dump(mode="json") for f in forms]},
+        )
+
+    agg = query.aggregate
+    if agg.func == "count":
+        value = func.count(Form.id)
+    else:
+        if not agg.path:
+            raise HTTPException(status_code=422, detail=f"'{agg.func}' needs a path")
+        field = Form.form_data[tuple(_split_path(agg.path))]
+        # Only rows where the field is a number take part in the aggregate
+        where = and_(where, func.jsonb_typeof(field) == "number")
+        value = getattr(func, agg.func)(cast(field.astext, Numeric))
+
+    if agg.group_by:
+        group = Form.form_data[tuple(_split_path(agg.group_by))].astext
+        rows = session.exec(
+            select(group, value).where(where).group_by(group)
+            .order_by(group).offset(query.skip).limit(query.limit)
+        ).all()
+        result = [
+            {"group": key, "value": float(v) if v is not None else None} for key, v in rows
+        ]
+    else:
+        v = session.exec(select(value).where(where)).one()
+        result = float(v) if v is not None else None
+
+    return SuccessResponse(
+        message="Aggregate computed",
+        data={"func": agg.func, "path": agg.path, "group_by": agg.group_by, "result": result},
+    )
@@ -0,0 +1,76 @@
+import asyncio
+import uuid
+from datetime import datetime
+from typing import Any, Optional
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+
+from app.api.deps import GetClientFromQuery, SessionDep, StreamUser, get_client
+from app.old_models import Client, NotificationFeed, NotificationMarkRead
+from app.services.notifications import FEED_LIMIT, count_unread, get_feed, hub, mark_read
+
+router = APIRouter()
+
+KEEPALIVE_SECONDS = 15.0
+
+
+@router.get("/", response_model=NotificationFeed)
+def read_notifications(
+    session: SessionDep,
+    client: GetClientFromQuery,
+    before: Optional[datetime] = None,
+    limit: int = Query(FEED_LIMIT, ge=1, le=100),
+) -> Any:
+    """The client's notifications, newest first; page with `before`"""
+    return get_feed(session, client.id, before=before, limit=limit)
+
+
+@router.post("/read", response_model=NotificationFeed)
+def mark_notifications_read(
+    session: SessionDep, client: GetClientFromQuery, read_in: NotificationMarkRead
+) -> Any:
+    """Mark everything up to `until` (default now) as read"""
+    read_until = mark_read(session, client.id, read_in.until)
+    return NotificationFeed(
+        data=[], unread=count_unread(session, client.id, read_until), read_until=read_until
+    )
+
+
+def get_stream_client(
+    session: SessionDep, current_user: StreamUser, client_id: Optional[uuid.UUID] = Query(None)
+) -> Client:
+    return get_client(client_id, session, current_user)
+
+
+async def _notification_events(client_id: uuid.UUID):
+    queue = hub.subscribe(client_id)
+    try:
+        yield f"retry: {int(KEEPALIVE_SECONDS * 1000)}\n\n"
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing an idle stream
+                yield ": keepalive\n\n"
+                continue
+            yield f"id: {item.id}\nevent: notification\ndata: {item.model_dump_json()}\n\n"
+    finally:
+        hub.unsubscribe(client_id, queue)
+
+
+@router.get("/stream")
+async def stream_notifications(client: Client = Depends(get_stream_client)) -> Any:
+    """
+    New notifications for the client as Server-Sent Events.
+
+    Each one arrives as a `notification` event once it is committed. Pushes
+    are best effort: after a reconnect, fetch the feed to catch up. Since
+    EventSource can't send headers, the token may be passed as
+    `?access_token=`.
+    """
+    return StreamingResponse(
+        _notification_events(client.id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
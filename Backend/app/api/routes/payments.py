@@ -0,0 +1,37 @@
+from typing import Any
+
+from fastapi import APIRouter, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+
+from app.api.deps import SessionDep
+from app.services.epayco import verify_signature
+from app.services.payment_webhooks import store_event, worker
+
+router = APIRouter()
+
+
+@router.post("/epayco/webhook", response_model=dict)
+async def epayco_webhook(request: Request, session: SessionDep) -> Any:
+    """
+    Receive an ePayco confirmation.
+
+    The raw event is stored and acknowledged right away; Payment and
+    PlanInstance updates are applied in batches by the webhook worker.
+    Retries of an event that was already stored are acknowledged too.
+    """
+    if request.headers.get("content-type", "").startswith("application/json"):
+        webhook_data = await request.json()
+    else:
+        webhook_data = dict(await request.form())
+    if not isinstance(webhook_data, dict):
+        raise HTTPException(status_code=422, detail="Webhook body must be an object")
+
+    if not webhook_data.get("x_transaction_id"):
+        raise HTTPException(status_code=422, detail="Missing x_transaction_id")
+    if not verify_signature(webhook_data):
+        raise HTTPException(status_code=400, detail="Invalid signature")
+
+    created = await run_in_threadpool(store_event, session, webhook_data)
+    if created:
+        worker.notify()
+    return {"received": True, "duplicate": not created}
@@ -27,9 +27,11 @@ from app.old_models import (
     ClientCreate,
     QRCode,
     ClientGroup,
-    ClientPublic
-
+    ClientPublic,
+    FamilySignup,
+    FamilySignupPublic,
 )
+from app.services.family_signup import SignupConflict, create_family
 from app.utils.utils import generate_new_account_email, send_email
 
 router = APIRouter()
@@ -301,6 +303,16 @@ def register_user(
         "message": "User, client, and client group created successfully"
     }
 
+@router.post("/signup-family", response_model=FamilySignupPublic)
+def register_family(*, session: SessionDep, family_in: FamilySignup) -> Any:
+    """
+    Register a parent user with their client, client group and children in one transaction.
+    """
+    try:
+        return create_family(session, family_in)
+    except SignupConflict as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/{user_id}", response_model=UserPublic)
 def read_user_by_id(
     user_id: uuid.UUID, session: SessionDep, current_user: CurrentUser
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends
 from pydantic.networks import EmailStr
 
 from app.api.deps import get_current_active_superuser
+from app.core.compression import compression_snapshot
 from app.old_models import Message
 from app.utils.utils import generate_test_email, send_email
 
@@ -29,3 +30,19 @@ def test_email(email_to: EmailStr) -> Message:
 @router.get("/health-check/")
 async def health_check() -> bool:
     return True
+
+
+@router.get(
+    "/compression-stats/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def compression_stats() -> list[dict]:
+    """
+    Bytes before and after response compression, per route.
+
+    The totals are kept in memory by each worker and only cover the
+    responses of the worker that answers this request, since its last
+    restart. With several gunicorn workers, repeated calls can return
+    different numbers.
+    """
+    return compression_snapshot()
@@ -0,0 +1,151 @@
+"""
+Latency of the front-desk client search against a large client table.
+
+Fills the database the app is configured for with synthetic clients (accented
+names, emails, identifications, phones) generated server side, runs a mix of
+autocomplete prefixes, substrings, typos and exact identifications through
+`search_clients`, and reports p50/p95 per kind plus the plan of the slowest
+query. Exits non-zero when p95 is over budget. The synthetic clients are
+deleted afterwards unless --keep is given.
+
+    python -m app.benchmarks.client_search --clients 500000 --budget-ms 20
+"""
+import argparse
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Dict, List, Tuple
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.core.db import engine
+from app.services.client_search import normalize, search_clients
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUDGET_MS = float(os.getenv("CLIENT_SEARCH_BUDGET_MS", 20))
+# Every synthetic client gets this email domain, which is how they are cleaned up
+DOMAIN = "search-bench.example.com"
+
+FIRST_NAMES = [
+    "José", "María", "Sofía", "Andrés", "Camila", "Julián", "Valentina", "Sebastián",
+    "Lucía", "Martín", "Ángela", "Tomás", "Isabel", "Nicolás", "Mónica", "Óscar",
+]
+LAST_NAMES = [
+    "Gómez", "Rodríguez", "Pérez", "Martínez", "García", "López", "Hernández", "Díaz",
+    "Muñoz", "Álvarez", "Ramírez", "Suárez", "Jiménez", "Castaño", "Ortíz", "Peña",
+]
+
+
+def populate(session: Session, clients: int) -> None:
+    # Built with generate_series so half a million rows take seconds, not minutes
+    session.exec(text("""
+        INSERT INTO client (id, full_name, email, phone, identification, is_active, is_child,
+                            created_at, updated_at)
+        SELECT gen_random_uuid(),
+               f[1 + (i * 7) % array_length(f, 1)] || ' ' || l[1 + (i * 13) % array_length(l, 1)]
+                   || ' ' || l[1 + (i / 16) % array_length(l, 1)],
+               'client' || i || '@' || :domain,
+               '3' || lpad((i::bigint * 7919 % 1000000000)::text, 9, '0'),
+               (10000000 + i)::text,
+               true, false, now(), now()
+        FROM generate_series(1, :clients) AS i,
+             (SELECT CAST(:first AS text[]) AS f, CAST(:last AS text[]) AS l) AS names
+    """), params={"clients": clients, "domain": DOMAIN, "first": FIRST_NAMES, "last": LAST_NAMES})
+    session.commit()
+    session.exec(text("ANALYZE client"))
+
+
+def cleanup(session: Session) -> None:
+    session.exec(text("DELETE FROM client WHERE email LIKE :pattern"), params={"pattern": f"%@{DOMAIN}"})
+    session.commit()
+
+
+def queries(clients: int, per_kind: int, rng: random.Random) -> Dict[str, List[str]]:
+    names = FIRST_NAMES + LAST_NAMES
+    return {
+        "prefix": [rng.choice(names)[: rng.randint(2, 4)] for _ in range(per_kind)],
+        "unaccented": [f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}".lower()
+                       .translate(str.maketrans("áéíóúñ", "aeioun")) for _ in range(per_kind)],
+        "typo": [rng.choice(LAST_NAMES).replace("e", "a", 1) for _ in range(per_kind)],
+        "identification": [str(10000000 + rng.randint(1, clients)) for _ in range(per_kind)],
+        "email": [f"client{rng.randint(1, clients)}@{DOMAIN}" for _ in range(per_kind)],
+    }
+
+
+def time_queries(session: Session, terms: List[str], limit: int) -> Tuple[List[float], str]:
+    latencies = []
+    slowest, slowest_ms = terms[0], 0.0
+    for term in terms:
+        start = time.perf_counter()
+        search_clients(session, term, limit)
+        elapsed = (time.perf_counter() - start) * 1000
+        latencies.append(elapsed)
+        if elapsed > slowest_ms:
+            slowest, slowest_ms = term, elapsed
+    return latencies, slowest
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def explain(session: Session, term: str) -> str:
+    rows = session.exec(text("""
+        EXPLAIN (ANALYZE, BUFFERS)
+        SELECT id FROM client
+        WHERE search_text LIKE '%' || :term || '%' OR :term <% search_text
+        LIMIT 10
+    """), params={"term": normalize(term)}).all()
+    return "\n".join(r[0] for r in rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", type=int, default=500_000)
+    parser.add_argument("--queries", type=int, default=50, help="queries per kind")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--seed", type=int, default=39)
+    parser.add_argument("--keep", action="store_true", help="leave the synthetic clients in place")
+    parser.add_argument("--skip-populate", action="store_true", help="reuse clients from a --keep run")
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        if not args.skip_populate:
+            start = time.perf_counter()
+            populate(session, args.clients)
+            logger.info(f"Inserted {args.clients:,} clients in {time.perf_counter() - start:.1f}s")
+        try:
+            worst_p95, worst_term, worst_ms = 0.0, "", 0.0
+            logger.info(f"{'kind':<16} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+            for kind, terms in queries(args.clients, args.queries, random.Random(args.seed)).items():
+                search_clients(session, terms[0], args.limit)  # warm the cache for this shape
+                latencies, slowest = time_queries(session, terms, args.limit)
+                p95 = percentile(latencies, 95)
+                worst_p95 = max(worst_p95, p95)
+                if max(latencies) > worst_ms:
+                    worst_term, worst_ms = slowest, max(latencies)
+                logger.info(
+                    f"{kind:<16} {statistics.median(latencies):>8.2f} {p95:>8.2f} "
+                    f"{max(latencies):>8.2f}  (slowest: {slowest!r})"
+                )
+            logger.info(f"\nPlan for the slowest term overall:\n{explain(session, worst_term)}")
+        finally:
+            if not args.keep:
+                cleanup(session)
+
+    if worst_p95 > args.budget_ms:
+        logger.error(f"p95 {worst_p95:.2f} ms is over the {args.budget_ms:.0f} ms budget")
+        sys.exit(1)
+    logger.info(f"p95 {worst_p95:.2f} ms is within the {args.budget_ms:.0f} ms budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Latency of signing up a family of four: the old flow against /users/signup-family.
+
+The old flow is what the app does today: POST /users/signup for the parent,
+then one POST /clients/management/register/child per child. The new flow is
+a single POST /users/signup-family. Both run in process through the ASGI app
+against the configured database; the parent's token for the old flow is
+minted directly so password checks at login don't skew the comparison.
+Created users, clients, groups and QR codes are removed afterwards.
+
+    python -m app.benchmarks.family_signup --families 30 --children 3
+"""
+import argparse
+import logging
+import statistics
+import time
+import uuid
+from datetime import timedelta
+from typing import Callable, List
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, delete, select
+
+from app.core import security
+from app.core.config import settings
+from app.core.db import engine
+from app.main import app
+from app.old_models import Client, ClientGroup, ClientGroupAdminLink, QRCode, User
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
+
+DOMAIN = "family-bench.example.com"
+
+
+def family(children: int) -> dict:
+    tag = uuid.uuid4().hex[:12]
+    email = f"parent-{tag}@{DOMAIN}"
+    return {
+        "user": {"email": email, "password": "benchmark-pass", "full_name": f"Parent {tag}"},
+        "parent": {"identification": tag, "full_name": f"Parent {tag}", "email": email, "phone": "3000000000"},
+        "children": [
+            {"identification": f"{tag}-{n}", "full_name": f"Child {n} {tag}", "email": None, "phone": None}
+            for n in range(children)
+        ],
+    }
+
+
+def old_flow(client: TestClient, data: dict) -> None:
+    r = client.post(f"{settings.API_V1_STR}/users/signup", json={
+        "user_in": data["user"], "client_in": data["parent"],
+    })
+    r.raise_for_status()
+    token = security.create_access_token(r.json()["user"]["id"], timedelta(minutes=5))
+    headers = {"Authorization": f"Bearer {token}"}
+    for child in data["children"]:
+        r = client.post(
+            f"{settings.API_V1_STR}/clients/management/register/child", json=child, headers=headers,
+        )
+        r.raise_for_status()
+
+
+def new_flow(client: TestClient, data: dict) -> None:
+    client.post(f"{settings.API_V1_STR}/users/signup-family", json=data).raise_for_status()
+
+
+def cleanup(domain: str = DOMAIN) -> None:
+    """Remove families whose parent signed up with an address at `domain`."""
+    with Session(engine) as session:
+        users = select(User.id).where(User.email.like(f"%@{domain}"))
+        groups = select(Client.group_id).where(Client.user_id.in_(users))
+        clients = select(Client.id).where(Client.group_id.in_(groups))
+        session.exec(delete(QRCode).where(QRCode.client_id.in_(clients)))
+        session.exec(delete(ClientGroupAdminLink).where(ClientGroupAdminLink.admin_id.in_(users)))
+        group_ids = session.exec(groups).all()
+        session.exec(delete(Client).where(Client.group_id.in_(group_ids)))
+        session.exec(delete(ClientGroup).where(ClientGroup.id.in_(group_ids)))
+        session.exec(delete(User).where(User.email.like(f"%@{domain}")))
+        session.commit()
+
+
+def timed(client: TestClient, flow: Callable[[TestClient, dict], None], families: int, children: int) -> List[float]:
+    flow(client, family(children))  # warm up
+    timings = []
+    for _ in range(families):
+        data = family(children)
+        start = time.perf_counter()
+        flow(client, data)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--families", type=int, default=30)
+    parser.add_argument("--children", type=int, default=3)
+    args = parser.parse_args()
+
+    try:
+        with TestClient(app) as client:
+            logger.info(f"Family of {args.children + 1}, {args.families} signups per flow")
+            logger.info(f"{'flow':<28} {'p50 ms':>8} {'p95 ms':>8}")
+            for name, flow in [("signup + register/child", old_flow), ("signup-family", new_flow)]:
+                timings = sorted(timed(client, flow, args.families, args.children))
+                p95 = timings[min(len(timings) - 1, int(round(0.95 * (len(timings) - 1))))]
+                logger.info(f"{name:<28} {statistics.median(timings):>8.1f} {p95:>8.1f}")
+    finally:
+        cleanup()
+
+
+if __name__ == "__main__":
+    main()
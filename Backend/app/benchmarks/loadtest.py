@@ -0,0 +1,326 @@
+"""
+Load test for front-desk and client traffic against a running API.
+
+Seeds the database the API uses with a client group, clients with QR codes,
+an active subscription, a plan instance and one token per virtual user, then
+drives each scenario with `--users` concurrent virtual users for `--duration`
+seconds (after `--warmup` seconds that are not measured). Each user sends its
+next request as soon as the previous one returns. Reports throughput and
+p50/p95/p99 latency per scenario, and compares them with the stored baseline:
+the run fails when p95 grows, or throughput drops, by more than `--tolerance`.
+No baseline is committed, since the numbers depend on the machine: record one
+locally with `--save-baseline` before comparing. Seeded rows and signed-up
+families are removed afterwards. Admin audit rows written by the API are kept,
+unless the run had to create the admin, in which case they go with it.
+
+Scenarios:
+  check_qr        GET /admin/check-qr, alternating check-in and check-out
+  token_validate  POST /admin/tokens/validate
+  token_use       POST /admin/tokens/use
+  dashboard       GET /admin/dashboard/metrics
+  plans           GET /clients/plans/available-plans
+  signup          POST /users/signup-family (parent and one child)
+
+For per-worker numbers, run the API with a single worker, e.g. with
+`uvicorn app.main:app --port 8000` next to the docker-compose database.
+
+    python -m app.benchmarks.loadtest --base-url http://localhost:8000 --users 20 --duration 30
+    python -m app.benchmarks.loadtest --scenario check_qr --scenario token_use --save-baseline
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+import httpx
+from sqlmodel import Session, delete, select
+
+from app.benchmarks.family_signup import cleanup as cleanup_families
+from app.core.config import settings
+from app.core.db import engine
+from app.old_models import (
+    AdminAction, AdminUser, Client, ClientGroup, Plan, PlanInstance, PlanToken, PlanTokenUse,
+    QRCode, Subscription, User, Visit,
+)
+from app.services.audit import FLUSH_INTERVAL_SECONDS
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logging.getLogger("httpx").setLevel(logging.WARNING)  # one line per request otherwise
+logger = logging.getLogger(__name__)
+
+MARKER = "loadtest"
+SIGNUP_DOMAIN = "loadtest.example.com"
+BASELINE_PATH = Path(__file__).parent / "baselines" / "loadtest.json"
+DEFAULT_BASE_URL = os.getenv("LOADTEST_BASE_URL", "http://localhost:8000")
+
+
+class Fixture(NamedTuple):
+    group_id: uuid.UUID
+    plan_id: uuid.UUID
+    clients: List[tuple]  # (client_id, qr_code_id)
+    tokens: List[tuple]  # (token_id, token_value)
+    admin_created: Optional[uuid.UUID]
+
+
+class Result(NamedTuple):
+    requests: int
+    errors: int
+    rps: float
+    p50: float
+    p95: float
+    p99: float
+
+
+def seed(session: Session, clients: int, users: int) -> Fixture:
+    admin = session.exec(select(User).where(User.email == settings.FIRST_SUPERUSER)).one()
+    admin_created = None
+    if not session.exec(select(AdminUser).where(AdminUser.user_id == admin.id)).first():
+        admin_user = AdminUser(user_id=admin.id)
+        session.add(admin_user)
+        admin_created = admin_user.id
+
+    now = datetime.utcnow()
+    plan = Plan(name=MARKER, description=MARKER, price=100.0, duration_days=30)
+    group = ClientGroup(name=MARKER)
+    session.add_all([plan, group])
+    session.flush()
+    session.add(Subscription(
+        client_group_id=group.id, plan_id=plan.id, start_date=now,
+        end_date=now + timedelta(days=30), total_cost=100.0,
+    ))
+    instance = PlanInstance(client_group_id=group.id, plan_id=plan.id, start_date=now, total_cost=100.0)
+    members = [
+        Client(full_name=f"{MARKER} {n}", identification=f"{MARKER}-{n}", group_id=group.id)
+        for n in range(clients)
+    ]
+    session.add(instance)
+    session.add_all(members)
+    session.flush()
+    qr_codes = [QRCode(client_id=c.id) for c in members]
+    # One token per virtual user, so uses don't all queue on one row
+    tokens = [
+        PlanToken(plan_id=plan.id, plan_instance_id=instance.id, token_value=f"{MARKER}-{uuid.uuid4().hex}")
+        for _ in range(users)
+    ]
+    session.add_all([*qr_codes, *tokens])
+    session.commit()
+    return Fixture(
+        group_id=group.id,
+        plan_id=plan.id,
+        clients=[(q.client_id, q.id) for q in qr_codes],
+        tokens=[(t.id, t.token_value) for t in tokens],
+        admin_created=admin_created,
+    )
+
+
+def cleanup(session: Session, fixture: Fixture) -> None:
+    client_ids = [client_id for client_id, _ in fixture.clients]
+    token_ids = [token_id for token_id, _ in fixture.tokens]
+    session.exec(delete(PlanTokenUse).where(PlanTokenUse.token_id.in_(token_ids)))
+    session.exec(delete(PlanToken).where(PlanToken.id.in_(token_ids)))
+    session.exec(delete(Visit).where(Visit.client_id.in_(client_ids)))
+    session.exec(delete(QRCode).where(QRCode.client_id.in_(client_ids)))
+    session.exec(delete(Client).where(Client.id.in_(client_ids)))
+    session.exec(delete(PlanInstance).where(PlanInstance.client_group_id == fixture.group_id))
+    session.exec(delete(Subscription).where(Subscription.client_group_id == fixture.group_id))
+    session.exec(delete(ClientGroup).where(ClientGroup.id == fixture.group_id))
+    session.exec(delete(Plan).where(Plan.id == fixture.plan_id))
+    if fixture.admin_created:
+        # The API writes audit rows in the background, so let its last batch land first
+        time.sleep(FLUSH_INTERVAL_SECONDS + 1)
+        session.exec(delete(AdminAction).where(AdminAction.admin_id == fixture.admin_created))
+        session.exec(delete(AdminUser).where(AdminUser.id == fixture.admin_created))
+    session.commit()
+    cleanup_families(SIGNUP_DOMAIN)
+
+
+Operation = Callable[[httpx.AsyncClient], Awaitable[httpx.Response]]
+
+
+def scenarios(fixture: Fixture, users: int) -> Dict[str, Callable[[int], Operation]]:
+    """Per scenario, a factory giving virtual user `n` its next-request function."""
+    api = settings.API_V1_STR
+
+    def check_qr(n: int) -> Operation:
+        # Each user scans its own clients, so two users never toggle the same visit
+        own = fixture.clients[n::users] or fixture.clients
+        turn = iter(range(sys.maxsize))
+
+        def op(client: httpx.AsyncClient) -> Awaitable[httpx.Response]:
+            client_id, qr_code_id = own[next(turn) % len(own)]
+            return client.get(f"{api}/admin/check-qr", params={"client_id": str(client_id), "qr_code_id": str(qr_code_id)})
+        return op
+
+    def token_validate(n: int) -> Operation:
+        _, token_value = fixture.tokens[n % len(fixture.tokens)]
+        return lambda client: client.post(f"{api}/admin/tokens/validate", params={"token_value": token_value})
+
+    def token_use(n: int) -> Operation:
+        token_id, _ = fixture.tokens[n % len(fixture.tokens)]
+
+        def op(client: httpx.AsyncClient) -> Awaitable[httpx.Response]:
+            client_id, _ = random.choice(fixture.clients)
+            return client.post(f"{api}/admin/tokens/use", json={"token_id": str(token_id), "client_id": str(client_id)})
+        return op
+
+    def dashboard(n: int) -> Operation:
+        return lambda client: client.get(f"{api}/admin/dashboard/metrics")
+
+    def plans(n: int) -> Operation:
+        return lambda client: client.get(f"{api}/clients/plans/available-plans")
+
+    def signup(n: int) -> Operation:
+        def op(client: httpx.AsyncClient) -> Awaitable[httpx.Response]:
+            tag = uuid.uuid4().hex[:12]
+            email = f"parent-{tag}@{SIGNUP_DOMAIN}"
+            return client.post(f"{api}/users/signup-family", json={
+                "user": {"email": email, "password": "loadtest-pass", "full_name": f"Parent {tag}"},
+                "parent": {"identification": tag, "full_name": f"Parent {tag}", "email": email, "phone": None},
+                "children": [{"identification": f"{tag}-1", "full_name": f"Child {tag}", "email": None, "phone": None}],
+            })
+        return op
+
+    return {
+        "check_qr": check_qr, "token_validate": token_validate, "token_use": token_use,
+        "dashboard": dashboard, "plans": plans, "signup": signup,
+    }
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    # Nearest rank
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values))) - 1))]
+
+
+async def drive(
+    client: httpx.AsyncClient, factory: Callable[[int], Operation], users: int, warmup: float, duration: float,
+) -> Result:
+    latencies: List[float] = []
+    errors = 0
+    start = time.perf_counter()
+    measure_from, stop_at = start + warmup, start + warmup + duration
+
+    async def user(n: int) -> None:
+        nonlocal errors
+        op = factory(n)
+        while True:
+            sent = time.perf_counter()
+            if sent >= stop_at:
+                return
+            try:
+                response = await op(client)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            if sent >= measure_from:
+                latencies.append((time.perf_counter() - sent) * 1000)
+                errors += failed
+
+    await asyncio.gather(*(user(n) for n in range(users)))
+    latencies.sort()
+    return Result(
+        requests=len(latencies),
+        errors=errors,
+        rps=len(latencies) / duration,
+        p50=percentile(latencies, 0.50),
+        p95=percentile(latencies, 0.95),
+        p99=percentile(latencies, 0.99),
+    )
+
+
+async def run(args: argparse.Namespace, fixture: Fixture) -> Dict[str, Result]:
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=30.0, limits=limits) as client:
+        r = await client.post(f"{settings.API_V1_STR}/login/access-token", data={
+            "username": settings.FIRST_SUPERUSER, "password": settings.FIRST_SUPERUSER_PASSWORD,
+        })
+        r.raise_for_status()
+        client.headers["Authorization"] = f"Bearer {r.json()['access_token']}"
+
+        factories = scenarios(fixture, args.users)
+        results = {}
+        for name in args.scenario or list(factories):
+            results[name] = await drive(client, factories[name], args.users, args.warmup, args.duration)
+            result = results[name]
+            logger.info(
+                f"{name:<16} {result.requests:>8} {result.errors:>7} {result.rps:>8.1f} "
+                f"{result.p50:>8.1f} {result.p95:>8.1f} {result.p99:>8.1f}"
+            )
+        return results
+
+
+def compare(results: Dict[str, Result], baseline: dict, tolerance: float) -> List[str]:
+    """Scenarios whose p95 or throughput moved past `tolerance` against the baseline."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        p95_change = result.p95 / base["p95"] - 1 if base["p95"] else 0.0
+        rps_change = result.rps / base["rps"] - 1 if base["rps"] else 0.0
+        logger.info(f"{name:<16} p95 {p95_change:>+7.1%}   rps {rps_change:>+7.1%}")
+        if p95_change > tolerance or rps_change < -tolerance or result.errors > base.get("errors", 0):
+            regressions.append(name)
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL)
+    parser.add_argument("--scenario", action="append", choices=[
+        "check_qr", "token_validate", "token_use", "dashboard", "plans", "signup",
+    ], help="run only these scenarios (repeatable); all by default")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--warmup", type=float, default=5.0)
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        fixture = seed(session, args.clients, args.users)
+        try:
+            logger.info(f"{args.users} users, {args.duration:.0f}s per scenario against {args.base_url}")
+            logger.info(
+                f"{'scenario':<16} {'requests':>8} {'errors':>7} {'req/s':>8} "
+                f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+            )
+            results = asyncio.run(run(args, fixture))
+        finally:
+            session.rollback()
+            cleanup(session, fixture)
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        stored = json.loads(args.baseline.read_text()) if args.baseline.exists() else {"results": {}}
+        stored.update({"users": args.users, "duration": args.duration, "recorded_at": datetime.utcnow().isoformat()})
+        stored["results"].update({name: result._asdict() for name, result in results.items()})
+        args.baseline.write_text(json.dumps(stored, indent=2) + "\n")
+        logger.info(f"Baseline saved to {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        logger.info(f"No baseline at {args.baseline}; record one with --save-baseline")
+        return
+    baseline = json.loads(args.baseline.read_text())
+    if (baseline.get("users"), baseline.get("duration")) != (args.users, args.duration):
+        logger.info(f"Baseline was recorded with {baseline.get('users')} users for {baseline.get('duration')}s")
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        logger.info(f"Regressed against baseline: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
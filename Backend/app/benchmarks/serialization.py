@@ -0,0 +1,109 @@
+"""
+Rows per second serialized by the list endpoints, with and without the fast path.
+
+`response_model` is what FastAPI does for a route that returns ORM rows:
+validate each row into the public schema, dump it to JSON-compatible Python and
+encode with the stdlib json module. `serialize_rows` is the orjson fast path
+used by /admin/clients, /admin/all-visits and /admin/plan-instances. Rows are
+built in memory, so no database is needed.
+
+    python -m app.benchmarks.serialization --rows 1000 --repeat 20
+"""
+import argparse
+import json
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, List, Type
+
+from pydantic import TypeAdapter
+from sqlmodel import SQLModel
+
+from app.old_models import (
+    Client, ClientGroup, ClientPublic, Plan, PlanInstance, PlanInstancePublic,
+    Visit, VisitPublic,
+)
+from app.utils.serialization import serialize_rows
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
+
+
+def make_clients(n: int) -> List[Client]:
+    return [
+        Client(
+            id=uuid.uuid4(), full_name=f"Client {i}", email=f"client{i}@example.com",
+            phone=f"300{i:07d}", identification=str(i), qr_code=str(uuid.uuid4()),
+        )
+        for i in range(n)
+    ]
+
+
+def make_visits(n: int) -> List[Visit]:
+    start = datetime(2024, 1, 1, 9)
+    return [
+        Visit(
+            id=uuid.uuid4(), client_id=uuid.uuid4(),
+            check_in=start + timedelta(minutes=i),
+            check_out=start + timedelta(minutes=i + 90),
+            duration=1.5, subscription_id=None, notes="benchmark",
+        )
+        for i in range(n)
+    ]
+
+
+def make_plan_instances(n: int) -> List[PlanInstance]:
+    plan = Plan(id=uuid.uuid4(), name="Monthly", description="Benchmark plan", price=120.0)
+    group = ClientGroup(id=uuid.uuid4(), name="Family", created_at=datetime(2024, 1, 1))
+    group.clients = make_clients(4)
+    instances = []
+    for i in range(n):
+        instance = PlanInstance(
+            id=uuid.uuid4(), client_group_id=group.id, plan_id=plan.id,
+            start_date=datetime(2024, 1, 1), total_cost=120.0, paid_amount=60.0,
+            remaining_entries=10, remaining_limits={"daily": 1}, created_at=datetime(2024, 1, 1),
+        )
+        instance.plan = plan
+        instance.client_group = group
+        instances.append(instance)
+    return instances
+
+
+def response_model_path(rows: List[Any], schema: Type[SQLModel]) -> bytes:
+    adapter = TypeAdapter(List[schema])  # type: ignore[valid-type]
+    content = adapter.dump_python(adapter.validate_python(rows, from_attributes=True), mode="json")
+    # Same settings as starlette's JSONResponse
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def rows_per_second(fn: Callable[[], bytes], rows: int, repeat: int) -> float:
+    fn()  # warm up schema compilation
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return rows * repeat / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    cases = [
+        ("ClientPublic", ClientPublic, make_clients(args.rows)),
+        ("VisitPublic", VisitPublic, make_visits(args.rows)),
+        ("PlanInstancePublic", PlanInstancePublic, make_plan_instances(args.rows)),
+    ]
+    logger.info(f"{'schema':<20} {'response_model':>16} {'fast path':>12} {'speedup':>8}")
+    for name, schema, rows in cases:
+        slow = rows_per_second(lambda: response_model_path(rows, schema), args.rows, args.repeat)
+        fast = rows_per_second(lambda: serialize_rows(rows, schema), args.rows, args.repeat)
+        logger.info(f"{name:<20} {slow:>11,.0f} r/s {fast:>8,.0f} r/s {fast / slow:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Bytes and milliseconds saved by `fields=` on the list endpoints.
+
+Seeds the configured database with clients, visits and plan instances whose
+JSONB columns (Visit.details, PlanInstance.remaining_limits/purchased_addons)
+carry a realistic amount of data, then runs each list query twice per page:
+the full path the routes take without `fields=` and the column projection a
+picker would ask for. Reports median time per page and response size. The
+seeded rows are removed afterwards.
+
+    python -m app.benchmarks.sparse_fields --rows 5000 --page 100 --repeat 30
+"""
+import argparse
+import logging
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+from sqlalchemy.orm import selectinload
+from sqlmodel import Session, delete, desc, select
+
+from app.core.db import engine
+from app.old_models import (
+    Client, ClientGroup, ClientPublic, Plan, PlanInstance, PlanInstancePublic, Visit,
+    VisitPublic,
+)
+from app.utils.serialization import parse_fields, projection_response, rows_response
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
+
+MARKER = "sparse-fields-bench"
+
+
+def seed(session: Session, rows: int) -> ClientGroup:
+    plan = Plan(name=MARKER, description=MARKER, price=100.0, limits={"daily": 2})
+    group = ClientGroup(name=MARKER)
+    session.add_all([plan, group])
+    session.flush()
+    start = datetime(2024, 1, 1, 9)
+    clients = [
+        Client(full_name=f"{MARKER} {i}", email=f"bench{i}@example.com", phone=f"300{i:07d}",
+               identification=f"{MARKER}-{i}", group_id=group.id)
+        for i in range(rows)
+    ]
+    session.add_all(clients)
+    session.flush()
+    session.add_all(
+        Visit(client_id=c.id, check_in=start + timedelta(minutes=i), notes=MARKER,
+              details={"area": "pool", "items": [{"sku": f"sku-{n}", "qty": n} for n in range(10)]})
+        for i, c in enumerate(clients)
+    )
+    session.add_all(
+        PlanInstance(
+            client_group_id=group.id, plan_id=plan.id, start_date=start, total_cost=100.0,
+            remaining_limits={f"limit_{n}": n for n in range(20)},
+            purchased_addons={f"addon_{n}": {"qty": n, "price": 9.5} for n in range(10)},
+        )
+        for _ in range(rows)
+    )
+    session.commit()
+    return group
+
+
+def cleanup(session: Session, group: ClientGroup) -> None:
+    client_ids = select(Client.id).where(Client.group_id == group.id)
+    session.exec(delete(Visit).where(Visit.client_id.in_(client_ids)))
+    session.exec(delete(PlanInstance).where(PlanInstance.client_group_id == group.id))
+    session.exec(delete(Client).where(Client.group_id == group.id))
+    session.exec(delete(ClientGroup).where(ClientGroup.id == group.id))
+    session.exec(delete(Plan).where(Plan.name == MARKER))
+    session.commit()
+
+
+def measure(fn: Callable[[], bytes], repeat: int) -> tuple[float, int]:
+    size = len(fn())
+    timings: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--page", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        group = seed(session, args.rows)
+        try:
+            visits = select(Visit).join(Client).where(Client.group_id == group.id).limit(args.page)
+            instances = (
+                select(PlanInstance).where(PlanInstance.client_group_id == group.id)
+                .order_by(desc(PlanInstance.created_at)).limit(args.page)
+            )
+            nested = selectinload(PlanInstance.client_group)
+            cases = [
+                ("/admin/clients", Client, ClientPublic, "id,full_name",
+                 select(Client).where(Client.group_id == group.id).limit(args.page), []),
+                ("/admin/all-visits", Visit, VisitPublic, "id,client_id,check_in", visits, []),
+                ("plan-instances", PlanInstance, PlanInstancePublic, "id,plan.name,is_active",
+                 instances, [selectinload(PlanInstance.plan), nested.selectinload(ClientGroup.clients),
+                             nested.selectinload(ClientGroup.subscriptions),
+                             nested.selectinload(ClientGroup.reservations),
+                             nested.selectinload(ClientGroup.admins)]),
+            ]
+            logger.info(
+                f"{'endpoint':<18} {'fields':<24} {'full ms':>8} {'fields ms':>10} "
+                f"{'full KB':>8} {'fields KB':>10}"
+            )
+            for name, model, schema, fields, statement, options in cases:
+                projection = parse_fields(fields, model, schema)
+
+                def full() -> bytes:
+                    session.expunge_all()  # each request starts with an empty session
+                    rows = session.exec(statement.options(*options)).all()
+                    return rows_response(rows, schema).body
+
+                def sparse() -> bytes:
+                    session.expunge_all()
+                    return projection_response(session, statement, projection).body
+
+                full_ms, full_size = measure(full, args.repeat)
+                sparse_ms, sparse_size = measure(sparse, args.repeat)
+                logger.info(
+                    f"{name:<18} {fields:<24} {full_ms:>8.2f} {sparse_ms:>10.2f} "
+                    f"{full_size / 1024:>8.1f} {sparse_size / 1024:>10.1f}"
+                )
+        finally:
+            session.rollback()
+            cleanup(session, group)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Cold-start benchmark for the API process.
+
+Imports `app.main` in fresh interpreters, the same work a gunicorn worker does
+before it can take traffic, and reports the median wall time together with the
+slowest imports from `python -X importtime`. Exits non-zero when the median is
+over budget or when a dependency that should load lazily is imported at startup.
+
+    python -m app.benchmarks.startup --runs 5 --budget-ms 2000
+"""
+import argparse
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import List, NamedTuple, Optional
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
+
+TARGET = "app.main"
+# Cold-start budget for importing app.main, in milliseconds
+DEFAULT_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", 2000))
+# Only the routes that need these import them
+LAZY_MODULES = ("google.generativeai", "sentry_sdk", "qrcode", "PIL", "emails")
+
+
+class ImportTiming(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(output: str) -> List[ImportTiming]:
+    """Parse the `import time:` lines that -X importtime writes to stderr."""
+    timings = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # column header
+        name = fields[2].rstrip()
+        stripped = name.lstrip()
+        timings.append(ImportTiming(
+            module=stripped,
+            self_us=int(fields[0]),
+            cumulative_us=int(fields[1]),
+            depth=(len(name) - len(stripped) - 1) // 2,
+        ))
+    return timings
+
+
+def _run(args: List[str]) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args], capture_output=True, text=True, check=True
+    )
+
+
+def measure_cold_start(runs: int = 5, target: str = TARGET) -> List[float]:
+    """Wall time in milliseconds to import `target` in `runs` fresh interpreters."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        _run(["-c", f"import {target}"])
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def profile_imports(target: str = TARGET) -> List[ImportTiming]:
+    return parse_importtime(_run(["-X", "importtime", "-c", f"import {target}"]).stderr)
+
+
+def eager_lazy_modules(timings: List[ImportTiming]) -> List[str]:
+    loaded = {t.module for t in timings}
+    return [m for m in LAZY_MODULES if m in loaded]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    args = parser.parse_args(argv)
+
+    timings = profile_imports()
+    logger.info(f"Slowest imports for {TARGET} (cumulative / self, ms):")
+    for t in sorted(timings, key=lambda t: t.cumulative_us, reverse=True)[: args.top]:
+        logger.info(f"  {t.cumulative_us / 1000:8.1f} {t.self_us / 1000:8.1f}  {t.module}")
+
+    wall = measure_cold_start(args.runs)
+    median = statistics.median(wall)
+    logger.info(
+        f"Cold start: median {median:.0f} ms, min {min(wall):.0f} ms, "
+        f"max {max(wall):.0f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)"
+    )
+
+    failed = False
+    eager = eager_lazy_modules(timings)
+    if eager:
+        logger.error(f"Imported at startup but should be lazy: {', '.join(eager)}")
+        failed = True
+    if median > args.budget_ms:
+        logger.error(f"Cold start is over budget by {median - args.budget_ms:.0f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,474 @@
+"""
+Fill the database with a realistic, seeded volume of client data.
+
+Generates families of 1-5 (one client group each, with clients and QR codes),
+subscriptions, plan instances with their payments and tokens, visits and
+reservations. Visits lean towards weekends and the after-work hours, plan
+purchases and payments peak in January and mid-year, and how often a
+client visits follows a long-tailed distribution. Rows are sampled with
+NumPy in shards of `--shard-size` families and written with COPY, one
+transaction per shard, by `--workers` processes.
+
+The output depends only on `--seed`, `--families`, `--shard-size` and
+`--end-date`: every shard draws from its own seed, and ids come from the
+same random stream, so the same arguments give the same rows whatever the
+number of workers. Group names start with "synthetic-<seed>-", which is how
+`--delete` finds them again.
+
+    python -m app.benchmarks.synthetic_data --families 100000 --workers 8 --seed 7
+    python -m app.benchmarks.synthetic_data --seed 7 --delete
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import time
+import uuid
+from datetime import date
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+import psycopg
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlmodel import Session
+
+from app.core.db import engine
+from app.old_models import Plan
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
+
+DEFAULT_END_DATE = "2025-12-31"
+WINDOW_DAYS = 365
+NULL = "\\N"
+
+FAMILY_SIZES = np.arange(1, 6)
+FAMILY_SIZE_P = np.array([0.30, 0.27, 0.22, 0.14, 0.07])
+# Plan purchases by month: New Year resolutions and the mid-year holidays
+MONTH_WEIGHTS = np.array([1.6, 1.2, 1.0, 0.9, 0.9, 1.3, 1.4, 1.1, 1.0, 0.9, 0.8, 1.1])
+WEEKEND_WEIGHT = 2.5
+MEAN_VISITS_PER_CLIENT = 24.0
+FIRST_NAMES = np.array([
+    "Ana", "Andrés", "Camila", "Carlos", "Daniela", "David", "Diego", "Felipe", "Gabriela", "Isabella",
+    "Juan", "Julián", "Laura", "Lucía", "María", "Mateo", "Natalia", "Santiago", "Sofía", "Valentina",
+])
+LAST_NAMES = np.array([
+    "Álvarez", "Castro", "Díaz", "Gómez", "González", "Hernández", "Jiménez", "López", "Martínez",
+    "Moreno", "Muñoz", "Ortiz", "Pérez", "Ramírez", "Restrepo", "Rodríguez", "Rojas", "Sánchez",
+    "Torres", "Vargas",
+])
+PAYMENT_METHODS = np.array(["credit_card", "pse", "cash", "nequi"])
+PAYMENT_STATUSES = np.array(["completed", "pending", "failed", "refunded"])
+PAYMENT_STATUS_P = np.array([0.90, 0.04, 0.05, 0.01])
+RESERVATION_STATUSES = np.array(["completed", "confirmed", "pending", "cancelled"])
+RESERVATION_STATUS_P = np.array([0.6, 0.2, 0.1, 0.1])
+
+
+class PlanSpec(NamedTuple):
+    name: str
+    price: float
+    duration_days: int
+    entries: int  # 0 for unlimited
+    weight: float
+
+
+PLANS = [
+    PlanSpec("Monthly pass", 120_000.0, 30, 0, 0.55),
+    PlanSpec("10-entry card", 90_000.0, 90, 10, 0.30),
+    PlanSpec("Day pass", 15_000.0, 1, 1, 0.15),
+]
+
+# Columns per table, in the order the generator emits them; tables in FK order
+COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "clientgroup": ("id", "name", "created_at"),
+    "client": (
+        "id", "full_name", "email", "phone", "is_active", "is_child", "qr_code", "identification",
+        "user_id", "group_id", "created_at", "updated_at",
+    ),
+    "qrcode": ("id", "client_id"),
+    "subscription": (
+        "id", "client_group_id", "plan_id", "start_date", "end_date", "remaining_time",
+        "remaining_classes", "is_active", "total_cost",
+    ),
+    "planinstance": (
+        "id", "client_group_id", "plan_id", "start_date", "end_date", "created_at", "is_active",
+        "total_cost", "paid_amount", "remaining_entries", "remaining_limits", "purchased_addons",
+    ),
+    "plantoken": (
+        "id", "plan_id", "plan_instance_id", "token_value", "uses_count", "max_uses", "is_active",
+        "expires_at", "created_at",
+    ),
+    "visit": (
+        "id", "client_id", "check_in", "check_out", "checked_out_by", "duration", "subscription_id",
+        "plan_instance_id", "notes", "details",
+    ),
+    "payment": (
+        "id", "client_group_id", "amount", "status", "payment_method", "transaction_id", "created_at",
+        "plan_id", "plan_instance_id", "purchased_addons",
+    ),
+    "reservation": (
+        "id", "client_group_id", "date", "duration_hours", "status", "created_at", "subscription_id",
+        "client_amount", "details",
+    ),
+}
+
+
+def plan_ids(seed: int) -> List[str]:
+    return [str(uuid.uuid5(uuid.NAMESPACE_URL, f"synthetic/{seed}/{p.name}")) for p in PLANS]
+
+
+def _uuids(rng: np.random.Generator, n: int) -> np.ndarray:
+    """`n` version-4 UUID strings drawn from `rng`."""
+    raw = rng.integers(0, 256, size=(n, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    hexed = raw.tobytes().hex()
+    return np.array([
+        f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+        for h in (hexed[i:i + 32] for i in range(0, len(hexed), 32))
+    ], dtype=object)
+
+
+def _references(ids: np.ndarray) -> np.ndarray:
+    """Unique "syn-..." strings for the text-keyed columns (transaction ids, token values)."""
+    return np.array(["syn-" + i.replace("-", "") for i in ids], dtype=object)
+
+
+def _timestamps(start: np.datetime64, seconds: np.ndarray) -> np.ndarray:
+    return np.datetime_as_string(start + seconds.astype("timedelta64[s]"), unit="s").astype(object)
+
+
+def _nullable(values: np.ndarray, present: np.ndarray) -> np.ndarray:
+    return np.where(present, values.astype(str).astype(object), NULL)
+
+
+def _bools(values: np.ndarray) -> np.ndarray:
+    return np.where(values, "t", "f").astype(object)
+
+
+class Window(NamedTuple):
+    start: np.datetime64  # midnight of the first day
+    days: int
+    purchase_p: np.ndarray  # probability of each day for plan purchases
+    visit_p: np.ndarray  # probability of each day for visits and reservations
+    weekend: np.ndarray  # bool per day
+
+
+def make_window(end_date: str, days: int = WINDOW_DAYS) -> Window:
+    start = np.datetime64(end_date, "D") - np.timedelta64(days - 1, "D")
+    day = start + np.arange(days).astype("timedelta64[D]")
+    month = day.astype("datetime64[M]").astype(int) % 12
+    weekend = ((day.astype(int) + 3) % 7) >= 5  # 1970-01-01 was a Thursday
+    purchase = MONTH_WEIGHTS[month]
+    # Visits follow the week first and the season much less
+    visit = np.where(weekend, WEEKEND_WEIGHT, 1.0) * np.sqrt(purchase)
+    return Window(start.astype("datetime64[s]"), days, purchase / purchase.sum(), visit / visit.sum(), weekend)
+
+
+def generate_shard(seed: int, shard: int, families: int, first_family: int, window: Window) -> Dict[str, bytes]:
+    """COPY text for every table, for families first_family .. first_family + families - 1."""
+    rng = np.random.default_rng(np.random.SeedSequence([seed, shard]))
+    plans = plan_ids(seed)
+    plan_price = np.array([p.price for p in PLANS])
+    plan_days = np.array([p.duration_days for p in PLANS])
+    plan_entries = np.array([p.entries for p in PLANS])
+    plan_p = np.array([p.weight for p in PLANS])
+    day_seconds = 86_400
+    window_end = window.days * day_seconds
+    tables: Dict[str, List[np.ndarray]] = {}
+
+    # Groups: one per family
+    group_id = _uuids(rng, families)
+    family_no = np.arange(first_family, first_family + families)
+    group_created = -rng.integers(0, 730, families) * day_seconds  # up to two years before the window
+    tables["clientgroup"] = [
+        group_id,
+        np.char.add(f"synthetic-{seed}-", family_no.astype(str)).astype(object),
+        _timestamps(window.start, group_created),
+    ]
+
+    # Clients: the first member is an adult, the second one often is too
+    size = rng.choice(FAMILY_SIZES, size=families, p=FAMILY_SIZE_P)
+    family = np.repeat(np.arange(families), size)
+    clients = len(family)
+    member = np.arange(clients) - np.repeat(np.cumsum(size) - size, size)
+    is_child = (member >= 2) | ((member == 1) & (rng.random(clients) < 0.4))
+    client_id = _uuids(rng, clients)
+    qr_id = _uuids(rng, clients)
+    first = FIRST_NAMES[rng.integers(0, len(FIRST_NAMES), clients)]
+    last = LAST_NAMES[rng.integers(0, len(LAST_NAMES), families)][family]
+    full_name = np.char.add(np.char.add(first, " "), last).astype(object)
+    identification = np.char.add(
+        np.char.zfill(family_no[family].astype(str), 9), member.astype(str)
+    ).astype(object)
+    email = np.char.add(np.char.add("client", identification.astype(str)), "@example.com")
+    phone = np.char.add("3", rng.integers(100_000_000, 999_999_999, clients).astype(str))
+    created = _timestamps(window.start, group_created[family])
+    tables["client"] = [
+        client_id,
+        full_name,
+        _nullable(email, ~is_child),
+        _nullable(phone, ~is_child),
+        _bools(rng.random(clients) < 0.97),
+        _bools(is_child),
+        qr_id,
+        identification,
+        np.full(clients, NULL, dtype=object),
+        group_id[family],
+        created,
+        created,
+    ]
+    tables["qrcode"] = [qr_id, client_id]
+
+    # Subscriptions: a monthly pass for most families
+    has_sub = rng.random(families) < 0.6
+    sub_family = np.flatnonzero(has_sub)
+    subs = len(sub_family)
+    sub_id_by_family = np.full(families, NULL, dtype=object)
+    sub_id = _uuids(rng, subs)
+    sub_id_by_family[sub_family] = sub_id
+    sub_start = rng.choice(window.days, size=subs, p=window.purchase_p) * day_seconds
+    sub_end = sub_start + PLANS[0].duration_days * day_seconds
+    tables["subscription"] = [
+        sub_id,
+        group_id[sub_family],
+        np.full(subs, plans[0], dtype=object),
+        _timestamps(window.start, sub_start),
+        _timestamps(window.start, sub_end),
+        np.full(subs, NULL, dtype=object),
+        np.full(subs, NULL, dtype=object),
+        _bools(sub_end >= window_end),
+        np.full(subs, str(PLANS[0].price), dtype=object),
+    ]
+
+    # Plan instances, bought in season
+    per_family = rng.poisson(1.2, families)
+    inst_family = np.repeat(np.arange(families), per_family)
+    instances = len(inst_family)
+    inst_id = _uuids(rng, instances)
+    plan = rng.choice(len(PLANS), size=instances, p=plan_p / plan_p.sum())
+    inst_start = rng.choice(window.days, size=instances, p=window.purchase_p) * day_seconds
+    inst_start = inst_start + rng.integers(8 * 3600, 20 * 3600, instances)
+    inst_end = inst_start + plan_days[plan] * day_seconds
+    inst_active = inst_end >= window_end
+    total = plan_price[plan]
+    partial = rng.random(instances) < 0.12
+    paid = np.where(partial, total / 2, total)
+    has_entries = plan_entries[plan] > 0
+    remaining = rng.integers(0, plan_entries[plan] + 1)
+    tables["planinstance"] = [
+        inst_id,
+        group_id[inst_family],
+        np.array(plans, dtype=object)[plan],
+        _timestamps(window.start, inst_start),
+        _timestamps(window.start, inst_end),
+        _timestamps(window.start, inst_start),
+        _bools(inst_active),
+        total.astype(str).astype(object),
+        paid.astype(str).astype(object),
+        _nullable(remaining, has_entries),
+        np.full(instances, "{}", dtype=object),
+        np.full(instances, "{}", dtype=object),
+    ]
+
+    # Payments: one per instance, shortly after the purchase
+    status = rng.choice(PAYMENT_STATUSES, size=instances, p=PAYMENT_STATUS_P)
+    tables["payment"] = [
+        _uuids(rng, instances),
+        group_id[inst_family],
+        paid.astype(str).astype(object),
+        status.astype(object),
+        rng.choice(PAYMENT_METHODS, size=instances).astype(object),
+        _references(_uuids(rng, instances)),
+        _timestamps(window.start, inst_start + rng.integers(0, 600, instances)),
+        np.array(plans, dtype=object)[plan],
+        inst_id,
+        np.full(instances, "{}", dtype=object),
+    ]
+
+    # Tokens for some instances
+    token_inst = np.flatnonzero(rng.random(instances) < 0.3)
+    tokens = len(token_inst)
+    token_id = _uuids(rng, tokens)
+    max_uses = plan_entries[plan[token_inst]]
+    uses = rng.integers(0, np.maximum(max_uses, 10) + 1)
+    tables["plantoken"] = [
+        token_id,
+        np.array(plans, dtype=object)[plan[token_inst]],
+        inst_id[token_inst],
+        _references(token_id),
+        np.minimum(uses, np.where(max_uses > 0, max_uses, uses)).astype(str).astype(object),
+        _nullable(max_uses, max_uses > 0),
+        _bools(inst_active[token_inst]),
+        _timestamps(window.start, inst_end[token_inst]),
+        _timestamps(window.start, inst_start[token_inst]),
+    ]
+
+    # Visits: a few regulars visit far more than most
+    activity = rng.gamma(0.8, MEAN_VISITS_PER_CLIENT / 0.8, clients)
+    visit_client = np.repeat(np.arange(clients), rng.poisson(activity))
+    visits = len(visit_client)
+    visit_day = rng.choice(window.days, size=visits, p=window.visit_p)
+    weekend = window.weekend[visit_day]
+    hour = np.clip(np.where(weekend, rng.normal(12.5, 2.5, visits), rng.normal(18.0, 2.0, visits)), 6.0, 21.5)
+    check_in = visit_day * day_seconds + (hour * 3600).astype(np.int64)
+    duration = np.clip(rng.lognormal(np.log(1.4), 0.5, visits), 0.25, 6.0)
+    check_out = check_in + (duration * 3600).astype(np.int64)
+    # Visits that started on the last evening are still open
+    open_visit = (check_out >= window_end - 3 * 3600) | ((visit_day == window.days - 1) & (rng.random(visits) < 0.3))
+    visit_family = family[visit_client]
+    first_inst = np.cumsum(per_family) - per_family
+    with_inst = (per_family[visit_family] > 0) & (rng.random(visits) < 0.5)
+    pick = first_inst[visit_family] + (rng.random(visits) * per_family[visit_family]).astype(np.int64)
+    visit_inst = np.where(with_inst, np.append(inst_id, NULL)[np.where(with_inst, pick, instances)], NULL)
+    tables["visit"] = [
+        _uuids(rng, visits),
+        client_id[visit_client],
+        _timestamps(window.start, check_in),
+        np.where(open_visit, NULL, _timestamps(window.start, check_out)),
+        np.full(visits, NULL, dtype=object),
+        np.where(open_visit, NULL, np.round(duration, 2).astype(str).astype(object)),
+        sub_id_by_family[visit_family],
+        visit_inst,
+        np.full(visits, NULL, dtype=object),
+        np.full(visits, "{}", dtype=object),
+    ]
+
+    # Reservations, mostly for weekends
+    per_family = rng.poisson(0.8, families)
+    res_family = np.repeat(np.arange(families), per_family)
+    reservations = len(res_family)
+    res_day = rng.choice(window.days, size=reservations, p=window.visit_p)
+    res_at = res_day * day_seconds + rng.integers(9, 19, reservations) * 3600
+    tables["reservation"] = [
+        _uuids(rng, reservations),
+        group_id[res_family],
+        _timestamps(window.start, res_at),
+        rng.choice([1.0, 2.0, 3.0], size=reservations, p=[0.5, 0.35, 0.15]).astype(str).astype(object),
+        rng.choice(RESERVATION_STATUSES, size=reservations, p=RESERVATION_STATUS_P).astype(object),
+        _timestamps(window.start, res_at - rng.integers(1, 15, reservations) * day_seconds),
+        sub_id_by_family[res_family],
+        (1 + (rng.random(reservations) * size[res_family]).astype(np.int64)).astype(str).astype(object),
+        np.full(reservations, "{}", dtype=object),
+    ]
+
+    return {
+        table: ("\n".join("\t".join(row) for row in zip(*tables[table])) + "\n").encode()
+        if len(tables[table][0]) else b""
+        for table in COLUMNS
+    }
+
+
+def _database_url() -> str:
+    return engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+class Job(NamedTuple):
+    seed: int
+    shard: int
+    families: int
+    first_family: int
+    end_date: str
+
+
+def copy_shard(job: Job) -> Dict[str, int]:
+    """Generate one shard and COPY it in a single transaction. Returns rows per table."""
+    data = generate_shard(job.seed, job.shard, job.families, job.first_family, make_window(job.end_date))
+    with psycopg.connect(_database_url()) as connection:
+        connection.execute("SET synchronous_commit = off")
+        with connection.cursor() as cursor:
+            for table, columns in COLUMNS.items():
+                if data[table]:
+                    with cursor.copy(f"COPY {table} ({', '.join(columns)}) FROM STDIN") as copy:
+                        copy.write(data[table])
+    return {table: body.count(b"\n") for table, body in data.items()}
+
+
+def ensure_plans(seed: int) -> None:
+    rows = [
+        {
+            "id": uuid.UUID(plan_id), "name": f"{spec.name} (synthetic)", "description": spec.name,
+            "price": spec.price, "duration_days": spec.duration_days, "entries": spec.entries or None,
+            "is_active": True, "addons": {}, "limits": {}, "tags": ["synthetic"],
+        }
+        for plan_id, spec in zip(plan_ids(seed), PLANS)
+    ]
+    with Session(engine) as session:
+        session.execute(pg_insert(Plan).values(rows).on_conflict_do_nothing())
+        session.commit()
+
+
+def jobs(seed: int, families: int, shard_size: int, end_date: str) -> List[Job]:
+    return [
+        Job(seed, shard, min(shard_size, families - first), first, end_date)
+        for shard, first in enumerate(range(0, families, shard_size))
+    ]
+
+
+def delete_generated(seed: int) -> None:
+    groups = f"SELECT id FROM clientgroup WHERE name LIKE 'synthetic-{int(seed)}-%'"
+    clients = f"SELECT id FROM client WHERE group_id IN ({groups})"
+    instances = f"SELECT id FROM planinstance WHERE client_group_id IN ({groups})"
+    statements: Sequence[str] = [
+        f"DELETE FROM visit WHERE client_id IN ({clients})",
+        f"DELETE FROM qrcode WHERE client_id IN ({clients})",
+        f"DELETE FROM plantoken WHERE plan_instance_id IN ({instances})",
+        f"DELETE FROM payment WHERE client_group_id IN ({groups})",
+        f"DELETE FROM reservation WHERE client_group_id IN ({groups})",
+        f"DELETE FROM planinstance WHERE client_group_id IN ({groups})",
+        f"DELETE FROM subscription WHERE client_group_id IN ({groups})",
+        f"DELETE FROM client WHERE group_id IN ({groups})",
+        f"DELETE FROM clientgroup WHERE name LIKE 'synthetic-{int(seed)}-%'",
+    ]
+    with psycopg.connect(_database_url()) as connection:
+        for statement in statements:
+            deleted = connection.execute(statement).rowcount
+            logger.info(f"{statement.split()[2]:<14} {deleted:>12,} deleted")
+        connection.execute(
+            "DELETE FROM plan WHERE id = ANY(%s) AND NOT EXISTS "
+            "(SELECT 1 FROM planinstance WHERE plan_id = plan.id) AND NOT EXISTS "
+            "(SELECT 1 FROM subscription WHERE plan_id = plan.id)",
+            ([uuid.UUID(p) for p in plan_ids(seed)],),
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--families", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--shard-size", type=int, default=5_000)
+    parser.add_argument("--end-date", default=DEFAULT_END_DATE, help="last day of the year of activity")
+    parser.add_argument("--no-analyze", action="store_true", help="skip ANALYZE afterwards")
+    parser.add_argument("--delete", action="store_true", help="remove the rows generated with --seed")
+    args = parser.parse_args()
+
+    if args.delete:
+        delete_generated(args.seed)
+        return
+
+    date.fromisoformat(args.end_date)  # fail early on a bad date
+    ensure_plans(args.seed)
+    work = jobs(args.seed, args.families, args.shard_size, args.end_date)
+    totals = {table: 0 for table in COLUMNS}
+    start = time.perf_counter()
+    with multiprocessing.get_context("spawn").Pool(args.workers) as pool:
+        for done, rows in enumerate(pool.imap_unordered(copy_shard, work), start=1):
+            for table, count in rows.items():
+                totals[table] += count
+            logger.info(f"shard {done}/{len(work)}, {sum(totals.values()):,} rows")
+    elapsed = time.perf_counter() - start
+
+    if not args.no_analyze:
+        with psycopg.connect(_database_url(), autocommit=True) as connection:
+            for table in COLUMNS:
+                connection.execute(f"ANALYZE {table}")
+
+    for table, count in totals.items():
+        logger.info(f"{table:<14} {count:>12,}")
+    total = sum(totals.values())
+    logger.info(f"{total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
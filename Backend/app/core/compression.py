@@ -0,0 +1,246 @@
+import threading
+import zlib
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+DEFAULT_CONTENT_TYPES = frozenset({
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "text/csv",
+    "text/html",
+    "text/plain",
+})
+
+
+def choose_encoding(accept_encoding: str, available: Tuple[str, ...]) -> Optional[str]:
+    """
+    Pick the best encoding from an Accept-Encoding header.
+
+    Follows the q-values the client sent and breaks ties by the order of
+    `available`; `*` matches any available encoding. Returns None for identity.
+    """
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name:
+            weights[name.strip()] = q
+
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=brotli_quality)
+        else:
+            # wbits=31 writes a gzip header and trailer
+            self._gz = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, flush: bool) -> bytes:
+        # flush=True pushes out everything so far, so each streamed chunk reaches the client
+        if self.encoding == "br":
+            out = self._br.process(data)
+            return out + self._br.flush() if flush else out
+        out = self._gz.compress(data)
+        return out + self._gz.flush(zlib.Z_SYNC_FLUSH) if flush else out
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._br.finish()
+        return self._gz.flush(zlib.Z_FINISH)
+
+
+class CompressionStats:
+    """
+    Bytes before and after compression, per route template.
+
+    Counters live in the memory of the worker process that served the
+    response and start from zero when it restarts.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._routes: Dict[str, Dict[str, int]] = {}
+
+    def record(self, route: str, encoding: Optional[str], original: int, sent: int) -> None:
+        with self._lock:
+            entry = self._routes.setdefault(
+                route, {"responses": 0, "compressed": 0, "bytes_original": 0, "bytes_sent": 0}
+            )
+            entry["responses"] += 1
+            entry["compressed"] += 1 if encoding else 0
+            entry["bytes_original"] += original
+            entry["bytes_sent"] += sent
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {
+                route: {**entry, "bytes_saved": entry["bytes_original"] - entry["bytes_sent"]}
+                for route, entry in self._routes.items()
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+
+compression_stats = CompressionStats()
+
+
+def route_name(scope: Scope) -> str:
+    # Routing has already filled in scope["route"] by the time the response starts
+    route = scope.get("route")
+    return getattr(route, "path_format", None) or getattr(route, "path", None) or "unmatched"
+
+
+class CompressionMiddleware:
+    """
+    Negotiated brotli/gzip compression for API responses.
+
+    Only content types in `content_types` are compressed. Complete responses
+    below `minimum_size` bytes are sent as is. Streamed responses (more_body)
+    are compressed chunk by chunk and flushed after each one, so exports and
+    other streams keep arriving incrementally.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        content_types: FrozenSet[str] = DEFAULT_CONTENT_TYPES,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        stats: CompressionStats = compression_stats,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.content_types = content_types
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.stats = stats
+        self.encodings: Tuple[str, ...] = ("br", "gzip")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(
+            Headers(scope=scope).get("accept-encoding", ""), self.encodings
+        )
+        responder = _CompressionResponder(self, scope, send, encoding)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(
+        self,
+        middleware: CompressionMiddleware,
+        scope: Scope,
+        send: Send,
+        encoding: Optional[str],
+    ) -> None:
+        self.middleware = middleware
+        self.scope = scope
+        self._send = send
+        self.encoding = encoding
+        self.start: Optional[Message] = None
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+        self.original = 0
+        self.sent = 0
+
+    def _compressible(self, headers: MutableHeaders) -> bool:
+        content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        return content_type in self.middleware.content_types
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            headers = MutableHeaders(raw=message["headers"])
+            if not self._compressible(headers) or "content-encoding" in headers:
+                self.passthrough = True
+                await self._send(message)
+                return
+            headers.add_vary_header("Accept-Encoding")
+            if self.encoding is None:
+                self.passthrough = True
+                await self._send(message)
+            # Otherwise hold the start message until the first body chunk decides
+            return
+
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        body: bytes = message.get("body", b"")
+        more_body: bool = message.get("more_body", False)
+        self.original += len(body)
+
+        if self.passthrough:
+            self.sent += len(body)
+            await self._send(message)
+            if not more_body:
+                self._record(None)
+            return
+
+        if self.compressor is None:
+            if not more_body and len(body) < self.middleware.minimum_size:
+                # Small complete response: not worth the CPU or the header bytes
+                self.passthrough = True
+                await self._send(self.start)
+                self.sent += len(body)
+                await self._send(message)
+                self._record(None)
+                return
+            self.compressor = _Compressor(
+                self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality
+            )
+            headers = MutableHeaders(raw=self.start["headers"])
+            headers["Content-Encoding"] = self.encoding
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                compressed = self.compressor.compress(body, flush=False) + self.compressor.finish()
+                headers["Content-Length"] = str(len(compressed))
+                await self._send(self.start)
+                await self._send({"type": "http.response.body", "body": compressed})
+                self.sent += len(compressed)
+                self._record(self.encoding)
+                return
+            await self._send(self.start)
+
+        if more_body:
+            chunk = self.compressor.compress(body, flush=True)
+        else:
+            chunk = self.compressor.compress(body, flush=False) + self.compressor.finish()
+        self.sent += len(chunk)
+        await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+        if not more_body:
+            self._record(self.encoding)
+
+    def _record(self, encoding: Optional[str]) -> None:
+        self.middleware.stats.record(route_name(self.scope), encoding, self.original, self.sent)
+
+
+def compression_snapshot() -> List[Dict[str, Any]]:
+    """Per-route compression totals for this worker, biggest savings first."""
+    rows = [{"route": route, **entry} for route, entry in compression_stats.snapshot().items()]
+    return sorted(rows, key=lambda r: r["bytes_saved"], reverse=True)
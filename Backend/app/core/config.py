@@ -46,8 +46,24 @@ class Settings(BaseSettings):
         list[AnyUrl] | str, BeforeValidator(parse_cors)
     ] = []
 
+    # Responses below this many bytes are sent uncompressed
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+
     PROJECT_NAME: str
     SENTRY_DSN: HttpUrl | None = None
+    # When set, /metrics requires "Authorization: Bearer <METRICS_TOKEN>"
+    METRICS_TOKEN: str | None = None
+    # OpenTelemetry export: "otlp" (OTEL_EXPORTER_OTLP_* variables), "console", "file" or "none"
+    TRACING_EXPORTER: Literal["none", "otlp", "console", "file"] = "none"
+    TRACING_SAMPLE_RATIO: float = 1.0
+    TRACING_FILE: str = "traces.jsonl"
+    # Per-request SQL profiling (X-SQL-Profile header, N+1 warnings); on by default in local
+    SQL_PROFILER: bool | None = None
+    # Same-shape statements in one request before they are reported as N+1
+    SQL_PROFILER_REPEAT_THRESHOLD: int = 5
+
     POSTGRES_SERVER: str
     POSTGRES_PORT: int = 5432
     POSTGRES_USER: str
@@ -66,6 +82,13 @@ class Settings(BaseSettings):
             path=self.POSTGRES_DB,
         )
 
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def sql_profiler_enabled(self) -> bool:
+        if self.SQL_PROFILER is None:
+            return self.ENVIRONMENT == "local"
+        return self.SQL_PROFILER
+
     SMTP_TLS: bool = True
     SMTP_SSL: bool = False
     SMTP_PORT: int = 587
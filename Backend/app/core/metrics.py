@@ -0,0 +1,166 @@
+import os
+import time
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Gauge, Histogram, generate_latest, multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.compression import route_name
+
+METRICS_PATH = "/metrics"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+QUERY_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class QueryStats:
+    __slots__ = ("count", "duration")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.duration = 0.0
+
+
+# Set per request by MetricsMiddleware. Sync endpoints and dependencies run in
+# the threadpool with a copy of the context, which still holds this same
+# object, so their queries are counted too. Queries made outside a request
+# (background workers) find None and are skipped.
+_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:  # type: ignore[no-untyped-def]
+    if context is not None and _query_stats.get() is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:  # type: ignore[no-untyped-def]
+    stats = _query_stats.get()
+    started = getattr(context, "_metrics_started", None)
+    if stats is not None and started is not None:
+        stats.count += 1
+        stats.duration += time.perf_counter() - started
+
+
+def track_queries(engine: Engine) -> None:
+    """Count every statement `engine` runs, and its time, against the current request."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def multiprocess_dir() -> Optional[str]:
+    return os.environ.get("PROMETHEUS_MULTIPROC_DIR") or os.environ.get("prometheus_multiproc_dir")
+
+
+class RequestMetrics:
+    """
+    The request and database metrics, registered on `registry`.
+
+    In multiprocess mode (PROMETHEUS_MULTIPROC_DIR set, as under gunicorn)
+    every worker writes its samples to files in that directory and /metrics
+    adds them up, so a scrape sees the whole server whichever worker answers.
+    The in-flight gauge then sums live workers only.
+    """
+
+    def __init__(self, registry: Optional["CollectorRegistry"] = None):
+        kwargs: dict[str, Any] = {"registry": registry} if registry is not None else {}
+        self.registry = registry
+        self.duration = Histogram(
+            "http_request_duration_seconds", "Request latency by route and status",
+            ["method", "route", "status"], buckets=LATENCY_BUCKETS, **kwargs,
+        )
+        self.in_progress = Gauge(
+            "http_requests_in_progress", "Requests being handled",
+            ["method"], multiprocess_mode="livesum", **kwargs,
+        )
+        self.db_queries = Histogram(
+            "http_request_db_queries", "Database statements run per request",
+            ["method", "route"], buckets=QUERY_COUNT_BUCKETS, **kwargs,
+        )
+        self.db_duration = Histogram(
+            "http_request_db_duration_seconds", "Time spent in database statements per request",
+            ["method", "route"], buckets=QUERY_TIME_BUCKETS, **kwargs,
+        )
+
+    def observe(self, method: str, route: str, status: int, elapsed: float, stats: QueryStats) -> None:
+        self.duration.labels(method, route, str(status)).observe(elapsed)
+        self.db_queries.labels(method, route).observe(stats.count)
+        self.db_duration.labels(method, route).observe(stats.duration)
+
+    def render(self) -> bytes:
+        if self.registry is not None:
+            return generate_latest(self.registry)
+        directory = multiprocess_dir()
+        if directory:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry, path=directory)
+            return generate_latest(registry)
+        return generate_latest()
+
+
+request_metrics = RequestMetrics()
+
+
+class MetricsMiddleware:
+    """
+    Records latency, status and database usage for every HTTP request.
+
+    Routes are labelled by their path template (/clients/{client_id}), never
+    the raw path, so label cardinality stays bounded; unmatched paths share
+    one label. Add it last so the timing covers the other middleware too.
+    """
+
+    def __init__(self, app: ASGIApp, metrics: Optional[RequestMetrics] = None) -> None:
+        self.app = app
+        self.metrics = metrics or request_metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] == METRICS_PATH:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stats = QueryStats()
+        token = _query_stats.set(stats)
+        in_progress = self.metrics.in_progress.labels(method)
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_progress.dec()
+            _query_stats.reset(token)
+            self.metrics.observe(method, route_name(scope), status, elapsed, stats)
+
+
+def metrics_endpoint(metrics: Optional[RequestMetrics] = None, token: Optional[str] = None):  # type: ignore[no-untyped-def]
+    """The /metrics handler; with `token` set, scrapes must send it as a bearer token."""
+
+    async def endpoint(request: Request) -> Response:
+        if token and request.headers.get("authorization") != f"Bearer {token}":
+            return PlainTextResponse("Unauthorized", status_code=401)
+        return Response((metrics or request_metrics).render(), media_type=CONTENT_TYPE_LATEST)
+
+    return endpoint
+
+
+def mark_process_dead() -> None:
+    """Drop this worker's live gauge files on shutdown so in-flight counts stay right."""
+    if multiprocess_dir():
+        multiprocess.mark_process_dead(os.getpid())
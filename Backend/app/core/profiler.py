@@ -0,0 +1,211 @@
+import logging
+import os
+import re
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.compression import route_name
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILE_HEADER = "X-SQL-Profile"
+REPEATED_HEADER = "X-SQL-Repeated"
+
+_PARAM = re.compile(r"%\(\w+\)s(::\w+(\[\])?)?|\?|\$\d+")
+_PARAM_LIST = re.compile(r"\?(\s*,\s*\?)+")
+
+
+def statement_shape(statement: str) -> str:
+    """The statement with parameters blanked, so queries differing only in values match."""
+    return _PARAM_LIST.sub("?", _PARAM.sub("?", " ".join(statement.split())))
+
+
+def call_site() -> str:
+    """The innermost frame in app code outside this module, as path:line in function."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(APP_DIR) and filename != __file__:
+            path = os.path.relpath(filename, os.path.dirname(APP_DIR))
+            return f"{path}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+class QueryRecord(NamedTuple):
+    statement: str
+    duration: float
+    call_site: str
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A route ran more statements than its declared query_budget()."""
+
+
+class RequestProfile:
+    """Every statement one request (or capture_queries() block) ran."""
+
+    def __init__(self) -> None:
+        self.queries: List[QueryRecord] = []
+        self.budget: Optional[int] = None
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    @property
+    def duration(self) -> float:
+        return sum(q.duration for q in self.queries)
+
+    def repeated(self, threshold: int) -> List[Tuple[int, str, str]]:
+        """(count, shape, first call site) for shapes run at least `threshold` times, most first."""
+        counts = Counter(statement_shape(q.statement) for q in self.queries)
+        sites = {}
+        for q in self.queries:
+            sites.setdefault(statement_shape(q.statement), q.call_site)
+        return [
+            (count, shape, sites[shape])
+            for shape, count in counts.most_common()
+            if count >= threshold
+        ]
+
+    @property
+    def over_budget(self) -> bool:
+        return self.budget is not None and self.count > self.budget
+
+    def summary(self, threshold: int) -> str:
+        parts = [
+            f"queries={self.count}",
+            f"time_ms={self.duration * 1000:.1f}",
+            f"repeated={len(self.repeated(threshold))}",
+        ]
+        if self.budget is not None:
+            parts.append(f"budget={self.budget}")
+        return "; ".join(parts)
+
+
+_profile: ContextVar[Optional[RequestProfile]] = ContextVar("sql_profile", default=None)
+
+
+class SQLProfiler:
+    """
+    Development-only capture of every SQL statement, per request.
+
+    install() adds engine listeners that record each statement with its
+    duration and the app code that issued it. Lazy relationship loads in a
+    loop show up as one statement shape repeated many times (N+1); those
+    are logged with their call site once `repeat_threshold` is reached.
+    Routes declare how many statements they should need with query_budget();
+    with `strict` on, as the test suite sets it, going over raises
+    QueryBudgetExceeded so the test fails.
+    """
+
+    def __init__(self, repeat_threshold: int = 5, strict: bool = False):
+        self.repeat_threshold = repeat_threshold
+        self.strict = strict
+
+    def install(self, engine: Engine) -> None:
+        if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+            event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+    def report(self, profile: RequestProfile, label: str) -> None:
+        for count, shape, site in profile.repeated(self.repeat_threshold):
+            logger.warning("Possible N+1 in %s: %d x %.200s (first at %s)", label, count, shape, site)
+        if profile.over_budget:
+            message = f"{label} ran {profile.count} queries, over its budget of {profile.budget}"
+            logger.warning(message)
+            if self.strict:
+                raise QueryBudgetExceeded(message)
+
+
+sql_profiler = SQLProfiler()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:  # type: ignore[no-untyped-def]
+    if context is not None and _profile.get() is not None:
+        context._profiler_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:  # type: ignore[no-untyped-def]
+    profile = _profile.get()
+    started = getattr(context, "_profiler_started", None)
+    if profile is not None and started is not None:
+        profile.queries.append(QueryRecord(statement, time.perf_counter() - started, call_site()))
+
+
+@contextmanager
+def capture_queries() -> Iterator[RequestProfile]:
+    """Profile the statements run inside the block, e.g. to hold a service to a query count in tests."""
+    profile = RequestProfile()
+    token = _profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _profile.reset(token)
+
+
+def query_budget(max_queries: int) -> Callable[[], None]:
+    """
+    Route dependency declaring how many statements the route should need:
+
+        @router.get("/...", dependencies=[Depends(query_budget(5))])
+
+    Does nothing unless the profiler is on.
+    """
+    def dependency() -> None:
+        profile = _profile.get()
+        if profile is not None:
+            profile.budget = max_queries
+    return dependency
+
+
+class SQLProfilerMiddleware:
+    """
+    Profiles each HTTP request and reports it in the response headers.
+
+    X-SQL-Profile carries the statement count, total time, the number of
+    repeated shapes and the budget, if any; X-SQL-Repeated names the most
+    repeated shape's call site. Both reflect the statements run before the
+    response started, which for regular (non-streamed) responses is all of
+    them. Budgets and N+1 are checked once the response has been sent.
+    """
+
+    def __init__(self, app: ASGIApp, profiler: SQLProfiler = sql_profiler) -> None:
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+        threshold = self.profiler.repeat_threshold
+
+        async def send_with_profile(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers[PROFILE_HEADER] = profile.summary(threshold)
+                repeated = profile.repeated(threshold)
+                if repeated:
+                    count, _, site = repeated[0]
+                    headers[REPEATED_HEADER] = f"{count}x {site}"
+            await send(message)
+
+        token = _profile.set(profile)
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            _profile.reset(token)
+        self.profiler.report(profile, f"{scope['method']} {route_name(scope)}")
@@ -0,0 +1,101 @@
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+from opentelemetry import trace
+from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
+from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+TRACER_NAME = "app"
+# Scrapes and probes would otherwise be most of the traces
+EXCLUDED_URLS = "metrics,health-check"
+
+_provider: Any = None
+
+
+def _tracer() -> Any:
+    return trace.get_tracer(TRACER_NAME)
+
+
+@contextmanager
+def span(name: str, attributes: Optional[dict] = None) -> Iterator[Any]:
+    """
+    A child span of whatever is current, for work the instrumentations don't
+    see (SMTP, Gemini). Until setup_tracing() runs it is a no-op span.
+    """
+    with _tracer().start_as_current_span(name, attributes=_attributes(attributes)) as current:
+        yield current
+
+
+def start_span(name: str, attributes: Optional[dict] = None) -> Any:
+    """
+    A span the caller ends itself, for work spread over a generator's yields,
+    where entering and leaving a current span would cross contexts.
+    """
+    return _tracer().start_span(name, attributes=_attributes(attributes))
+
+
+def _attributes(attributes: Optional[dict]) -> dict:
+    return {key: value for key, value in (attributes or {}).items() if value is not None}
+
+
+def _exporter(exporter: str, file_path: str) -> Any:
+    if exporter == "otlp":
+        # Endpoint, headers and so on come from the standard OTEL_EXPORTER_OTLP_* variables
+        return OTLPSpanExporter()
+    if exporter == "file":
+        # One JSON span per line, for CI artifacts
+        out = open(file_path, "a", buffering=1)
+        return ConsoleSpanExporter(out=out, formatter=lambda s: s.to_json(indent=None) + "\n")
+    return ConsoleSpanExporter()
+
+
+def setup_tracing(
+    app: Any,
+    engine: Any,
+    *,
+    service_name: str,
+    environment: str,
+    exporter: str,
+    sample_ratio: float = 1.0,
+    file_path: str = "traces.jsonl",
+) -> bool:
+    """
+    Install OpenTelemetry for FastAPI, SQLAlchemy and httpx and export spans.
+
+    `exporter` is "otlp", "console" or "file"; anything else leaves tracing
+    off. Traces are sampled at `sample_ratio`, and children follow their
+    parent's decision, so a sampled request keeps all its DB and outbound
+    spans. Returns whether tracing was installed.
+    """
+    global _provider
+    if exporter not in ("otlp", "console", "file"):
+        return False
+
+    _provider = TracerProvider(
+        resource=Resource.create({"service.name": service_name, "deployment.environment": environment}),
+        sampler=ParentBased(TraceIdRatioBased(sample_ratio)),
+    )
+    _provider.add_span_processor(BatchSpanProcessor(_exporter(exporter, file_path)))
+    trace.set_tracer_provider(_provider)
+
+    FastAPIInstrumentor.instrument_app(app, tracer_provider=_provider, excluded_urls=EXCLUDED_URLS)
+    SQLAlchemyInstrumentor().instrument(engine=engine, tracer_provider=_provider)
+    HTTPXClientInstrumentor().instrument(tracer_provider=_provider)
+    return True
+
+
+def shutdown_tracing() -> None:
+    """Export what is still buffered; called when the worker stops."""
+    if _provider is not None:
+        _provider.shutdown()
+
+
+def record_exception(current: Any, error: BaseException) -> None:
+    current.record_exception(error)
+    current.set_status(trace.Status(trace.StatusCode.ERROR, str(error)))
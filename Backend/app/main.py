@@ -1,10 +1,25 @@
-import sentry_sdk
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.routing import APIRoute
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
+from app.core.db import engine
+from app.core.metrics import (
+    METRICS_PATH,
+    MetricsMiddleware,
+    mark_process_dead,
+    metrics_endpoint,
+    track_queries,
+)
+from app.core.profiler import SQLProfilerMiddleware, sql_profiler
+from app.core.tracing import setup_tracing, shutdown_tracing
+from app.services.audit import audit_log
+from app.services.notifications import hub as notification_hub
+from app.services.payment_webhooks import worker as payment_webhook_worker
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
@@ -12,16 +27,33 @@ def custom_generate_unique_id(route: APIRoute) -> str:
 
 
 if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
+    import sentry_sdk
+
     sentry_sdk.init(dsn=str(settings.SENTRY_DSN), enable_tracing=True)
 
 print(f"Starting in {settings.ENVIRONMENT}")
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    payment_webhook_worker.start()
+    audit_log.start()
+    notification_hub.start()
+    yield
+    notification_hub.stop()
+    audit_log.stop()
+    payment_webhook_worker.stop()
+    mark_process_dead()
+    shutdown_tracing()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json" if settings.ENVIRONMENT == "local" else None,
     docs_url="/docs" if settings.ENVIRONMENT == "local" else None,
     redoc_url="/redoc" if settings.ENVIRONMENT == "local" else None,
     generate_unique_id_function=custom_generate_unique_id,
+    lifespan=lifespan,
 )
 
 # Set all CORS enabled origins
@@ -36,4 +68,31 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_headers=["*"],
     )
 
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+)
+
+if settings.sql_profiler_enabled:
+    sql_profiler.repeat_threshold = settings.SQL_PROFILER_REPEAT_THRESHOLD
+    sql_profiler.install(engine)
+    app.add_middleware(SQLProfilerMiddleware)
+
+# Outermost, so request timings include the other middleware
+track_queries(engine)
+app.add_middleware(MetricsMiddleware)
+app.add_route(METRICS_PATH, metrics_endpoint(token=settings.METRICS_TOKEN), include_in_schema=False)
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
+
+setup_tracing(
+    app,
+    engine,
+    service_name=settings.PROJECT_NAME,
+    environment=settings.ENVIRONMENT,
+    exporter=settings.TRACING_EXPORTER,
+    sample_ratio=settings.TRACING_SAMPLE_RATIO,
+    file_path=settings.TRACING_FILE,
+)
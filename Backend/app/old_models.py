@@ -2,11 +2,11 @@ import uuid
 
 from pydantic import EmailStr
 from sqlmodel import Field, Relationship, SQLModel, select, Text
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Literal
 from datetime import datetime
-from sqlalchemy.dialects.postgresql import JSONB, BYTEA
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, BYTEA
 from sqlalchemy_json import mutable_json_type
-from sqlalchemy import Column, ARRAY, String
+from sqlalchemy import Column, Computed, String, UniqueConstraint, Index, text
 from pgvector.sqlalchemy import Vector
 from pydantic import validator
 #Irrelevant ITEMS
@@ -125,6 +125,18 @@ class ClientGroupAdminLink(SQLModel, table=True):
     client_group_id: uuid.UUID = Field(foreign_key="clientgroup.id", primary_key=True)
     admin_id: uuid.UUID = Field(foreign_key="user.id", primary_key=True)
 
+class UserGroupAccess(SQLModel, table=True):
+    """
+    Client groups each user can see: through a Client in the group ("member")
+    or a ClientGroupAdminLink ("admin_link"). Kept up to date by database
+    triggers on client and clientgroupadminlink, so the app only reads it.
+    """
+    user_id: uuid.UUID = Field(foreign_key="user.id", primary_key=True, ondelete="CASCADE")
+    client_group_id: uuid.UUID = Field(
+        foreign_key="clientgroup.id", primary_key=True, index=True, ondelete="CASCADE"
+    )
+    via: str = Field(max_length=20, primary_key=True)
+
 class User(SQLModel, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     email: EmailStr = Field(unique=True, index=True, max_length=255)
@@ -158,6 +170,9 @@ class ClientPublic(SQLModel):
     qr_code: Optional[str]
 
 
+class ClientSearchResult(ClientPublic):
+    identification: Optional[str]
+    rank: float
 
 class ClientCreate(SQLModel):
     identification: str = Field(max_length=255)
@@ -170,6 +185,18 @@ class ClientCreate(SQLModel):
     
  
 
+class FamilySignup(SQLModel):
+    user: UserRegister
+    parent: ClientCreate
+    children: List[ClientCreate] = Field(default_factory=list, max_length=20)
+    group_name: Optional[str] = Field(default=None, max_length=255)
+
+class FamilySignupPublic(SQLModel):
+    user: UserPublic
+    parent: ClientPublic
+    children: List[ClientPublic]
+    client_group_id: uuid.UUID
+
 class ClientUpdate(SQLModel):
     full_name: Optional[str] = Field(default=None, max_length=255)
     email: Optional[EmailStr] = Field(default=None, index=True)
@@ -181,9 +208,24 @@ class ClientUpdate(SQLModel):
 
 
 
+# Accent- and case-folded text that client search matches against (f_unaccent is
+# an IMMUTABLE wrapper around unaccent, created in the same migration)
+CLIENT_SEARCH_TEXT = (
+    "f_unaccent(lower(coalesce(full_name, '') || ' ' || coalesce(email, '') || ' ' "
+    "|| coalesce(identification, '') || ' ' || coalesce(phone, '')))"
+)
+
 class Client(ClientBase, table=True):
+    __table_args__ = (
+        Index("ix_client_user_id_group_id", "user_id", "group_id"),
+        Index("ix_client_search_text", "search_text", postgresql_using="gin",
+              postgresql_ops={"search_text": "gin_trgm_ops"}),
+    )
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     identification: Optional[str] = Field(max_length=255)
+    search_text: Optional[str] = Field(
+        default=None, sa_column=Column(Text, Computed(CLIENT_SEARCH_TEXT, persisted=True))
+    )
     user_id: Optional[uuid.UUID] = Field(default=None, foreign_key="user.id")
     user: Optional["User"] = Relationship(back_populates="client")
     group_id: Optional[uuid.UUID] = Field(default=None, foreign_key="clientgroup.id")
@@ -208,6 +250,20 @@ class ClientGroupPublic(SQLModel):
     reservations: List["Reservation"] 
     admins: List[ClientPublic] 
 
+class GroupClientIds(SQLModel):
+    client_ids: List[uuid.UUID] = Field(min_length=1, max_length=5000)
+
+class GroupClientMove(GroupClientIds):
+    target_group_id: uuid.UUID
+
+class GroupAdminIds(SQLModel):
+    admin_ids: List[uuid.UUID] = Field(min_length=1, max_length=5000)
+
+class BulkMembershipResult(SQLModel):
+    requested: int
+    changed: int
+    unchanged: int
+
 class ClientGroup(SQLModel, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     name:str = Field(max_length=255)
@@ -240,6 +296,10 @@ class PlanUpdate(SQLModel):
     limits: Optional[Dict[str, Any]] = None
     tags: Optional[List[str]] = None
 
+class PlanTagCount(SQLModel):
+    tag: str
+    count: int
+
 class PlanCreate(SQLModel):
     name: str = Field(max_length=255)
     description: str = Field(max_length=1000)
@@ -259,6 +319,10 @@ class PlanPublic(SQLModel):
     duration_hours: Optional[int]
 
 class Plan(SQLModel, table=True):
+    # GIN index serves the tag containment (@>) and overlap (&&) filters
+    __table_args__ = (
+        Index("ix_plan_tags", "tags", postgresql_using="gin"),
+    )
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     name: str = Field(max_length=255)
     description: str = Field(max_length=1000)
@@ -273,7 +337,7 @@ class Plan(SQLModel, table=True):
                          sa_column=Column(mutable_json_type(dbtype=JSONB, nested=True)),
                          description="Limits like max users, time, etc.")
     tags: List[str] = Field(default_factory=list, 
-                         sa_column=Column(ARRAY(String)),
+                         sa_column=Column(ARRAY(String), nullable=False, server_default="{}"),
                          description="List of category tags")
     subscriptions: List["Subscription"] = Relationship(back_populates="plan")
     payments: List["Payment"] = Relationship(back_populates="plan")
@@ -477,16 +541,51 @@ class Visit(SQLModel, table=True):
 class NotificationCreate(SQLModel):
     message: str
     target_client_id: Optional[uuid.UUID] = Field(foreign_key="client.id", default=None)
+    target_group_id: Optional[uuid.UUID] = Field(foreign_key="clientgroup.id", default=None)
     is_broadcast: bool = False
 
 class Notification(SQLModel, table=True):
+    __table_args__ = (
+        # Broadcasts are read straight from this table, newest first
+        Index("ix_notification_broadcast_created_at", "created_at", postgresql_where=text("is_broadcast")),
+    )
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     message: str
     created_at: datetime = Field(default_factory=datetime.utcnow)
     created_by: uuid.UUID = Field(foreign_key="user.id")
     target_client_id: Optional[uuid.UUID] = Field(foreign_key="client.id", default=None)
+    target_group_id: Optional[uuid.UUID] = Field(foreign_key="clientgroup.id", default=None)
     is_broadcast: bool = False
 
+class NotificationInbox(SQLModel, table=True):
+    # One row per recipient of a targeted notification, written when it is created
+    __table_args__ = (
+        Index("ix_notificationinbox_client_id_created_at", "client_id", "created_at"),
+    )
+    client_id: uuid.UUID = Field(foreign_key="client.id", primary_key=True)
+    notification_id: uuid.UUID = Field(foreign_key="notification.id", primary_key=True)
+    created_at: datetime  # copied from the notification so the inbox scan never joins to sort
+
+class NotificationReadCursor(SQLModel, table=True):
+    # Everything created up to read_until counts as read for the client
+    client_id: uuid.UUID = Field(foreign_key="client.id", primary_key=True)
+    read_until: datetime
+
+class NotificationPublic(SQLModel):
+    id: uuid.UUID
+    message: str
+    created_at: datetime
+    is_broadcast: bool
+    is_read: bool = False
+
+class NotificationFeed(SQLModel):
+    data: List[NotificationPublic]
+    unread: int
+    read_until: Optional[datetime] = None
+
+class NotificationMarkRead(SQLModel):
+    until: Optional[datetime] = None  # defaults to now
+
 class PaymentCreate(SQLModel):
     client_id: uuid.UUID
     amount: float
@@ -515,6 +614,24 @@ class Payment(SQLModel, table=True):
     plan: Optional["Plan"] = Relationship(back_populates="payments")
     plan_instance: Optional["PlanInstance"] = Relationship(back_populates="payments")
 
+class PaymentWebhookEvent(SQLModel, table=True):
+    # Raw gateway notifications, stored before any processing so retries can be deduplicated
+    __table_args__ = (
+        UniqueConstraint("transaction_id", "status"),
+        # Reconciliation finds a payment's ePayco reference through its invoice (the payment id)
+        Index("ix_paymentwebhookevent_invoice", text("(payload ->> 'x_id_invoice')")),
+    )
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    provider: str = Field(default="epayco", max_length=20)
+    transaction_id: str = Field(max_length=255, index=True)
+    status: str = Field(max_length=20)  # gateway response code, e.g. 1 accepted, 3 pending
+    payload: Dict[str, Any] = Field(
+        default_factory=dict, sa_column=Column(mutable_json_type(dbtype=JSONB))
+    )
+    received_at: datetime = Field(default_factory=datetime.utcnow)
+    processed_at: Optional[datetime] = Field(default=None, index=True)
+    error: Optional[str] = Field(default=None, max_length=1000)
+
 class AdminUser(SQLModel, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     user_id: uuid.UUID = Field(foreign_key="user.id", unique=True)
@@ -523,6 +640,12 @@ class AdminUser(SQLModel, table=True):
     actions: List["AdminAction"] = Relationship(back_populates="admin")
 
 class AdminAction(SQLModel, table=True):
+    __table_args__ = (
+        # Rows arrive in time order, so a BRIN index covers time-range scans at a tiny size
+        Index("ix_adminaction_timestamp_brin", "timestamp", postgresql_using="brin"),
+        Index("ix_adminaction_admin_id_timestamp", "admin_id", "timestamp"),
+        Index("ix_adminaction_entity", "entity_type", "entity_id"),
+    )
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     admin_id: uuid.UUID = Field(foreign_key="adminuser.id")
     action_type: str = Field(max_length=50)  # create, update, delete, view
@@ -532,6 +655,36 @@ class AdminAction(SQLModel, table=True):
     timestamp: datetime = Field(default_factory=datetime.utcnow)
     admin: AdminUser = Relationship(back_populates="actions")
 
+class AdminActionPublic(SQLModel):
+    id: uuid.UUID
+    admin_id: uuid.UUID
+    action_type: str
+    entity_type: str
+    entity_id: uuid.UUID
+    description: str
+    timestamp: datetime
+
+class BatchOperation(SQLModel):
+    method: Literal["GET", "POST", "PUT", "PATCH", "DELETE"] = "GET"
+    path: str  # relative to /admin, e.g. "/plans/{plan_id}/tokens"
+    params: Dict[str, Any] = Field(default_factory=dict)
+    body: Optional[Any] = None
+
+class BatchRequest(SQLModel):
+    operations: List[BatchOperation] = Field(min_length=1, max_length=50)
+    # atomic: one failure rolls back everything; best_effort: only the failed operation is undone
+    mode: Literal["atomic", "best_effort"] = "atomic"
+
+class BatchOperationResult(SQLModel):
+    index: int
+    status: int
+    body: Optional[Any] = None
+
+class BatchResponse(SQLModel):
+    mode: str
+    committed: bool
+    results: List[BatchOperationResult]
+
 class QRCode(SQLModel, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     client_id: uuid.UUID = Field(foreign_key="client.id")
@@ -586,16 +739,46 @@ class PlanTokenUse(SQLModel, table=True):
 
 # Database model to save forms in JSON format
 class Form(SQLModel, table=True):
+    # GIN index serves containment (@>) and jsonpath (@?) filters on form_data
+    __table_args__ = (
+        Index("ix_form_form_data", "form_data", postgresql_using="gin"),
+    )
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     form_type: str = Field(index=True)
     created_at: datetime = Field(default_factory=datetime.utcnow)
-    form_data: str = Field(default="{}") # Stored as string
+    form_data: Dict[str, Any] = Field(
+        default_factory=dict, sa_column=Column(mutable_json_type(dbtype=JSONB, nested=True), nullable=False)
+    )
     user_id: uuid.UUID = Field(foreign_key="user.id", index=True)
 
 class FormSubmission(SQLModel):
     form_type: str
     form_data: Dict[str, Any]
 
+class FormFilter(SQLModel):
+    path: str = Field(description="Dotted path inside form_data, e.g. 'budget' or 'contact.city'")
+    op: Literal["eq", "ne", "gt", "gte", "lt", "lte", "in", "exists"] = "eq"
+    value: Optional[Any] = None
+
+class FormAggregate(SQLModel):
+    func: Literal["count", "sum", "avg", "min", "max"] = "count"
+    path: Optional[str] = Field(default=None, description="Numeric field to aggregate; not needed for count")
+    group_by: Optional[str] = None
+
+class FormQuery(SQLModel):
+    form_type: Optional[str] = None
+    filters: List[FormFilter] = Field(default_factory=list)
+    aggregate: Optional[FormAggregate] = None
+    skip: int = 0
+    limit: int = Field(default=100, le=1000)
+
+class FormPublic(SQLModel):
+    id: uuid.UUID
+    form_type: str
+    created_at: datetime
+    form_data: Dict[str, Any]
+    user_id: uuid.UUID
+
 class SuccessResponse(SQLModel):
     success: bool = True
     message: str
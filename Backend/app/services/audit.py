@@ -0,0 +1,257 @@
+import logging
+import os
+import queue
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import event, insert
+from sqlmodel import Session, desc, select
+
+from app.core.db import engine
+from app.old_models import AdminAction, AdminUser
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", 10_000))
+BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", 500))
+FLUSH_INTERVAL_SECONDS = float(os.getenv("AUDIT_FLUSH_INTERVAL_SECONDS", 2.0))
+
+# Session.info keys: events waiting for the session to commit, and a flag set
+# by callers that commit the real transaction themselves (see /admin/batch)
+PENDING_KEY = "audit_events"
+HOLD_KEY = "audit_hold"
+
+
+class AuditEvent(NamedTuple):
+    user_id: uuid.UUID
+    action_type: str
+    entity_type: str
+    entity_id: uuid.UUID
+    description: str
+    timestamp: datetime
+
+
+class AuditLog:
+    """
+    In-process buffer for AdminAction rows, written by a background thread.
+
+    record() only puts an event on a bounded queue, so routes never wait on
+    the audit INSERT. The thread writes whatever is queued as one multi-row
+    INSERT every `flush_interval` seconds, or as soon as `batch_size` events
+    are waiting. When the queue is full new events are dropped and counted
+    rather than slowing the request down, and so are batches the INSERT
+    failed for. stop() writes what is left.
+
+    Events carry the acting User id; it is mapped to the AdminUser id at
+    write time (cached, admins don't change user), since GetAdminUser hands
+    routes the User.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = QUEUE_SIZE,
+        batch_size: int = BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL_SECONDS,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[AuditEvent]" = queue.Queue(maxsize)
+        self._admin_ids: Dict[uuid.UUID, uuid.UUID] = {}
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.written = 0
+        self.dropped = 0
+
+    def record(
+        self,
+        user_id: uuid.UUID,
+        action_type: str,
+        entity_type: str,
+        entity_id: uuid.UUID,
+        description: str = "",
+    ) -> bool:
+        return self.put(AuditEvent(
+            user_id, action_type, entity_type, entity_id, description[:1000], datetime.utcnow()
+        ))
+
+    def put(self, audit_event: AuditEvent) -> bool:
+        try:
+            self._queue.put_nowait(audit_event)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        if self._queue.qsize() >= self.batch_size:
+            self._wake.set()
+        return True
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="audit-log", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        self._stopping.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def _take(self) -> List[AuditEvent]:
+        events = []
+        while len(events) < self.batch_size:
+            try:
+                events.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return events
+
+    def _resolve_admins(self, session: Session, user_ids: Iterable[uuid.UUID]) -> None:
+        missing = set(user_ids) - self._admin_ids.keys()
+        if missing:
+            rows = session.exec(
+                select(AdminUser.user_id, AdminUser.id).where(AdminUser.user_id.in_(missing))
+            ).all()
+            self._admin_ids.update(rows)
+
+    def write(self, session: Session, events: List[AuditEvent]) -> int:
+        self._resolve_admins(session, (e.user_id for e in events))
+        rows = [
+            {
+                "id": uuid.uuid4(),
+                "admin_id": self._admin_ids[e.user_id],
+                "action_type": e.action_type,
+                "entity_type": e.entity_type,
+                "entity_id": e.entity_id,
+                "description": e.description,
+                "timestamp": e.timestamp,
+            }
+            for e in events
+            if e.user_id in self._admin_ids
+        ]
+        if len(rows) < len(events):
+            logger.warning("Dropped %d audit events from users without an AdminUser", len(events) - len(rows))
+        if rows:
+            session.execute(insert(AdminAction), rows)
+            session.commit()
+        return len(rows)
+
+    def flush(self) -> int:
+        """Write everything queued so far. Returns the number of rows written."""
+        total = 0
+        with self._flush_lock:
+            while True:
+                events = self._take()
+                if not events:
+                    return total
+                try:
+                    with Session(engine) as session:
+                        written = self.write(session, events)
+                except Exception:
+                    logger.exception("Failed to write %d audit events", len(events))
+                    self.dropped += len(events)
+                    continue
+                self.written += written
+                total += written
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        return {"queued": self._queue.qsize(), "written": self.written, "dropped": self.dropped}
+
+
+audit_log = AuditLog()
+
+
+def pending(session: Session) -> List[AuditEvent]:
+    return session.info.setdefault(PENDING_KEY, [])
+
+
+def record(
+    session: Session,
+    user_id: uuid.UUID,
+    action_type: str,
+    entity_type: str,
+    entity_id: uuid.UUID,
+    description: str = "",
+) -> None:
+    """
+    Audit an action done through `session`, once its transaction commits.
+
+    Nothing is logged if the session rolls back instead. Call it before the
+    route's commit.
+    """
+    if not session.in_transaction():
+        # A rollback before any SQL ran has to discard the event too
+        session.begin()
+    pending(session).append(AuditEvent(
+        user_id, action_type, entity_type, entity_id, description[:1000], datetime.utcnow()
+    ))
+
+
+def publish(session: Session) -> None:
+    """Hand the session's pending events to the audit log."""
+    for audit_event in session.info.pop(PENDING_KEY, ()):
+        audit_log.put(audit_event)
+
+
+def discard(session: Session) -> None:
+    session.info.pop(PENDING_KEY, None)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_on_commit(session: Session) -> None:
+    if not session.info.get(HOLD_KEY):
+        publish(session)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_on_rollback(session: Session, previous_transaction: Any) -> None:
+    if not previous_transaction.nested and not session.info.get(HOLD_KEY):
+        discard(session)
+
+
+def query_actions(
+    session: Session,
+    *,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    admin_id: Optional[uuid.UUID] = None,
+    action_type: Optional[str] = None,
+    entity_type: Optional[str] = None,
+    entity_id: Optional[uuid.UUID] = None,
+    limit: int = 100,
+) -> List[AdminAction]:
+    """
+    Audit rows in [start, end), newest first; the last 24 hours by default.
+
+    The time range is served by ix_adminaction_timestamp_brin, or by
+    ix_adminaction_admin_id_timestamp when filtering on an admin. To page,
+    pass the timestamp of the last row seen as the next `end`.
+    """
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(days=1)
+    statement = (
+        select(AdminAction)
+        .where(AdminAction.timestamp >= start)
+        .where(AdminAction.timestamp < end)
+    )
+    if admin_id:
+        statement = statement.where(AdminAction.admin_id == admin_id)
+    if action_type:
+        statement = statement.where(AdminAction.action_type == action_type)
+    if entity_type:
+        statement = statement.where(AdminAction.entity_type == entity_type)
+    if entity_id:
+        statement = statement.where(AdminAction.entity_id == entity_id)
+    return session.exec(statement.order_by(desc(AdminAction.timestamp)).limit(limit)).all()
@@ -0,0 +1,68 @@
+import unicodedata
+from typing import List
+
+from sqlalchemy import case, literal, or_
+from sqlmodel import Session, func, select
+
+from app.old_models import Client, ClientSearchResult
+
+MIN_QUERY_LENGTH = 2
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+
+def normalize(query: str) -> str:
+    """Fold case and accents the same way the search_text column does."""
+    decomposed = unicodedata.normalize("NFKD", query.strip().lower())
+    folded = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(folded.split())
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_clients(session: Session, query: str, limit: int = DEFAULT_LIMIT) -> List[ClientSearchResult]:
+    """
+    Clients matching `query` by name, email, identification or phone.
+
+    Every branch of the WHERE clause can be answered by ix_client_search_text
+    (a pg_trgm GIN index): prefix and substring LIKE for autocomplete, and
+    word similarity (<%) so small typos still find the client. Exact
+    identification, email or phone matches rank first, then names starting
+    with the query, then the closest fuzzy matches.
+    """
+    term = normalize(query)
+    if len(term) < MIN_QUERY_LENGTH:
+        return []
+    limit = max(1, min(limit, MAX_LIMIT))
+    escaped = _escape_like(term)
+    text = Client.search_text
+
+    prefix = text.like(f"{escaped}%")
+    matches = [prefix, text.like(f"% {escaped}%")]
+    if len(term) >= 3:
+        # Shorter terms have no complete trigram to look up
+        matches += [text.like(f"%{escaped}%"), literal(term).op("<%")(text)]
+
+    exact = or_(
+        Client.identification == query.strip(),
+        func.lower(Client.email) == term,
+        Client.phone == query.strip(),
+    )
+    rank = (
+        case((exact, 3.0), else_=0.0)
+        + case((prefix, 2.0), else_=0.0)
+        + func.word_similarity(term, text)
+    ).label("rank")
+
+    statement = (
+        select(Client, rank)
+        .where(or_(*matches))
+        .order_by(rank.desc(), Client.full_name)
+        .limit(limit)
+    )
+    return [
+        ClientSearchResult.model_validate(client, update={"rank": round(score, 4)})
+        for client, score in session.exec(statement).all()
+    ]
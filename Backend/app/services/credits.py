@@ -0,0 +1,218 @@
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+from sqlmodel import Session, select
+
+from app.old_models import Client, Subscription, Visit
+
+# Debits are (subscription_id, seconds_taken) pairs. Subscription.remaining_time
+# is in seconds, as check-out has always subtracted it.
+Debit = Tuple[uuid.UUID, float]
+
+# Where a charged visit records what it drew, which also marks it as settled
+DEBITS_KEY = "time_debits"
+UNCOVERED_KEY = "uncovered_seconds"
+
+
+def allocate_fifo(subscriptions: Iterable[Subscription], seconds: float) -> List[Debit]:
+    """
+    Split `seconds` across timed subscriptions already sorted soonest-expiring first.
+
+    Returns the debits without touching the rows. If the subscriptions hold
+    less than `seconds` in total, every one of them is drained.
+    """
+    debits = []
+    left = seconds
+    for subscription in subscriptions:
+        if left <= 0:
+            break
+        take = min(subscription.remaining_time or 0, left)
+        if take > 0:
+            debits.append((subscription.id, take))
+            left -= take
+    return debits
+
+
+def _lock_subscriptions(
+    session: Session, group_ids: Iterable[uuid.UUID], since: datetime
+) -> List[Subscription]:
+    """Active subscriptions of the groups that had not expired by `since`, locked."""
+    # Soonest expiry first with the id as the tiebreak, so concurrent check-outs
+    # always lock a group's rows in the same order.
+    return list(session.exec(
+        select(Subscription)
+        .where(Subscription.client_group_id.in_(list(group_ids)))
+        .where(Subscription.is_active == True)
+        .where(Subscription.end_date >= since)
+        .order_by(Subscription.end_date, Subscription.id)
+        .with_for_update()
+    ).all())
+
+
+def _usable(subscriptions: Iterable[Subscription], at: datetime) -> List[Subscription]:
+    return [s for s in subscriptions if s.is_active and s.start_date <= at <= s.end_date]
+
+
+def visit_seconds(visit: Visit) -> float:
+    if not visit.check_out:
+        return 0.0
+    return max((visit.check_out - visit.check_in).total_seconds(), 0.0)
+
+
+def is_charged(visit: Visit) -> bool:
+    return DEBITS_KEY in (visit.details or {})
+
+
+def _charge(visit: Visit, pool: List[Subscription], seconds: float) -> List[Debit]:
+    """Draw the visit's time from `pool` (locked, FIFO-ordered) and record it on the visit."""
+    if any(s.remaining_time is None for s in pool):
+        # An unlimited subscription covers the visit; time packs are left alone
+        debits: List[Debit] = []
+        uncovered = 0.0
+    else:
+        debits = allocate_fifo(pool, seconds)
+        by_id = {s.id: s for s in pool}
+        for subscription_id, taken in debits:
+            subscription = by_id[subscription_id]
+            subscription.remaining_time -= taken
+            if subscription.remaining_time <= 0:
+                subscription.remaining_time = 0
+                subscription.is_active = False
+        uncovered = seconds - sum(taken for _, taken in debits)
+
+    details = {**(visit.details or {}), DEBITS_KEY: [[str(s), taken] for s, taken in debits]}
+    if uncovered > 0:
+        details[UNCOVERED_KEY] = uncovered
+    visit.details = details
+    return debits
+
+
+def charge_visit(session: Session, visit: Visit, group_id: uuid.UUID) -> List[Debit]:
+    """
+    Charge a checked-out visit to its group's subscription time and commit.
+
+    The group's usable subscriptions (active, started, not expired when the
+    visit ended) are locked with SELECT ... FOR UPDATE and drawn soonest-
+    expiring first, so two check-outs for the same family cannot spend the
+    same seconds. Subscriptions that reach zero are deactivated. A family
+    short on time still checks out: what could not be covered is kept in the
+    visit's details under "uncovered_seconds". Visits already charged are
+    left alone.
+    """
+    if is_charged(visit):
+        return []
+    locked = _lock_subscriptions(session, [group_id], visit.check_out)
+    debits = _charge(visit, _usable(locked, visit.check_out), visit_seconds(visit))
+    session.add(visit)
+    session.add_all(locked)
+    session.commit()
+    balance_cache.invalidate(group_id)
+    return debits
+
+
+def settle_visits(session: Session, visits: List[Visit]) -> Dict[str, list]:
+    """
+    Charge many checked-out visits in one transaction.
+
+    Groups are resolved in a single query and every affected subscription is
+    locked once. Visits are charged in check-out order against the
+    subscriptions usable when each ended. Visits still open, already charged
+    or whose client has no group are returned in `skipped`.
+    """
+    pending = [v for v in visits if v.check_out and not is_charged(v)]
+    skipped = [v.id for v in visits if not v.check_out or is_charged(v)]
+    if not pending:
+        return {"settled": [], "skipped": skipped}
+
+    group_by_client = dict(
+        session.exec(
+            select(Client.id, Client.group_id).where(Client.id.in_({v.client_id for v in pending}))
+        ).all()
+    )
+    group_ids = {g for g in group_by_client.values() if g is not None}
+    locked = _lock_subscriptions(session, group_ids, min(v.check_out for v in pending)) if group_ids else []
+    pools: Dict[uuid.UUID, List[Subscription]] = defaultdict(list)
+    for subscription in locked:
+        pools[subscription.client_group_id].append(subscription)
+
+    settled = []
+    for visit in sorted(pending, key=lambda v: v.check_out):
+        group_id = group_by_client.get(visit.client_id)
+        if group_id is None:
+            skipped.append(visit.id)
+            continue
+        _charge(visit, _usable(pools[group_id], visit.check_out), visit_seconds(visit))
+        session.add(visit)
+        settled.append(visit.id)
+
+    session.add_all(locked)
+    session.commit()
+    for group_id in group_ids:
+        balance_cache.invalidate(group_id)
+    return {"settled": settled, "skipped": skipped}
+
+
+class Balance(NamedTuple):
+    seconds: float
+    unlimited: bool
+
+
+class BalanceCache:
+    """
+    Per-group subscription time, kept in process memory.
+
+    Entries expire after `ttl` seconds and are dropped as soon as this process
+    charges the group, so the TTL only bounds staleness from other workers.
+    """
+
+    def __init__(self, ttl: float = 60.0, max_entries: int = 10_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict[uuid.UUID, Tuple[float, Balance]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, session: Session, group_id: uuid.UUID) -> Balance:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(group_id)
+            if entry and entry[0] > now:
+                return entry[1]
+
+        at = datetime.utcnow()
+        remaining = session.exec(
+            select(Subscription.remaining_time)
+            .where(Subscription.client_group_id == group_id)
+            .where(Subscription.is_active == True)
+            .where(Subscription.start_date <= at)
+            .where(Subscription.end_date >= at)
+        ).all()
+        balance = Balance(
+            seconds=sum(r for r in remaining if r is not None),
+            unlimited=any(r is None for r in remaining),
+        )
+
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[group_id] = (now + self.ttl, balance)
+        return balance
+
+    def invalidate(self, group_id: uuid.UUID) -> None:
+        with self._lock:
+            self._entries.pop(group_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+balance_cache = BalanceCache()
+
+
+def get_balance(session: Session, group_id: uuid.UUID) -> Balance:
+    """Subscription time a group can still use right now."""
+    return balance_cache.get(session, group_id)
@@ -1,7 +1,16 @@
+import hashlib
+import hmac
+import logging
 import os
 import uuid
 from typing import Optional
 
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
 # In a real implementation, you would use the ePayco SDK or API
 # This is a simplified mock implementation for demonstration purposes
 
@@ -52,18 +61,88 @@ def verify_payment(transaction_id: str) -> dict:
         "date": "2023-08-01T12:00:00Z"
     }
 
+async def fetch_transaction(client: httpx.AsyncClient, ref_payco: str) -> dict:
+    """
+    Look up a transaction on the ePayco validation API by its ePayco reference
+
+    Async counterpart of verify_payment for bulk reconciliation; the caller
+    owns the (pooled) client. `ref_payco` is the x_ref_payco ePayco sent in
+    its notifications, not our transaction_id. The base URL comes from
+    EPAYCO_API_URL.
+    """
+    base_url = os.getenv("EPAYCO_API_URL", "https://secure.epayco.co")
+    response = await client.get(f"{base_url}/validation/v1/reference/{ref_payco}")
+    response.raise_for_status()
+    body = response.json()
+    data = body.get("data") or {}
+    code = str(data.get("x_cod_response", ""))
+    return {
+        "success": bool(body.get("success")),
+        "status": RESPONSE_CODE_STATUS.get(code, "pending"),
+        "transaction_id": data.get("x_transaction_id"),
+        "payment_id": data.get("x_id_invoice"),
+    }
+
+# ePayco x_cod_response codes mapped to Payment.status values
+RESPONSE_CODE_STATUS = {
+    "1": "completed",  # Aceptada
+    "2": "failed",     # Rechazada
+    "3": "pending",    # Pendiente
+    "4": "failed",     # Fallida
+    "6": "refunded",   # Reversada
+    "7": "pending",    # Retenida
+    "8": "failed",     # Iniciada / abandonada
+    "9": "failed",     # Expirada
+    "10": "failed",    # Abandonada
+    "11": "failed",    # Cancelada
+}
+
+
+def verify_signature(webhook_data: dict) -> bool:
+    """
+    Check the x_signature of an ePayco confirmation
+
+    The signature is sha256(cust_id^p_key^x_ref_payco^x_transaction_id^x_amount^x_currency_code).
+    Without EPAYCO_P_CUST_ID_CLIENTE / EPAYCO_P_KEY nothing can be verified:
+    local development accepts every notification, any other environment
+    rejects them all.
+    """
+    cust_id = os.getenv("EPAYCO_P_CUST_ID_CLIENTE")
+    p_key = os.getenv("EPAYCO_P_KEY")
+    if not cust_id or not p_key:
+        if settings.ENVIRONMENT == "local":
+            return True
+        logger.error(
+            "EPAYCO_P_CUST_ID_CLIENTE / EPAYCO_P_KEY are not set in %s; rejecting ePayco "
+            "confirmation for invoice %s", settings.ENVIRONMENT, webhook_data.get("x_id_invoice")
+        )
+        return False
+
+    raw = "^".join([
+        cust_id,
+        p_key,
+        str(webhook_data.get("x_ref_payco", "")),
+        str(webhook_data.get("x_transaction_id", "")),
+        str(webhook_data.get("x_amount", "")),
+        str(webhook_data.get("x_currency_code", "")),
+    ])
+    expected = hashlib.sha256(raw.encode()).hexdigest()
+    return hmac.compare_digest(expected, str(webhook_data.get("x_signature", "")))
+
 def process_webhook(webhook_data: dict) -> dict:
     """
     Process an ePayco webhook notification
     
-    In a real implementation, this would validate the webhook signature
-    and extract the relevant payment information.
+    Extracts the relevant payment information and maps the gateway response
+    code to one of our Payment statuses. Signature checks happen in
+    verify_signature before the event is stored.
     """
-    # Mock implementation - in production, validate signature and data
+    code = str(webhook_data.get("x_cod_response", ""))
     return {
         "payment_id": webhook_data.get("x_id_invoice"),
         "transaction_id": webhook_data.get("x_transaction_id"),
-        "status": webhook_data.get("x_response"),
+        "status": RESPONSE_CODE_STATUS.get(code, "pending"),
+        "response_code": code,
         "amount": webhook_data.get("x_amount"),
         "date": webhook_data.get("x_transaction_date")
-    } 
\ No newline at end of file
+    }
@@ -0,0 +1,110 @@
+import uuid
+from datetime import datetime
+from typing import Any, Dict
+
+from sqlalchemy import exists, insert, literal, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlmodel import Session
+
+from app.core.security import get_password_hash
+from app.old_models import (
+    Client, ClientCreate, ClientGroup, ClientGroupAdminLink, ClientPublic, FamilySignup,
+    FamilySignupPublic, QRCode, User, UserPublic,
+)
+
+
+class SignupConflict(ValueError):
+    """The email is already taken; nothing was written."""
+
+
+def _client_row(client_in: ClientCreate, now: datetime, **values: Any) -> Dict[str, Any]:
+    qr_code_id = uuid.uuid4()
+    return {
+        **client_in.model_dump(),
+        "id": uuid.uuid4(),
+        "qr_code": str(qr_code_id),
+        "created_at": now,
+        "updated_at": now,
+        "_qr_code_id": qr_code_id,
+        **values,
+    }
+
+
+def create_family(session: Session, family_in: FamilySignup) -> FamilySignupPublic:
+    """
+    Create the user, their client, a client group they administer, the
+    children and every QR code in one transaction.
+
+    Ids are generated here so rows can reference each other before anything
+    is written, and each table gets a single INSERT (children and QR codes as
+    one multi-row statement). Email uniqueness is checked by the inserts
+    themselves: ON CONFLICT on user.email, and a NOT EXISTS guard on the
+    parent's client email, which has no unique constraint. A conflict rolls
+    everything back and raises SignupConflict.
+    """
+    user_in, parent_in = family_in.user, family_in.parent
+    user_id, group_id = uuid.uuid4(), uuid.uuid4()
+    now = datetime.utcnow()
+
+    try:
+        created = session.execute(
+            pg_insert(User)
+            .values(
+                id=user_id,
+                email=user_in.email,
+                hashed_password=get_password_hash(user_in.password),
+                full_name=user_in.full_name,
+                is_active=True,
+                is_superuser=False,
+                terms_accepted=user_in.terms_accepted,
+            )
+            .on_conflict_do_nothing(index_elements=[User.email])
+            .returning(User.id)
+        ).first()
+        if created is None:
+            raise SignupConflict("A user with this email already exists.")
+
+        session.execute(insert(ClientGroup).values(
+            id=group_id, name=family_in.group_name or f"{parent_in.full_name}'s Group", created_at=now,
+        ))
+
+        parent = _client_row(parent_in, now, user_id=user_id, group_id=group_id, is_child=False)
+        children = [
+            _client_row(child, now, user_id=None, group_id=group_id, is_child=True)
+            for child in family_in.children
+        ]
+        columns = [c for c in parent if not c.startswith("_")]
+        guard = select(*(literal(parent[c], Client.__table__.c[c].type) for c in columns))
+        if parent_in.email:
+            guard = guard.where(~exists().where(Client.email == parent_in.email))
+        created = session.execute(
+            insert(Client).from_select(columns, guard).returning(Client.id)
+        ).first()
+        if created is None:
+            raise SignupConflict("A client with this email already exists.")
+        if children:
+            session.execute(insert(Client), [
+                {c: row[c] for c in columns} for row in children
+            ])
+
+        session.execute(insert(QRCode), [
+            {"id": row["_qr_code_id"], "client_id": row["id"]} for row in [parent, *children]
+        ])
+        session.execute(insert(ClientGroupAdminLink).values(client_group_id=group_id, admin_id=user_id))
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+
+    def public(row: Dict[str, Any]) -> ClientPublic:
+        return ClientPublic.model_validate({c: row.get(c) for c in ClientPublic.model_fields})
+
+    return FamilySignupPublic(
+        user=UserPublic(
+            id=user_id, email=user_in.email, full_name=user_in.full_name, is_active=True,
+            is_superuser=False, admin_user=None,
+        ),
+        parent=public(parent),
+        children=[public(row) for row in children],
+        client_group_id=group_id,
+    )
@@ -0,0 +1,28 @@
+import uuid
+from typing import Optional
+
+from sqlmodel import Session, select
+
+from app.old_models import UserGroupAccess
+
+
+def accessible_group_ids(user_id: uuid.UUID):
+    """Subquery of the group ids a user can see, for use with `.in_()`."""
+    return select(UserGroupAccess.client_group_id).where(UserGroupAccess.user_id == user_id)
+
+
+def can_access_group(
+    session: Session, user_id: uuid.UUID, group_id: uuid.UUID, via: Optional[str] = None
+) -> bool:
+    """
+    One primary-key lookup in usergroupaccess. Pass `via` ("member" or
+    "admin_link") to only accept that kind of access.
+    """
+    statement = (
+        select(UserGroupAccess.via)
+        .where(UserGroupAccess.user_id == user_id)
+        .where(UserGroupAccess.client_group_id == group_id)
+    )
+    if via:
+        statement = statement.where(UserGroupAccess.via == via)
+    return session.exec(statement.limit(1)).first() is not None
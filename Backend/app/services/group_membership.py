@@ -0,0 +1,97 @@
+import uuid
+from datetime import datetime
+from typing import Optional, Sequence
+
+from sqlalchemy import Uuid, all_, any_, bindparam, delete, exists, literal, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlmodel import Session
+
+from app.old_models import BulkMembershipResult, Client, ClientGroupAdminLink, User
+
+
+def _array(ids: Sequence[uuid.UUID]):
+    # One array parameter instead of a bind per id in an IN list
+    return bindparam("ids", list(dict.fromkeys(ids)), type_=ARRAY(Uuid), unique=True)
+
+
+def _ids(ids: Sequence[uuid.UUID]):
+    return any_(_array(ids))
+
+
+def _result(ids: Sequence[uuid.UUID], changed: int) -> BulkMembershipResult:
+    requested = len(set(ids))
+    return BulkMembershipResult(requested=requested, changed=changed, unchanged=requested - changed)
+
+
+def set_clients_group(
+    session: Session,
+    client_ids: Sequence[uuid.UUID],
+    group_id: Optional[uuid.UUID],
+    *,
+    from_group_id: Optional[uuid.UUID] = None,
+) -> BulkMembershipResult:
+    """
+    Point every client in `client_ids` at `group_id` (None removes them) in
+    one UPDATE. With `from_group_id`, only clients currently in that group are
+    touched. Clients already in `group_id` or not found count as unchanged.
+    """
+    statement = (
+        update(Client)
+        .where(Client.id == _ids(client_ids))
+        .where(Client.group_id.is_distinct_from(group_id))
+        .values(group_id=group_id, updated_at=datetime.utcnow())
+    )
+    if from_group_id is not None:
+        statement = statement.where(Client.group_id == from_group_id)
+    changed = session.execute(statement, execution_options={"synchronize_session": False}).rowcount
+    session.commit()
+    return _result(client_ids, changed)
+
+
+def add_group_admins(
+    session: Session, group_id: uuid.UUID, admin_ids: Sequence[uuid.UUID]
+) -> BulkMembershipResult:
+    """Link existing users as group admins in one INSERT; existing links are left alone."""
+    users = select(literal(group_id, Uuid), User.id).where(User.id == _ids(admin_ids))
+    statement = (
+        pg_insert(ClientGroupAdminLink)
+        .from_select(["client_group_id", "admin_id"], users)
+        .on_conflict_do_nothing()
+        .returning(ClientGroupAdminLink.admin_id)
+    )
+    # ORM-enabled INSERTs don't report a rowcount, so count the rows returned
+    changed = len(session.execute(statement).all())
+    session.commit()
+    return _result(admin_ids, changed)
+
+
+def remove_group_admins(
+    session: Session, group_id: uuid.UUID, admin_ids: Sequence[uuid.UUID]
+) -> Optional[BulkMembershipResult]:
+    """
+    Unlink admins in one DELETE. Returns None, and deletes nothing, when that
+    would leave the group without any admin.
+    """
+    others = (
+        select(ClientGroupAdminLink.admin_id)
+        .where(ClientGroupAdminLink.client_group_id == group_id)
+        .where(ClientGroupAdminLink.admin_id != all_(_array(admin_ids)))
+        .correlate(None)
+    )
+    statement = (
+        delete(ClientGroupAdminLink)
+        .where(ClientGroupAdminLink.client_group_id == group_id)
+        .where(ClientGroupAdminLink.admin_id == _ids(admin_ids))
+        .where(exists(others))
+    )
+    changed = session.execute(statement, execution_options={"synchronize_session": False}).rowcount
+    if changed == 0 and session.exec(
+        select(ClientGroupAdminLink.admin_id)
+        .where(ClientGroupAdminLink.client_group_id == group_id)
+        .where(ClientGroupAdminLink.admin_id == _ids(admin_ids))
+        .limit(1)
+    ).first():
+        session.rollback()
+        return None
+    session.commit()
+    return _result(admin_ids, changed)
@@ -0,0 +1,166 @@
+import asyncio
+import functools
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Hashable, Optional
+
+from app import ai_handler
+from app.utils.rate_limit import AsyncTokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+class DispatcherFull(Exception):
+    """Raised when the dispatcher already holds `max_queue` pending jobs."""
+
+
+class DispatcherTimeout(Exception):
+    """Raised when a job did not finish within its timeout."""
+
+
+class LLMDispatcher:
+    """
+    Runs blocking LLM calls off the request path.
+
+    Jobs run on the dispatcher's own thread pool, so they never occupy the
+    threads FastAPI uses for sync routes. At most `max_concurrency` jobs run at
+    once and they start no faster than `rate` per second (bursts of `burst`).
+    Jobs submitted with the same key while one is in flight share its result.
+    Once `max_queue` distinct jobs are pending new ones are rejected, and
+    callers stop waiting after `timeout` seconds.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        rate: float = 2.0,
+        burst: int = 4,
+        max_queue: int = 64,
+        timeout: float = 60.0,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._rate = rate
+        self._burst = burst
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm")
+        self._limiter: Optional[AsyncTokenBucket] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._pending = 0
+
+    def _bind_loop(self) -> None:
+        # asyncio primitives belong to one loop; rebuild them if the loop changed
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._limiter = AsyncTokenBucket(self._rate, capacity=self._burst)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._inflight = {}
+            self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def _run(self, fn: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+        try:
+            async with self._semaphore:
+                await self._limiter.acquire()
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(
+                    self._executor, functools.partial(fn, *args, **kwargs)
+                )
+        finally:
+            self._pending -= 1
+
+    async def submit(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        key: Optional[Hashable] = None,
+        timeout: Optional[float] = None,
+        **kwargs: Any,
+    ) -> Any:
+        self._bind_loop()
+        job = self._inflight.get(key) if key is not None else None
+        if job is None:
+            if self._pending >= self.max_queue:
+                raise DispatcherFull(f"{self._pending} LLM jobs already pending")
+            self._pending += 1
+            job = asyncio.ensure_future(self._run(fn, args, kwargs))
+            if key is not None:
+                self._inflight[key] = job
+                job.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        try:
+            # shield: one caller giving up must not cancel the job for the others
+            return await asyncio.wait_for(asyncio.shield(job), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            raise DispatcherTimeout("LLM job timed out")
+
+    async def generate(self, messages, prompt, schema=None, model_str=ai_handler.DEFAULT_MODEL, **kwargs):
+        """ai_handler.generate through the dispatcher, coalescing identical conversations."""
+        key = ai_handler.ResponseCache.make_key(
+            model_str, prompt, schema, ai_handler._build_history(messages)
+        )
+        return await self.submit(
+            ai_handler.generate, messages, prompt, schema, model_str, key=key, **kwargs
+        )
+
+    async def stream(
+        self, gen_fn: Callable[..., Any], *args: Any, timeout: Optional[float] = None, **kwargs: Any
+    ) -> AsyncIterator[Any]:
+        """
+        Iterate a blocking generator on the dispatcher's threads.
+
+        Items are handed back to the event loop as they are produced. The same
+        concurrency, rate and queue limits apply; `timeout` bounds the wait for
+        each item.
+        """
+        self._bind_loop()
+        if self._pending >= self.max_queue:
+            raise DispatcherFull(f"{self._pending} LLM jobs already pending")
+        self._pending += 1
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        def produce() -> None:
+            try:
+                for item in gen_fn(*args, **kwargs):
+                    loop.call_soon_threadsafe(queue.put_nowait, (item, None))
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, (done, e))
+                return
+            loop.call_soon_threadsafe(queue.put_nowait, (done, None))
+
+        job = asyncio.ensure_future(self._run(produce, (), {}))
+        try:
+            while True:
+                try:
+                    item, error = await asyncio.wait_for(queue.get(), timeout or self.timeout)
+                except asyncio.TimeoutError:
+                    raise DispatcherTimeout("LLM stream timed out")
+                if error is not None:
+                    raise error
+                if item is done:
+                    break
+                yield item
+        finally:
+            if not job.done():
+                job.cancel()
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+dispatcher = LLMDispatcher(
+    max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", 4)),
+    rate=float(os.getenv("LLM_REQUESTS_PER_SECOND", 2)),
+    burst=int(os.getenv("LLM_BURST", 4)),
+    max_queue=int(os.getenv("LLM_MAX_QUEUE", 64)),
+    timeout=float(os.getenv("LLM_TIMEOUT_SECONDS", 60)),
+)
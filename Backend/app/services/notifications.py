@@ -0,0 +1,284 @@
+import asyncio
+import logging
+import os
+import selectors
+import threading
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Set
+
+import psycopg
+from sqlalchemy import DateTime, Uuid, any_, bindparam, func, insert, literal, union_all
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlmodel import Session, desc, select
+
+from app.core.db import engine
+from app.old_models import (
+    Client, Notification, NotificationCreate, NotificationFeed, NotificationInbox,
+    NotificationPublic, NotificationReadCursor,
+)
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "notification_created"
+FEED_LIMIT = 50
+UNREAD_COUNT_LIMIT = 100  # the badge shows "99+" past this, so counting further is wasted work
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("NOTIFICATION_SUBSCRIBER_QUEUE_SIZE", 100))
+RECONNECT_SECONDS = 5.0
+
+
+class InvalidNotification(ValueError):
+    """The notification has no recipient, or more than one kind of recipient."""
+
+
+def create_notification(
+    session: Session, notification_in: NotificationCreate, created_by: uuid.UUID
+) -> Notification:
+    """
+    Store a notification and fan it out to its recipients.
+
+    A notification for one client or for a client group gets one inbox row per
+    recipient, written by a single INSERT ... SELECT. Broadcasts get no inbox
+    rows: readers pick them up from the notification table itself, so a
+    broadcast costs one row however many clients there are. The id is sent on
+    CHANNEL in the same transaction, so listeners only hear about committed
+    notifications.
+    """
+    targets = [
+        notification_in.is_broadcast,
+        notification_in.target_client_id is not None,
+        notification_in.target_group_id is not None,
+    ]
+    if sum(targets) != 1:
+        raise InvalidNotification(
+            "Set exactly one of is_broadcast, target_client_id or target_group_id"
+        )
+
+    notification = Notification.model_validate(notification_in, update={"created_by": created_by})
+    session.add(notification)
+    session.flush()
+    if not notification.is_broadcast:
+        recipients = select(
+            Client.id,
+            literal(notification.id, Uuid),
+            literal(notification.created_at, DateTime),
+        )
+        if notification.target_client_id is not None:
+            recipients = recipients.where(Client.id == notification.target_client_id)
+        else:
+            recipients = recipients.where(Client.group_id == notification.target_group_id)
+        session.execute(
+            insert(NotificationInbox).from_select(
+                ["client_id", "notification_id", "created_at"], recipients
+            )
+        )
+    session.execute(select(func.pg_notify(CHANNEL, str(notification.id))))
+    session.commit()
+    session.refresh(notification)
+    return notification
+
+
+def get_read_until(session: Session, client_id: uuid.UUID) -> Optional[datetime]:
+    return session.exec(
+        select(NotificationReadCursor.read_until).where(NotificationReadCursor.client_id == client_id)
+    ).first()
+
+
+def count_unread(session: Session, client_id: uuid.UUID, read_until: Optional[datetime]) -> int:
+    inbox = select(NotificationInbox.notification_id).where(NotificationInbox.client_id == client_id)
+    broadcasts = select(Notification.id).where(Notification.is_broadcast)
+    if read_until is not None:
+        inbox = inbox.where(NotificationInbox.created_at > read_until)
+        broadcasts = broadcasts.where(Notification.created_at > read_until)
+    unread = union_all(
+        inbox.limit(UNREAD_COUNT_LIMIT), broadcasts.limit(UNREAD_COUNT_LIMIT)
+    ).subquery()
+    return min(session.exec(select(func.count()).select_from(unread)).one(), UNREAD_COUNT_LIMIT)
+
+
+def get_feed(
+    session: Session,
+    client_id: uuid.UUID,
+    *,
+    before: Optional[datetime] = None,
+    limit: int = FEED_LIMIT,
+) -> NotificationFeed:
+    """
+    The client's notifications, newest first, with read state.
+
+    The inbox and the broadcasts are read as two index range scans of at most
+    `limit` rows each and merged, so the cost doesn't grow with the table. To
+    page, pass the created_at of the last row seen as `before`.
+    """
+    columns = (Notification.id, Notification.message, Notification.created_at, Notification.is_broadcast)
+    inbox = (
+        select(*columns)
+        .join(NotificationInbox, NotificationInbox.notification_id == Notification.id)
+        .where(NotificationInbox.client_id == client_id)
+    )
+    broadcasts = select(*columns).where(Notification.is_broadcast)
+    if before is not None:
+        inbox = inbox.where(NotificationInbox.created_at < before)
+        broadcasts = broadcasts.where(Notification.created_at < before)
+    feed = union_all(
+        inbox.order_by(desc(NotificationInbox.created_at)).limit(limit),
+        broadcasts.order_by(desc(Notification.created_at)).limit(limit),
+    ).subquery()
+    # execute(), not exec(): sqlmodel treats a single-entity select as scalars
+    rows = session.execute(select(feed).order_by(desc(feed.c.created_at)).limit(limit)).all()
+
+    read_until = get_read_until(session, client_id)
+    return NotificationFeed(
+        data=[
+            NotificationPublic(
+                **row._mapping,
+                is_read=read_until is not None and row.created_at <= read_until,
+            )
+            for row in rows
+        ],
+        unread=count_unread(session, client_id, read_until),
+        read_until=read_until,
+    )
+
+
+def mark_read(session: Session, client_id: uuid.UUID, until: Optional[datetime] = None) -> datetime:
+    """
+    Mark everything created up to `until` (now by default) as read.
+
+    Read state is a single watermark per client, so this is one upsert no
+    matter how many notifications it covers. The watermark never moves back.
+    """
+    now = datetime.utcnow()
+    until = min(until, now) if until else now
+    statement = pg_insert(NotificationReadCursor).values(client_id=client_id, read_until=until)
+    statement = statement.on_conflict_do_update(
+        index_elements=[NotificationReadCursor.client_id],
+        set_={"read_until": func.greatest(NotificationReadCursor.read_until, statement.excluded.read_until)},
+    ).returning(NotificationReadCursor.read_until)
+    read_until = session.execute(statement).scalar_one()
+    session.commit()
+    return read_until
+
+
+class NotificationHub:
+    """
+    Pushes new notifications to the SSE streams open in this process.
+
+    A background thread LISTENs on CHANNEL over its own connection, so every
+    worker process hears about each notification once it commits. Each
+    notification is loaded once, matched against the locally subscribed
+    clients (everyone for a broadcast, otherwise one inbox lookup for all of
+    them) and handed to their queues on the event loop. A stream whose queue
+    is full misses the push; the notification is still in its feed.
+    """
+
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Dict[uuid.UUID, Set["asyncio.Queue[NotificationPublic]"]] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.dropped = 0
+
+    def start(self) -> None:
+        """Start listening; call from the event loop the streams run on."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="notification-hub", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def subscribe(self, client_id: uuid.UUID) -> "asyncio.Queue[NotificationPublic]":
+        queue: "asyncio.Queue[NotificationPublic]" = asyncio.Queue(self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(client_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, client_id: uuid.UUID, queue: "asyncio.Queue[NotificationPublic]") -> None:
+        with self._lock:
+            queues = self._subscribers.get(client_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[client_id]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(queues) for queues in self._subscribers.values())
+
+    def _put(self, client_id: uuid.UUID, item: NotificationPublic) -> None:
+        # Runs on the event loop; asyncio queues aren't thread-safe
+        with self._lock:
+            queues = list(self._subscribers.get(client_id, ()))
+        for queue in queues:
+            try:
+                queue.put_nowait(item)
+            except asyncio.QueueFull:
+                self.dropped += 1
+
+    def deliver(self, session: Session, notification_ids: Sequence[uuid.UUID]) -> int:
+        """Push the given notifications to local subscribers. Returns the number of pushes."""
+        with self._lock:
+            subscribed = list(self._subscribers)
+        if not subscribed or self._loop is None:
+            return 0
+        pushed = 0
+        notifications = session.exec(
+            select(Notification).where(Notification.id.in_(notification_ids))
+        ).all()
+        for notification in notifications:
+            if notification.is_broadcast:
+                recipients: List[uuid.UUID] = subscribed
+            else:
+                recipients = session.exec(
+                    select(NotificationInbox.client_id)
+                    .where(NotificationInbox.notification_id == notification.id)
+                    .where(NotificationInbox.client_id == any_(
+                        bindparam("subscribed", subscribed, type_=ARRAY(Uuid))
+                    ))
+                ).all()
+            item = NotificationPublic.model_validate(notification)
+            for client_id in recipients:
+                self._loop.call_soon_threadsafe(self._put, client_id, item)
+            pushed += len(recipients)
+        return pushed
+
+    def _connect(self, received: List[uuid.UUID]) -> psycopg.Connection:
+        url = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        connection = psycopg.connect(url, autocommit=True)
+        connection.add_notify_handler(lambda notify: received.append(uuid.UUID(notify.payload)))
+        connection.execute(f"LISTEN {CHANNEL}")
+        return connection
+
+    def _listen(self) -> None:
+        received: List[uuid.UUID] = []
+        with self._connect(received) as connection, selectors.DefaultSelector() as selector:
+            selector.register(connection.fileno(), selectors.EVENT_READ)
+            while not self._stopping.is_set():
+                if not selector.select(timeout=1.0):
+                    continue
+                # Running any statement makes psycopg read the pending notifies
+                connection.execute("SELECT 1")
+                if received:
+                    ids, received[:] = list(received), []
+                    with Session(engine) as session:
+                        self.deliver(session, ids)
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                self._listen()
+            except Exception:
+                logger.exception("Notification listener failed, reconnecting")
+                self._stopping.wait(RECONNECT_SECONDS)
+
+
+hub = NotificationHub()
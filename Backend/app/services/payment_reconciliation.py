@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional, Tuple
+
+import httpx
+from sqlalchemy import String, cast
+from sqlmodel import Session, select
+
+from app.core.db import engine
+from app.old_models import Payment, PaymentWebhookEvent
+from app.services.epayco import fetch_transaction
+from app.services.payment_webhooks import StatusUpdate, apply_status_updates
+from app.utils.rate_limit import AsyncTokenBucket
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 500
+CONCURRENCY = 20
+REQUESTS_PER_SECOND = 50.0
+# Leave fresh payments alone; the webhook normally settles them first
+GRACE_PERIOD = timedelta(minutes=15)
+
+
+@dataclass
+class ReconciliationReport:
+    checked: int = 0
+    updated: int = 0
+    errors: int = 0
+    unmatched: int = 0
+    elapsed: float = 0.0
+    transitions: dict = field(default_factory=dict)
+
+    @property
+    def throughput(self) -> float:
+        """Payments verified per second."""
+        return self.checked / self.elapsed if self.elapsed else 0.0
+
+
+def iter_pending_payments(
+    session: Session, page_size: int = PAGE_SIZE, older_than: Optional[datetime] = None
+) -> Iterator[List[Tuple[uuid.UUID, Optional[str]]]]:
+    """
+    Yield pages of (payment id, ePayco reference) for pending card payments.
+
+    ePayco only knows a payment by the reference (x_ref_payco) it assigned,
+    which reaches us in its notifications; the newest one stored for the
+    payment's invoice is used. Payments ePayco never notified us about have
+    None. Keyset pagination on the primary key keeps each query short and
+    avoids holding a cursor open while the gateway is being called.
+    """
+    cutoff = older_than or datetime.utcnow() - GRACE_PERIOD
+    ref_payco = (
+        select(PaymentWebhookEvent.payload.op("->>")("x_ref_payco"))
+        .where(PaymentWebhookEvent.payload.op("->>")("x_id_invoice") == cast(Payment.id, String))
+        .where(PaymentWebhookEvent.payload.op("->>")("x_ref_payco") != None)
+        .order_by(PaymentWebhookEvent.received_at.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    last_id: Optional[uuid.UUID] = None
+    while True:
+        statement = (
+            select(Payment.id, ref_payco)
+            .where(Payment.status == "pending")
+            .where(Payment.payment_method == "credit_card")
+            .where(Payment.created_at < cutoff)
+            .order_by(Payment.id)
+            .limit(page_size)
+        )
+        if last_id is not None:
+            statement = statement.where(Payment.id > last_id)
+        page = session.exec(statement).all()
+        if not page:
+            return
+        yield [(payment_id, reference) for payment_id, reference in page]
+        if len(page) < page_size:
+            return
+        last_id = page[-1][0]
+
+
+async def _verify_page(
+    client: httpx.AsyncClient,
+    limiter: AsyncTokenBucket,
+    semaphore: asyncio.Semaphore,
+    page: List[Tuple[uuid.UUID, str]],
+) -> List[Optional[StatusUpdate]]:
+    async def verify(payment_id: uuid.UUID, ref_payco: str) -> Optional[StatusUpdate]:
+        async with semaphore:
+            await limiter.acquire()
+            try:
+                result = await fetch_transaction(client, ref_payco)
+            except httpx.HTTPError as e:
+                logger.warning("Could not verify payment %s: %s", payment_id, e)
+                return None
+        if not result["success"]:
+            return None
+        if str(result["payment_id"]) != str(payment_id):
+            logger.warning("ePayco reference %s belongs to invoice %s, not %s",
+                           ref_payco, result["payment_id"], payment_id)
+            return None
+        return StatusUpdate(payment_id, result["status"], result["transaction_id"])
+
+    return await asyncio.gather(*(verify(pid, ref) for pid, ref in page))
+
+
+async def reconcile_pending_payments(
+    session: Session,
+    *,
+    client: Optional[httpx.AsyncClient] = None,
+    concurrency: int = CONCURRENCY,
+    requests_per_second: float = REQUESTS_PER_SECOND,
+    page_size: int = PAGE_SIZE,
+    older_than: Optional[datetime] = None,
+) -> ReconciliationReport:
+    """
+    Re-check pending card payments against ePayco.
+
+    Each page of pending payments is verified concurrently through one pooled
+    client, capped by `concurrency` in-flight requests and `requests_per_second`.
+    Status changes for the page are written back and committed together.
+    Payments without an ePayco reference cannot be looked up and are only
+    counted, in `unmatched`.
+    """
+    owns_client = client is None
+    if client is None:
+        client = httpx.AsyncClient(
+            timeout=10.0,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        )
+    limiter = AsyncTokenBucket(requests_per_second, capacity=concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    report = ReconciliationReport()
+    started = time.perf_counter()
+    try:
+        for page in iter_pending_payments(session, page_size, older_than):
+            known = [(payment_id, ref) for payment_id, ref in page if ref]
+            report.unmatched += len(page) - len(known)
+            results = await _verify_page(client, limiter, semaphore, known)
+            updates = [u for u in results if u is not None and u.status != "pending"]
+            report.checked += len(known)
+            report.errors += sum(1 for u in results if u is None)
+            if updates:
+                changed = apply_status_updates(session, updates)
+                session.commit()
+                for update, did_change in zip(updates, changed):
+                    if did_change:
+                        report.updated += 1
+                        report.transitions[update.status] = report.transitions.get(update.status, 0) + 1
+    finally:
+        if owns_client:
+            await client.aclose()
+    report.elapsed = time.perf_counter() - started
+    logger.info(
+        "Reconciled %s payments in %.2fs (%.1f/s): %s updated, %s errors, "
+        "%s without an ePayco reference, %s",
+        report.checked, report.elapsed, report.throughput,
+        report.updated, report.errors, report.unmatched, report.transitions,
+    )
+    return report
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    logger.info("Reconciling pending payments")
+    with Session(engine) as session:
+        asyncio.run(reconcile_pending_payments(session))
+    logger.info("Reconciliation finished")
+
+
+if __name__ == "__main__":
+    main()
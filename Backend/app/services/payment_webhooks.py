@@ -0,0 +1,222 @@
+import logging
+import threading
+import uuid
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, func, select
+
+from app.core.db import engine
+from app.old_models import Payment, PaymentWebhookEvent, PlanInstance
+from app.services.epayco import process_webhook
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+POLL_INTERVAL_SECONDS = 5.0
+
+
+class StatusUpdate(NamedTuple):
+    payment_id: Optional[uuid.UUID]
+    status: str
+    transaction_id: Optional[str] = None
+
+
+def store_event(session: Session, webhook_data: dict) -> bool:
+    """
+    Persist a raw ePayco notification, ignoring retries of an event already stored.
+
+    Events are keyed on (x_transaction_id, x_cod_response): a retry of the same
+    notification is dropped by ON CONFLICT DO NOTHING, while a later status change
+    for the same transaction (pending -> accepted) is kept as a new event.
+    Returns True when the event is new.
+    """
+    statement = (
+        insert(PaymentWebhookEvent)
+        .values(
+            id=uuid.uuid4(),
+            provider="epayco",
+            transaction_id=str(webhook_data["x_transaction_id"]),
+            status=str(webhook_data.get("x_cod_response", "")),
+            payload=webhook_data,
+            received_at=datetime.utcnow(),
+        )
+        .on_conflict_do_nothing(index_elements=["transaction_id", "status"])
+        .returning(PaymentWebhookEvent.id)
+    )
+    inserted = session.execute(statement).first()
+    session.commit()
+    return inserted is not None
+
+
+def _parse_uuid(value: Optional[str]) -> Optional[uuid.UUID]:
+    try:
+        return uuid.UUID(str(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def apply_status_updates(session: Session, updates: List[StatusUpdate]) -> List[bool]:
+    """
+    Move payments to new statuses and keep their plan instances in step.
+
+    Payments and plan instances for all updates are locked and loaded in two
+    queries. The caller commits. Returns, per update, whether it changed anything.
+    """
+    payment_ids = {u.payment_id for u in updates if u.payment_id}
+    payments: Dict[uuid.UUID, Payment] = {}
+    if payment_ids:
+        payments = {
+            p.id: p
+            for p in session.exec(
+                select(Payment).where(Payment.id.in_(payment_ids)).with_for_update()
+            ).all()
+        }
+    instance_ids = {p.plan_instance_id for p in payments.values() if p.plan_instance_id}
+    instances: Dict[uuid.UUID, PlanInstance] = {}
+    if instance_ids:
+        instances = {
+            i.id: i
+            for i in session.exec(
+                select(PlanInstance).where(PlanInstance.id.in_(instance_ids)).with_for_update()
+            ).all()
+        }
+
+    changed = []
+    for update in updates:
+        payment = payments.get(update.payment_id)
+        # A completed payment only moves on to refunded; late or reordered
+        # pending/failed notifications must not undo it.
+        if (
+            not payment
+            or payment.status == update.status
+            or (payment.status == "completed" and update.status != "refunded")
+        ):
+            changed.append(False)
+            continue
+
+        instance = instances.get(payment.plan_instance_id)
+        if instance:
+            if update.status == "completed":
+                instance.paid_amount += payment.amount
+                instance.is_active = True
+            elif payment.status == "completed" and update.status == "refunded":
+                instance.paid_amount = max(instance.paid_amount - payment.amount, 0)
+                if not instance.is_fully_paid:
+                    instance.is_active = False
+            session.add(instance)
+
+        payment.status = update.status
+        if update.transaction_id:
+            # Keep the gateway reference so the payment can be re-verified later
+            payment.transaction_id = update.transaction_id
+        session.add(payment)
+        changed.append(True)
+    return changed
+
+
+def apply_events(session: Session, limit: int = BATCH_SIZE) -> int:
+    """
+    Apply one batch of unprocessed events to Payment and PlanInstance rows.
+
+    Events are claimed with FOR UPDATE SKIP LOCKED so several workers can drain
+    the queue together, and the whole batch is committed at once. Returns the
+    number of events processed.
+    """
+    events = session.exec(
+        select(PaymentWebhookEvent)
+        .where(PaymentWebhookEvent.processed_at == None)
+        .order_by(PaymentWebhookEvent.received_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not events:
+        return 0
+
+    updates = []
+    for event in events:
+        data = process_webhook(event.payload)
+        updates.append(StatusUpdate(
+            payment_id=_parse_uuid(data["payment_id"]),
+            status=data["status"],
+            transaction_id=str(data["transaction_id"]),
+        ))
+    apply_status_updates(session, updates)
+
+    now = datetime.utcnow()
+    for event, update in zip(events, updates):
+        event.processed_at = now
+        if update.payment_id is None or session.get(Payment, update.payment_id) is None:
+            event.error = "Payment not found"
+        session.add(event)
+
+    session.commit()
+    return len(events)
+
+
+def drain(session: Session, limit: int = BATCH_SIZE) -> int:
+    """Apply batches until the queue is empty. Returns the total processed."""
+    total = 0
+    while True:
+        processed = apply_events(session, limit=limit)
+        total += processed
+        if processed < limit:
+            return total
+
+
+class WebhookWorker:
+    """
+    Background thread that drains stored webhook events.
+
+    The ingestion route calls notify() after storing an event so bursts are
+    picked up right away; otherwise the queue is polled every `poll_interval`
+    seconds. stop() drains what is left before returning.
+    """
+
+    def __init__(self, poll_interval: float = POLL_INTERVAL_SECONDS, batch_size: int = BATCH_SIZE):
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="epayco-webhooks", daemon=True)
+        self._thread.start()
+
+    def notify(self) -> None:
+        self._wake.set()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        self._stopping.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _drain_once(self) -> None:
+        try:
+            with Session(engine) as session:
+                drain(session, limit=self.batch_size)
+        except Exception:
+            logger.exception("Failed to apply payment webhook events")
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            self._drain_once()
+        self._drain_once()
+
+
+worker = WebhookWorker()
+
+
+def pending_count(session: Session) -> int:
+    return session.exec(
+        select(func.count(PaymentWebhookEvent.id)).where(PaymentWebhookEvent.processed_at == None)
+    ).one()
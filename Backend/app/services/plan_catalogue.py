@@ -0,0 +1,176 @@
+import hashlib
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Literal, NamedTuple, Optional, Sequence, Tuple
+
+import orjson
+from sqlalchemy import desc, event, true
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session, func, select
+
+from app.old_models import Plan, PlanTagCount
+from app.utils.serialization import row_encoder
+
+# Bounds how long another worker's plan change can go unnoticed here
+CATALOGUE_TTL_SECONDS = float(os.getenv("PLAN_CATALOGUE_TTL_SECONDS", 300))
+CACHE_CONTROL = f"public, max-age={int(os.getenv('PLAN_CATALOGUE_MAX_AGE', 60))}, must-revalidate"
+
+ALL_TAGS = "all"
+
+TagMatch = Literal["all", "any"]
+
+
+class Rendered(NamedTuple):
+    body: bytes
+    etag: str
+
+
+def render(content: Any) -> Rendered:
+    body = orjson.dumps(content)
+    return Rendered(body, '"' + hashlib.sha256(body).hexdigest()[:32] + '"')
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses weak comparison, so W/ prefixes are ignored."""
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidates or any(c.removeprefix("W/") == etag for c in candidates)
+
+
+class _Snapshot:
+    def __init__(self, plans: List[Plan], expires: float):
+        encode = row_encoder(Plan)
+        self.expires = expires
+        self.rows: Dict[bool, Dict[str, List[Dict[str, Any]]]] = {True: {}, False: {}}
+        self.plans: Dict[uuid.UUID, Tuple[bool, Rendered]] = {}
+        for plan in sorted(plans, key=lambda p: (p.name, str(p.id))):
+            row = encode(plan)
+            self.plans[plan.id] = (plan.is_active, render(row))
+            for tag in dict.fromkeys([ALL_TAGS, *(plan.tags or [])]):
+                self.rows[False].setdefault(tag, []).append(row)
+                if plan.is_active:
+                    self.rows[True].setdefault(tag, []).append(row)
+        # Full per-tag lists are what the catalogue pages ask for, render them now
+        self.lists: Dict[Tuple[bool, str], Rendered] = {
+            (active_only, tag): render(rows)
+            for active_only, by_tag in self.rows.items()
+            for tag, rows in by_tag.items()
+        }
+
+
+class PlanCatalogue:
+    """
+    The plan table kept in process memory, with the JSON for every tag list
+    rendered ahead of time.
+
+    The snapshot is rebuilt on the first request after a commit that touched a
+    Plan, or after `ttl` seconds so changes made by other workers show up.
+    """
+
+    def __init__(self, ttl: float = CATALOGUE_TTL_SECONDS):
+        self.ttl = ttl
+        self._snapshot: Optional[_Snapshot] = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def _current(self, session: Session) -> _Snapshot:
+        snapshot = self._snapshot
+        if snapshot and snapshot.expires > time.monotonic():
+            return snapshot
+        with self._lock:
+            generation = self._generation
+        plans = session.exec(select(Plan)).all()
+        snapshot = _Snapshot(plans, time.monotonic() + self.ttl)
+        with self._lock:
+            # Don't keep a snapshot loaded while an invalidation happened
+            if generation == self._generation:
+                self._snapshot = snapshot
+        return snapshot
+
+    def list_plans(
+        self,
+        session: Session,
+        *,
+        tags: Sequence[str] = (),
+        match: TagMatch = "all",
+        active_only: bool = True,
+        skip: int = 0,
+        limit: int = 100,
+    ) -> Rendered:
+        snapshot = self._current(session)
+        tags = [t for t in dict.fromkeys(tags) if t.lower() != ALL_TAGS]
+        if len(tags) <= 1:
+            key = tags[0] if tags else ALL_TAGS
+            rows = snapshot.rows[active_only].get(key, [])
+            if skip == 0 and limit >= len(rows):
+                return snapshot.lists.get((active_only, key)) or render([])
+        else:
+            wanted = set(tags)
+            test = wanted.issubset if match == "all" else wanted.intersection
+            rows = [r for r in snapshot.rows[active_only].get(ALL_TAGS, []) if test(r["tags"])]
+        return render(rows[skip: skip + limit])
+
+    def get_plan(
+        self, session: Session, plan_id: uuid.UUID, *, active_only: bool = True
+    ) -> Optional[Rendered]:
+        entry = self._current(session).plans.get(plan_id)
+        if entry is None or (active_only and not entry[0]):
+            return None
+        return entry[1]
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._snapshot = None
+
+
+catalogue = PlanCatalogue()
+
+
+def tag_filter(tags: Sequence[str], match: TagMatch = "all") -> Any:
+    """Plans carrying all (@>) or any (&&) of `tags`; both operators use ix_plan_tags."""
+    tags = list(dict.fromkeys(tags))
+    return Plan.tags.contains(tags) if match == "all" else Plan.tags.overlap(tags)
+
+
+def tag_counts(
+    session: Session,
+    *,
+    tags: Sequence[str] = (),
+    match: TagMatch = "all",
+    active_only: bool = True,
+) -> List[PlanTagCount]:
+    """
+    Number of plans per tag, in one query.
+
+    With `tags`, only plans matching them are counted, which gives the facet
+    counts for narrowing a selection further.
+    """
+    tag = func.unnest(Plan.tags).table_valued("tag").render_derived(name="t")
+    statement = select(tag.c.tag, func.count().label("count")).select_from(Plan).join(tag, true())
+    if active_only:
+        statement = statement.where(Plan.is_active == True)
+    if tags:
+        statement = statement.where(tag_filter(tags, match))
+    rows = session.exec(statement.group_by(tag.c.tag).order_by(desc("count"), tag.c.tag)).all()
+    return [PlanTagCount(tag=t, count=c) for t, c in rows]
+
+
+@event.listens_for(OrmSession, "after_flush")
+def _note_plan_changes(session: OrmSession, flush_context: Any) -> None:
+    if any(isinstance(obj, Plan) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info["plans_changed"] = True
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _invalidate_on_commit(session: OrmSession) -> None:
+    if session.info.pop("plans_changed", False):
+        catalogue.invalidate()
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _forget_on_rollback(session: OrmSession) -> None:
+    session.info.pop("plans_changed", None)
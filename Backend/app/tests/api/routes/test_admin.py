@@ -0,0 +1,220 @@
+import json
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, List, Optional
+
+import pytest
+from fastapi.responses import StreamingResponse
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from sqlmodel import Field, Session, SQLModel, select
+
+from app.api.routes import admin as admin_routes
+from app.core.config import settings
+from app.old_models import (
+    Client, ClientGroup, ClientPublic, Plan, PlanInstance, PlanInstancePublic, VisitPublic,
+)
+from app.tests.utils.plan import create_random_plan
+from app.tests.utils.utils import random_lower_string
+from app.utils.serialization import row_encoder, rows_response, serialize_rows
+
+
+def test_serialize_rows_matches_response_model(db: Session) -> None:
+    plan = create_random_plan(db)
+    group = ClientGroup(name=random_lower_string())
+    db.add(group)
+    db.commit()
+    instance = PlanInstance(
+        client_group_id=group.id, plan_id=plan.id, start_date=datetime.utcnow(),
+        total_cost=80.0, paid_amount=20.0, remaining_limits={"daily": 2},
+    )
+    db.add(instance)
+    db.commit()
+    db.refresh(instance)
+
+    expected = PlanInstancePublic.model_validate(instance).model_dump(mode="json")
+    assert json.loads(serialize_rows([instance], PlanInstancePublic)) == [expected]
+
+
+def test_list_endpoints_use_fast_path(
+    client: TestClient, admin_token_headers: dict[str, str], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    used = []
+
+    def spy(rows: Any, schema: Any) -> Any:
+        used.append(schema)
+        return rows_response(rows, schema)
+
+    monkeypatch.setattr(admin_routes, "rows_response", spy)
+    for path in ["/admin/clients", "/admin/all-visits", "/admin/plan-instances"]:
+        r = client.get(f"{settings.API_V1_STR}{path}", headers=admin_token_headers)
+        assert r.status_code == 200
+        assert isinstance(r.json(), list)
+    assert used == [ClientPublic, VisitPublic, PlanInstancePublic]
+
+
+class _TaggedPublic(SQLModel):
+    name: str
+    note: Optional[str] = "none"
+    tags: List[str] = Field(default_factory=list)
+
+
+def test_row_encoder_falls_back_to_field_defaults() -> None:
+    row = SimpleNamespace(name="Day pass")
+    first, second = row_encoder(_TaggedPublic)(row), row_encoder(_TaggedPublic)(row)
+
+    assert first == {"name": "Day pass", "note": "none", "tags": []}
+    assert first["tags"] is not second["tags"]
+    assert row_encoder(_TaggedPublic)(SimpleNamespace())["name"] is None
+
+
+def test_plan_instances_page_shape(
+    client: TestClient, db: Session, admin_token_headers: dict[str, str]
+) -> None:
+    plan = create_random_plan(db)
+    group = ClientGroup(name=random_lower_string())
+    db.add(group)
+    db.commit()
+    db.add(PlanInstance(
+        client_group_id=group.id, plan_id=plan.id, start_date=datetime.utcnow(), total_cost=10.0,
+    ))
+    db.commit()
+
+    r = client.get(
+        f"{settings.API_V1_STR}/admin/plan-instances",
+        headers=admin_token_headers,
+        params={"plan_id": str(plan.id)},
+    )
+    [row] = r.json()
+    assert uuid.UUID(row["id"])
+    assert row["plan"]["id"] == str(plan.id)
+    assert row["client_group"]["name"] == group.name
+    assert set(row) == set(PlanInstancePublic.model_fields)
+
+
+def test_client_search_ignores_accents_and_ranks_exact_ids_first(
+    client: TestClient, db: Session, admin_token_headers: dict[str, str]
+) -> None:
+    marker = random_lower_string()[:8]
+    named = Client(full_name=f"Zoë Peña {marker}", identification=f"{marker}-1")
+    by_id = Client(full_name=f"Other {marker}", identification=f"{marker}-9")
+    db.add_all([named, by_id])
+    db.commit()
+
+    r = client.get(
+        f"{settings.API_V1_STR}/admin/clients/search",
+        headers=admin_token_headers,
+        params={"q": f"zoe pena {marker}"},
+    )
+    assert r.status_code == 200
+    assert r.json()[0]["id"] == str(named.id)
+
+    r = client.get(
+        f"{settings.API_V1_STR}/admin/clients/search",
+        headers=admin_token_headers,
+        params={"q": f"{marker}-9"},
+    )
+    assert r.json()[0]["id"] == str(by_id.id)
+    assert r.json()[0]["rank"] >= 3
+
+    db.delete(named)
+    db.delete(by_id)
+    db.commit()
+
+
+def _plan_ops(name: str) -> list[dict]:
+    return [
+        {"method": "POST", "path": "/plans", "body": {"name": name, "description": "batch", "price": 10}},
+        {"method": "GET", "path": "/plans/$0.id"},
+        {"method": "GET", "path": f"/plans/{uuid.uuid4()}"},
+    ]
+
+
+def test_batch_atomic_rolls_back_on_failure(
+    client: TestClient, db: Session, admin_token_headers: dict[str, str]
+) -> None:
+    name = random_lower_string()
+    r = client.post(
+        f"{settings.API_V1_STR}/admin/batch",
+        headers=admin_token_headers,
+        json={"operations": _plan_ops(name) + [{"method": "GET", "path": "/plans"}]},
+    )
+    assert r.status_code == 200
+    data = r.json()
+    assert data["committed"] is False
+    assert [res["status"] for res in data["results"]] == [200, 200, 404, 424]
+    assert data["results"][1]["body"]["name"] == name
+    assert db.exec(select(Plan).where(Plan.name == name)).first() is None
+
+
+def test_batch_best_effort_keeps_successful_operations(
+    client: TestClient, db: Session, admin_token_headers: dict[str, str]
+) -> None:
+    name = random_lower_string()
+    r = client.post(
+        f"{settings.API_V1_STR}/admin/batch",
+        headers=admin_token_headers,
+        json={"operations": _plan_ops(name), "mode": "best_effort"},
+    )
+    data = r.json()
+    assert data["committed"] is True
+    assert [res["status"] for res in data["results"]] == [200, 200, 404]
+    plan = db.exec(select(Plan).where(Plan.name == name)).one()
+    assert str(plan.id) == data["results"][0]["body"]["id"]
+
+
+def test_batch_rejects_streaming_routes(
+    client: TestClient, admin_token_headers: dict[str, str], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    def stream() -> StreamingResponse:
+        return StreamingResponse(iter(["chunk"]), media_type="text/plain")
+
+    routes = admin_routes.router.routes + [APIRoute("/stream", stream)]
+    monkeypatch.setattr(admin_routes.router, "routes", routes)
+    r = client.post(
+        f"{settings.API_V1_STR}/admin/batch",
+        headers=admin_token_headers,
+        json={"operations": [{"method": "GET", "path": "/plans"}, {"method": "GET", "path": "/stream"}],
+              "mode": "best_effort"},
+    )
+    assert r.status_code == 200
+    assert [res["status"] for res in r.json()["results"]] == [200, 400]
+
+
+def test_sparse_fields_return_only_requested_columns(
+    client: TestClient, db: Session, admin_token_headers: dict[str, str]
+) -> None:
+    plan = create_random_plan(db)
+    group = ClientGroup(name=random_lower_string())
+    db.add(group)
+    db.commit()
+    db.add(PlanInstance(
+        client_group_id=group.id, plan_id=plan.id, start_date=datetime.utcnow(), total_cost=10.0,
+        remaining_limits={"daily": 1},
+    ))
+    db.commit()
+
+    r = client.get(
+        f"{settings.API_V1_STR}/admin/plan-instances",
+        headers=admin_token_headers,
+        params={"plan_id": str(plan.id), "fields": "id,plan.name"},
+    )
+    assert r.status_code == 200
+    [row] = r.json()
+    assert set(row) == {"id", "plan"}
+    assert row["plan"] == {"name": plan.name}
+
+    r = client.get(
+        f"{settings.API_V1_STR}/admin/clients",
+        headers=admin_token_headers,
+        params={"fields": "id,full_name,qr_code"},
+    )
+    assert all(set(row) == {"id", "full_name", "qr_code"} for row in r.json())
+
+    r = client.get(
+        f"{settings.API_V1_STR}/admin/all-visits",
+        headers=admin_token_headers,
+        params={"fields": "id,details"},
+    )
+    assert r.status_code == 400
@@ -0,0 +1,45 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.tests.utils.ai import FakeGenerativeModel
+
+
+def test_stream_tasks_sends_one_event_per_task(
+    client: TestClient, normal_user_token_headers: dict[str, str], fake_model: FakeGenerativeModel
+) -> None:
+    fake_model.payload = [{"task_id": "1"}, {"task_id": "2"}]
+    with client.stream(
+        "POST",
+        f"{settings.API_V1_STR}/ai/tasks/stream",
+        headers=normal_user_token_headers,
+        json={"messages": [{"role": "user", "content": "Plan a party"}]},
+    ) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = "".join(response.iter_text())
+
+    events = [block.split("\n") for block in body.strip().split("\n\n")]
+    tasks = [json.loads(lines[1][len("data: "):]) for lines in events if lines[0] == "event: task"]
+    assert tasks == [{"task_id": "1"}, {"task_id": "2"}]
+    assert events[-1][0] == "event: done"
+
+
+def test_stream_tasks_reports_unexpected_errors_as_an_event(
+    client: TestClient, normal_user_token_headers: dict[str, str], fake_model: FakeGenerativeModel
+) -> None:
+    def broken_reply(*args: object) -> str:
+        raise RuntimeError("upstream closed the connection")
+
+    fake_model.reply = broken_reply
+    with client.stream(
+        "POST",
+        f"{settings.API_V1_STR}/ai/tasks/stream",
+        headers=normal_user_token_headers,
+        json={"messages": [{"role": "user", "content": "Plan a party"}]},
+    ) as response:
+        body = "".join(response.iter_text())
+
+    events = [block.split("\n") for block in body.strip().split("\n\n")]
+    assert events[-1] == ["event: error", 'data: {"detail": "Generation failed"}']
@@ -0,0 +1,122 @@
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from app import crud
+from app.core.config import settings
+from app.old_models import Client, ClientGroup, ClientGroupAdminLink, UserCreate, UserGroupAccess
+from app.services.group_access import can_access_group
+from app.tests.utils.user import create_random_user, user_authentication_headers
+from app.tests.utils.utils import random_email, random_lower_string
+
+
+def create_group(db: Session) -> ClientGroup:
+    group = ClientGroup(name=random_lower_string())
+    db.add(group)
+    db.commit()
+    db.refresh(group)
+    return group
+
+
+def access(db: Session, user_id) -> set[tuple]:  # type: ignore[no-untyped-def]
+    rows = db.exec(select(UserGroupAccess).where(UserGroupAccess.user_id == user_id)).all()
+    return {(row.client_group_id, row.via) for row in rows}
+
+
+def test_access_follows_membership_changes(db: Session) -> None:
+    user = create_random_user(db)
+    first, second = create_group(db), create_group(db)
+    client = Client(full_name="Parent", user_id=user.id, group_id=first.id, identification="1")
+    db.add(client)
+    db.commit()
+    assert access(db, user.id) == {(first.id, "member")}
+
+    client.group_id = second.id
+    db.add(client)
+    db.commit()
+    assert access(db, user.id) == {(second.id, "member")}
+    assert not can_access_group(db, user.id, first.id)
+
+    db.add(ClientGroupAdminLink(client_group_id=first.id, admin_id=user.id))
+    db.commit()
+    assert can_access_group(db, user.id, first.id)
+    assert can_access_group(db, user.id, first.id, via="admin_link")
+    assert not can_access_group(db, user.id, second.id, via="admin_link")
+
+    link = db.get(ClientGroupAdminLink, (first.id, user.id))
+    db.delete(link)
+    db.delete(client)
+    db.commit()
+    assert access(db, user.id) == set()
+
+
+def test_my_groups_uses_access_table(client: TestClient, db: Session) -> None:
+    password = random_lower_string()
+    user = crud.create_user(session=db, user_create=UserCreate(email=random_email(), password=password))
+    group = create_group(db)
+    parent = Client(full_name="Parent", user_id=user.id, group_id=group.id, identification="2")
+    db.add(parent)
+    db.commit()
+    headers = user_authentication_headers(client=client, email=user.email, password=password)
+
+    r = client.get(f"{settings.API_V1_STR}/clients/groups/my-groups", headers=headers)
+
+    assert r.status_code == 200
+    assert [g["id"] for g in r.json()] == [str(group.id)]
+    db.delete(parent)
+    db.commit()
+
+
+def test_bulk_membership(
+    client: TestClient, db: Session, admin_token_headers: dict[str, str]
+) -> None:
+    first, second = create_group(db), create_group(db)
+    members = [Client(full_name=f"Member {n}", identification=str(n)) for n in range(5)]
+    db.add_all(members)
+    db.commit()
+    ids = [str(m.id) for m in members]
+    url = f"{settings.API_V1_STR}/clients/groups/{first.id}/bulk/clients"
+
+    r = client.post(f"{url}/add", headers=admin_token_headers, json={"client_ids": ids + ids[:1]})
+    assert r.json() == {"requested": 5, "changed": 5, "unchanged": 0}
+
+    r = client.post(
+        f"{url}/move", headers=admin_token_headers,
+        json={"client_ids": ids[:2], "target_group_id": str(second.id)},
+    )
+    assert r.json()["changed"] == 2
+
+    r = client.post(f"{url}/remove", headers=admin_token_headers, json={"client_ids": ids})
+    assert r.json() == {"requested": 5, "changed": 3, "unchanged": 2}
+
+    db.expire_all()
+    assert [m.group_id for m in members] == [second.id, second.id, None, None, None]
+
+    for m in members:
+        db.delete(m)
+    db.delete(first)
+    db.delete(second)
+    db.commit()
+
+
+def test_bulk_admins_keep_one_admin(
+    client: TestClient, db: Session, admin_token_headers: dict[str, str]
+) -> None:
+    group = create_group(db)
+    users = [create_random_user(db) for _ in range(2)]
+    ids = [str(u.id) for u in users]
+    url = f"{settings.API_V1_STR}/clients/groups/{group.id}/bulk/admins"
+
+    r = client.post(f"{url}/add", headers=admin_token_headers, json={"admin_ids": ids})
+    assert r.json()["changed"] == 2
+    r = client.post(f"{url}/add", headers=admin_token_headers, json={"admin_ids": ids})
+    assert r.json()["unchanged"] == 2
+
+    r = client.post(f"{url}/remove", headers=admin_token_headers, json={"admin_ids": ids})
+    assert r.status_code == 400
+    r = client.post(f"{url}/remove", headers=admin_token_headers, json={"admin_ids": ids[:1]})
+    assert r.json()["changed"] == 1
+
+    db.delete(db.get(ClientGroupAdminLink, (group.id, users[1].id)))
+    db.commit()
+    db.delete(group)
+    db.commit()
@@ -0,0 +1,120 @@
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.core.db import engine
+
+PLANS_URL = f"{settings.API_V1_STR}/clients/plans/available-plans"
+
+
+@contextmanager
+def count_queries() -> Iterator[list[str]]:
+    statements: list[str] = []
+
+    def record(conn, cursor, statement, *args) -> None:  # type: ignore[no-untyped-def]
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def create_plan(client: TestClient, headers: dict[str, str], tag: str) -> dict:
+    r = client.post(
+        f"{settings.API_V1_STR}/admin/plans",
+        headers=headers,
+        json={"name": f"plan {uuid.uuid4().hex[:8]}", "description": "d", "price": 25.0, "tags": [tag]},
+    )
+    assert r.status_code == 200
+    return r.json()
+
+
+def test_catalogue_serves_per_tag_lists_with_etag(
+    client: TestClient, admin_token_headers: dict[str, str]
+) -> None:
+    tag = f"party-{uuid.uuid4().hex[:8]}"
+    plan = create_plan(client, admin_token_headers, tag)
+
+    r = client.get(PLANS_URL, params={"tag": tag})
+    assert r.status_code == 200
+    assert [p["id"] for p in r.json()] == [plan["id"]]
+    assert r.headers["etag"].startswith('"')
+    assert "max-age" in r.headers["cache-control"]
+
+    with count_queries() as statements:
+        cached = client.get(PLANS_URL, params={"tag": tag}, headers={"If-None-Match": r.headers["etag"]})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == r.headers["etag"]
+    assert statements == []
+
+
+def test_plan_changes_invalidate_catalogue(
+    client: TestClient, admin_token_headers: dict[str, str]
+) -> None:
+    tag = f"class-{uuid.uuid4().hex[:8]}"
+    plan = create_plan(client, admin_token_headers, tag)
+    first = client.get(f"{PLANS_URL}/{plan['id']}")
+    assert first.json()["price"] == 25.0
+
+    r = client.put(
+        f"{settings.API_V1_STR}/admin/plans/{plan['id']}",
+        headers=admin_token_headers,
+        json={"price": 30.0},
+    )
+    assert r.status_code == 200
+
+    second = client.get(f"{PLANS_URL}/{plan['id']}", headers={"If-None-Match": first.headers["etag"]})
+    assert second.status_code == 200
+    assert second.json()["price"] == 30.0
+    assert second.headers["etag"] != first.headers["etag"]
+
+    client.put(
+        f"{settings.API_V1_STR}/admin/plans/{plan['id']}",
+        headers=admin_token_headers,
+        json={"is_active": False},
+    )
+    assert client.get(f"{PLANS_URL}/{plan['id']}").status_code == 404
+    assert client.get(PLANS_URL, params={"tag": tag}).json() == []
+
+
+def test_multi_tag_filter_and_facet_counts(
+    client: TestClient, admin_token_headers: dict[str, str]
+) -> None:
+    suffix = uuid.uuid4().hex[:8]
+    party, kids, adults = f"party-{suffix}", f"kids-{suffix}", f"adults-{suffix}"
+    both = create_plan(client, admin_token_headers, party)
+    client.put(
+        f"{settings.API_V1_STR}/admin/plans/{both['id']}",
+        headers=admin_token_headers,
+        json={"tags": [party, kids]},
+    )
+    party_only = create_plan(client, admin_token_headers, party)
+    adults_only = create_plan(client, admin_token_headers, adults)
+
+    r = client.get(PLANS_URL, params={"tags": [party, kids], "match": "all"})
+    assert [p["id"] for p in r.json()] == [both["id"]]
+
+    r = client.get(PLANS_URL, params={"tags": [kids, adults], "match": "any"})
+    assert {p["id"] for p in r.json()} == {both["id"], adults_only["id"]}
+
+    r = client.get(
+        f"{settings.API_V1_STR}/admin/plans",
+        headers=admin_token_headers,
+        params={"tags": [party, kids], "match": "any"},
+    )
+    assert {p["id"] for p in r.json()} == {both["id"], party_only["id"]}
+
+    r = client.get(f"{settings.API_V1_STR}/clients/plans/plan-tags")
+    counts = {row["tag"]: row["count"] for row in r.json()}
+    assert (counts[party], counts[kids], counts[adults]) == (2, 1, 1)
+
+    r = client.get(f"{settings.API_V1_STR}/clients/plans/plan-tags", params={"tags": [party]})
+    counts = {row["tag"]: row["count"] for row in r.json()}
+    assert (counts[party], counts[kids]) == (2, 1)
+    assert adults not in counts
@@ -0,0 +1,79 @@
+import uuid
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+
+
+def _submit(client: TestClient, headers: dict[str, str], form_type: str, data: dict) -> None:
+    r = client.post(
+        f"{settings.API_V1_STR}/forms/",
+        headers=headers,
+        json={"form_type": form_type, "form_data": data},
+    )
+    assert r.status_code == 201
+
+
+def _query(client: TestClient, headers: dict[str, str], body: dict) -> dict:
+    r = client.post(f"{settings.API_V1_STR}/forms/query", headers=headers, json=body)
+    assert r.status_code == 200, r.text
+    return r.json()["data"]
+
+
+def test_query_forms_by_field_path(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    form_type = f"intake-{uuid.uuid4().hex}"
+    for budget, city in [(500, "Bogotá"), (1500, "Medellín"), (3000, "Bogotá")]:
+        _submit(client, normal_user_token_headers, form_type,
+                {"budget": budget, "contact": {"city": city}})
+
+    data = _query(client, normal_user_token_headers, {
+        "form_type": form_type,
+        "filters": [{"path": "budget", "op": "gt", "value": 1000}],
+    })
+    assert sorted(f["form_data"]["budget"] for f in data["forms"]) == [1500, 3000]
+
+    data = _query(client, normal_user_token_headers, {
+        "form_type": form_type,
+        "filters": [
+            {"path": "contact.city", "op": "eq", "value": "Bogotá"},
+            {"path": "budget", "op": "lte", "value": 1000},
+        ],
+    })
+    assert [f["form_data"]["budget"] for f in data["forms"]] == [500]
+
+
+def test_aggregate_forms_by_field_path(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    form_type = f"intake-{uuid.uuid4().hex}"
+    for budget, city in [(100, "Cali"), (300, "Cali"), (1000, "Pasto")]:
+        _submit(client, normal_user_token_headers, form_type,
+                {"budget": budget, "contact": {"city": city}})
+    _submit(client, normal_user_token_headers, form_type, {"budget": "unknown"})
+
+    data = _query(client, normal_user_token_headers, {
+        "form_type": form_type,
+        "aggregate": {"func": "avg", "path": "budget", "group_by": "contact.city"},
+    })
+    assert data["result"] == [
+        {"group": "Cali", "value": 200.0},
+        {"group": "Pasto", "value": 1000.0},
+    ]
+
+    data = _query(client, normal_user_token_headers, {
+        "form_type": form_type, "aggregate": {"func": "count"},
+    })
+    assert data["result"] == 4
+
+
+def test_query_forms_rejects_invalid_path(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.post(
+        f"{settings.API_V1_STR}/forms/query",
+        headers=normal_user_token_headers,
+        json={"filters": [{"path": "budget') OR true --", "op": "gt", "value": 1}]},
+    )
+    assert r.status_code == 422
@@ -0,0 +1,58 @@
+from fastapi.testclient import TestClient
+from sqlmodel import Session, delete
+
+from app.core.config import settings
+from app.old_models import Client, ClientGroup, Notification, NotificationInbox, NotificationReadCursor
+from app.tests.utils.utils import random_lower_string
+
+
+def test_feed_and_read_cursor(
+    client: TestClient, db: Session, admin_token_headers: dict[str, str]
+) -> None:
+    group = ClientGroup(name=random_lower_string())
+    db.add(group)
+    db.commit()
+    members = [Client(full_name=f"Member {n}", identification=str(n), group_id=group.id) for n in range(3)]
+    outsider = Client(full_name="Outsider", identification="outsider")
+    db.add_all([*members, outsider])
+    db.commit()
+    url = f"{settings.API_V1_STR}/admin/notifications"
+
+    r = client.post(url, headers=admin_token_headers, json={"message": "nobody"})
+    assert r.status_code == 400
+    group_note = client.post(
+        url, headers=admin_token_headers, json={"message": "pool closed", "target_group_id": str(group.id)}
+    ).json()
+    broadcast = client.post(
+        url, headers=admin_token_headers, json={"message": "holiday hours", "is_broadcast": True}
+    ).json()
+
+    def feed(c: Client) -> dict:
+        r = client.get(
+            f"{settings.API_V1_STR}/clients/notifications/",
+            headers=admin_token_headers, params={"client_id": str(c.id)},
+        )
+        assert r.status_code == 200
+        return r.json()
+
+    ids = [n["id"] for n in feed(members[0])["data"]]
+    assert ids[:2] == [broadcast["id"], group_note["id"]]
+    outsider_ids = [n["id"] for n in feed(outsider)["data"]]
+    assert broadcast["id"] in outsider_ids and group_note["id"] not in outsider_ids
+
+    r = client.post(
+        f"{settings.API_V1_STR}/clients/notifications/read",
+        headers=admin_token_headers, params={"client_id": str(members[0].id)}, json={},
+    )
+    assert r.json()["unread"] == 0
+    after = feed(members[0])
+    assert after["unread"] == 0 and all(n["is_read"] for n in after["data"])
+    assert feed(members[1])["unread"] >= 2
+
+    client_ids = [c.id for c in [*members, outsider]]
+    db.exec(delete(NotificationInbox).where(NotificationInbox.client_id.in_(client_ids)))
+    db.exec(delete(NotificationReadCursor).where(NotificationReadCursor.client_id.in_(client_ids)))
+    db.exec(delete(Notification).where(Notification.id.in_([group_note["id"], broadcast["id"]])))
+    db.exec(delete(Client).where(Client.id.in_(client_ids)))
+    db.exec(delete(ClientGroup).where(ClientGroup.id == group.id))
+    db.commit()
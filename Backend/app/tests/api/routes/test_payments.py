@@ -0,0 +1,99 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, func, select
+
+from app.core.config import settings
+from app.old_models import Payment, PaymentWebhookEvent, PlanInstance
+from app.services import payment_webhooks
+from app.tests.utils.epayco import FakeEpaycoGateway
+from app.tests.utils.plan import create_pending_payment
+
+
+def settle(db: Session, timeout: float = 30.0) -> None:
+    # The app's own worker may hold a batch; wait until every event is committed
+    deadline = time.monotonic() + timeout
+    while True:
+        payment_webhooks.drain(db)
+        if payment_webhooks.pending_count(db) == 0:
+            return
+        assert time.monotonic() < deadline, "webhook events were not applied"
+        time.sleep(0.05)
+
+
+def test_webhook_duplicates_are_acknowledged(client: TestClient, db: Session) -> None:
+    payment = create_pending_payment(db)
+    gateway = FakeEpaycoGateway(client)
+    event = gateway.confirmation(payment.id, payment.amount)
+
+    first = gateway.send(event)
+    second = gateway.send(event)
+
+    assert first == {"received": True, "duplicate": False}
+    assert second == {"received": True, "duplicate": True}
+
+
+def test_webhook_burst_applies_each_payment_once(client: TestClient, db: Session) -> None:
+    payments = [create_pending_payment(db, amount=50.0) for _ in range(20)]
+    gateway = FakeEpaycoGateway(client, seed=27)
+    events = [gateway.confirmation(p.id, p.amount) for p in payments]
+
+    results = gateway.replay_burst(events, total=10_000)
+    settle(db)
+
+    assert sum(not r["duplicate"] for r in results) == len(events)
+    stored = db.exec(
+        select(func.count(PaymentWebhookEvent.id)).where(
+            PaymentWebhookEvent.transaction_id.in_([e["x_transaction_id"] for e in events])
+        )
+    ).one()
+    assert stored == len(events)
+    for payment in payments:
+        db.refresh(payment)
+        instance = db.get(PlanInstance, payment.plan_instance_id)
+        db.refresh(instance)
+        assert payment.status == "completed"
+        assert instance.is_active
+        assert instance.paid_amount == 50.0
+
+
+def test_webhook_late_pending_does_not_undo_completion(client: TestClient, db: Session) -> None:
+    payment = create_pending_payment(db)
+    gateway = FakeEpaycoGateway(client)
+    accepted = gateway.confirmation(payment.id, payment.amount, response_code=1)
+    pending = dict(accepted, x_cod_response="3", x_response="Pendiente")
+
+    gateway.send(accepted)
+    settle(db)
+    gateway.send(pending)
+    settle(db)
+
+    db.refresh(payment)
+    assert payment.status == "completed"
+    assert db.get(Payment, payment.id).status == "completed"
+
+
+def test_webhook_without_credentials_is_rejected_outside_local(
+    client: TestClient, db: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    payment = create_pending_payment(db)
+    gateway = FakeEpaycoGateway(client)
+    monkeypatch.delenv("EPAYCO_P_CUST_ID_CLIENTE", raising=False)
+    monkeypatch.delenv("EPAYCO_P_KEY", raising=False)
+    monkeypatch.setattr(settings, "ENVIRONMENT", "production")
+
+    r = client.post(
+        f"{settings.API_V1_STR}/payments/epayco/webhook",
+        data=gateway.confirmation(payment.id, payment.amount),
+    )
+
+    assert r.status_code == 400
+    db.refresh(payment)
+    assert payment.status == "pending"
+
+
+@pytest.mark.parametrize("body", [[], "x", 1])
+def test_webhook_rejects_a_json_body_that_is_not_an_object(client: TestClient, body: object) -> None:
+    r = client.post(f"{settings.API_V1_STR}/payments/epayco/webhook", json=body)
+    assert r.status_code == 422
@@ -2,12 +2,12 @@ import uuid
 from unittest.mock import patch
 
 from fastapi.testclient import TestClient
-from sqlmodel import Session, select
+from sqlmodel import Session, delete, select
 
 from app import crud
 from app.core.config import settings
 from app.core.security import verify_password
-from app.old_models import User, UserCreate
+from app.old_models import Client, ClientGroup, ClientGroupAdminLink, QRCode, User, UserCreate
 from app.tests.utils.utils import random_email, random_lower_string
 
 
@@ -484,3 +484,36 @@ def test_delete_user_without_privileges(
     )
     assert r.status_code == 403
     assert r.json()["detail"] == "The user doesn't have enough privileges"
+
+
+def test_register_family(client: TestClient, db: Session) -> None:
+    email = random_email()
+    data = {
+        "user": {"email": email, "password": random_lower_string(), "full_name": "Parent"},
+        "parent": {"identification": random_lower_string(), "full_name": "Parent", "email": email, "phone": "300"},
+        "children": [
+            {"identification": random_lower_string(), "full_name": f"Child {n}", "email": None, "phone": None}
+            for n in range(3)
+        ],
+    }
+    r = client.post(f"{settings.API_V1_STR}/users/signup-family", json=data)
+    assert r.status_code == 200
+    family = r.json()
+    group_id = uuid.UUID(family["client_group_id"])
+
+    clients = db.exec(select(Client).where(Client.group_id == group_id)).all()
+    assert len(clients) == 4
+    assert sum(c.is_child for c in clients) == 3
+    assert all(c.qr_code for c in clients)
+    assert db.get(ClientGroupAdminLink, (group_id, uuid.UUID(family["user"]["id"])))
+
+    r = client.post(f"{settings.API_V1_STR}/users/signup-family", json=data)
+    assert r.status_code == 400
+    assert r.json()["detail"] == "A user with this email already exists."
+
+    for c in clients:
+        db.exec(delete(QRCode).where(QRCode.client_id == c.id))
+        db.delete(c)
+    db.exec(delete(ClientGroupAdminLink).where(ClientGroupAdminLink.client_group_id == group_id))
+    db.delete(db.get(ClientGroup, group_id))
+    db.commit()
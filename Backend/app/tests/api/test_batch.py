@@ -0,0 +1,27 @@
+import inspect
+import typing
+
+from fastapi.dependencies.utils import solve_dependencies
+from fastapi.routing import run_endpoint_function, serialize_response
+
+
+def parameters(function: typing.Callable[..., typing.Any]) -> set[str]:
+    return set(inspect.signature(function).parameters)
+
+
+def test_fastapi_internals_used_by_batch_are_unchanged() -> None:
+    # app.api.batch calls these private helpers directly. If this fails after
+    # a FastAPI upgrade, update _run in app/api/batch.py before the pin.
+    assert {
+        "request", "dependant", "body", "background_tasks",
+        "dependency_overrides_provider", "async_exit_stack",
+    } <= parameters(solve_dependencies)
+    returned = inspect.signature(solve_dependencies).return_annotation
+    assert typing.get_origin(returned) is tuple
+    assert len(typing.get_args(returned)) == 5
+
+    assert {"dependant", "values", "is_coroutine"} <= parameters(run_endpoint_function)
+    assert {
+        "field", "response_content", "include", "exclude", "by_alias", "exclude_unset",
+        "exclude_defaults", "exclude_none", "is_coroutine",
+    } <= parameters(serialize_response)
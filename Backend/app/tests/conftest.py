@@ -1,17 +1,27 @@
 from collections.abc import Generator
+from pathlib import Path
 
 import pytest
 from fastapi.testclient import TestClient
 from sqlmodel import Session, delete
 
+from app import ai_handler, crud
 from app.core.config import settings
 from app.core.db import engine, init_db
+from app.core.profiler import sql_profiler
 from app.main import app
-from app.old_models import Item, User
-from app.tests.utils.user import authentication_token_from_email
+from app.old_models import (
+    AdminAction, AdminUser, Form, Item, Notification, NotificationInbox, NotificationReadCursor, User,
+)
+from app.tests.utils.ai import FakeGenerativeModel
+from app.tests.utils.user import authentication_token_from_email, make_admin
 from app.tests.utils.utils import get_superuser_token_headers
 
 
+# Routes that go over their declared query_budget() fail the test
+sql_profiler.strict = True
+
+
 @pytest.fixture(scope="session", autouse=True)
 def db() -> Generator[Session, None, None]:
     with Session(engine) as session:
@@ -19,6 +29,12 @@ def db() -> Generator[Session, None, None]:
         yield session
         statement = delete(Item)
         session.execute(statement)
+        session.execute(delete(Form))
+        session.execute(delete(NotificationInbox))
+        session.execute(delete(NotificationReadCursor))
+        session.execute(delete(Notification))
+        session.execute(delete(AdminAction))
+        session.execute(delete(AdminUser))
         statement = delete(User)
         session.execute(statement)
         session.commit()
@@ -40,3 +56,29 @@ def normal_user_token_headers(client: TestClient, db: Session) -> dict[str, str]
     return authentication_token_from_email(
         client=client, email=settings.EMAIL_TEST_USER, db=db
     )
+
+
+@pytest.fixture(scope="module")
+def admin_token_headers(
+    client: TestClient, db: Session, superuser_token_headers: dict[str, str]
+) -> dict[str, str]:
+    user = crud.get_user_by_email(session=db, email=settings.FIRST_SUPERUSER)
+    make_admin(db, user)
+    return superuser_token_headers
+
+
+@pytest.fixture()
+def fake_model(tmp_path: Path) -> Generator[FakeGenerativeModel, None, None]:
+    """
+    Serve Gemini calls from a FakeGenerativeModel with an empty response cache.
+
+    Tests change its payload or chunk_delay as they need. The model factory
+    and cache in use before are put back afterwards.
+    """
+    model = FakeGenerativeModel("fake")
+    original_factory, original_cache = ai_handler._model_factory, ai_handler.response_cache
+    ai_handler.response_cache = ai_handler.ResponseCache(str(tmp_path / "cache.sqlite3"))
+    ai_handler.set_model_factory(lambda model_str: model)
+    yield model
+    ai_handler.set_model_factory(original_factory)
+    ai_handler.response_cache = original_cache
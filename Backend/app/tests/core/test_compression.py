@@ -0,0 +1,97 @@
+import gzip
+import zlib
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core.compression import CompressionMiddleware, CompressionStats, choose_encoding
+
+ROWS = [{"id": i, "full_name": f"Client {i}", "email": f"client{i}@example.com"} for i in range(200)]
+
+
+def make_client(stats: CompressionStats) -> TestClient:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=500, stats=stats)
+
+    @app.get("/clients")
+    def clients() -> list[dict]:
+        return ROWS
+
+    @app.get("/small")
+    def small() -> dict:
+        return {"ok": True}
+
+    @app.get("/text")
+    def text() -> PlainTextResponse:
+        return PlainTextResponse("x" * 5000, media_type="image/svg+xml")
+
+    @app.get("/export")
+    def export() -> StreamingResponse:
+        def rows():
+            for i in range(100):
+                yield f"{i},client {i},client{i}@example.com\n"
+        return StreamingResponse(rows(), media_type="text/csv")
+
+    return TestClient(app)
+
+
+def test_choose_encoding() -> None:
+    assert choose_encoding("gzip, deflate, br", ("br", "gzip")) == "br"
+    assert choose_encoding("gzip, br;q=0.5", ("br", "gzip")) == "gzip"
+    assert choose_encoding("br;q=0, *", ("br", "gzip")) == "gzip"
+    assert choose_encoding("identity", ("br", "gzip")) is None
+    assert choose_encoding("", ("gzip",)) is None
+
+
+def test_large_json_is_gzipped_and_counted() -> None:
+    stats = CompressionStats()
+    client = make_client(stats)
+
+    r = client.get("/clients", headers={"Accept-Encoding": "gzip"})
+
+    assert r.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in r.headers["vary"]
+    assert r.json() == ROWS
+    entry = stats.snapshot()["/clients"]
+    assert entry["compressed"] == 1
+    assert entry["bytes_sent"] == int(r.headers["content-length"])
+    assert entry["bytes_saved"] > entry["bytes_original"] // 2
+
+
+def test_small_and_unlisted_responses_are_not_compressed() -> None:
+    client = make_client(CompressionStats())
+
+    small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    svg = client.get("/text", headers={"Accept-Encoding": "gzip"})
+    identity = client.get("/clients", headers={"Accept-Encoding": "identity"})
+
+    assert "content-encoding" not in small.headers
+    assert "content-encoding" not in svg.headers
+    assert "content-encoding" not in identity.headers
+    assert identity.json() == ROWS
+
+
+def test_streamed_export_is_compressed_per_chunk() -> None:
+    stats = CompressionStats()
+    client = make_client(stats)
+
+    with client.stream("GET", "/export", headers={"Accept-Encoding": "gzip"}) as r:
+        assert r.headers["content-encoding"] == "gzip"
+        assert "content-length" not in r.headers
+        raw = b"".join(r.iter_raw())
+
+    # Every chunk ends in a sync flush, so each row is decodable as it arrives
+    text = gzip.decompress(raw).decode()
+    assert text.splitlines()[99] == "99,client 99,client99@example.com"
+    assert zlib.decompressobj(31).decompress(raw[:200])
+    assert stats.snapshot()["/export"]["bytes_sent"] == len(raw)
+
+
+def test_brotli_is_preferred_when_accepted() -> None:
+    client = make_client(CompressionStats())
+
+    r = client.get("/clients", headers={"Accept-Encoding": "gzip, br"})
+
+    assert r.headers["content-encoding"] == "br"
+    assert r.json() == ROWS
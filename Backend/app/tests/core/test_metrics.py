@@ -0,0 +1,43 @@
+import prometheus_client
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app.core.metrics import MetricsMiddleware, RequestMetrics, metrics_endpoint, track_queries
+
+
+def make_client(metrics: RequestMetrics) -> TestClient:
+    engine = create_engine("sqlite://")
+    track_queries(engine)
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, metrics=metrics)
+    app.add_route("/metrics", metrics_endpoint(metrics, token="secret"))
+
+    @app.get("/clients/{client_id}")
+    def client(client_id: int) -> dict:
+        with engine.connect() as conn:
+            for _ in range(3):
+                conn.execute(text("SELECT 1"))
+        return {"id": client_id}
+
+    return TestClient(app)
+
+
+def test_request_and_query_metrics() -> None:
+    metrics = RequestMetrics(prometheus_client.CollectorRegistry())
+    client = make_client(metrics)
+    for client_id in range(4):
+        assert client.get(f"/clients/{client_id}").status_code == 200
+    client.get("/missing")
+
+    sample = metrics.registry.get_sample_value
+    route = {"method": "GET", "route": "/clients/{client_id}"}
+    assert sample("http_request_duration_seconds_count", {**route, "status": "200"}) == 4
+    assert sample("http_request_db_queries_sum", route) == 12
+    assert sample("http_request_duration_seconds_count",
+                  {"method": "GET", "route": "unmatched", "status": "404"}) == 1
+    assert sample("http_requests_in_progress", {"method": "GET"}) == 0
+
+    assert client.get("/metrics").status_code == 401
+    r = client.get("/metrics", headers={"Authorization": "Bearer secret"})
+    assert 'route="/clients/{client_id}"' in r.text
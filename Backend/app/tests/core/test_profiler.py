@@ -0,0 +1,65 @@
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app.core.profiler import (
+    QueryBudgetExceeded, SQLProfiler, SQLProfilerMiddleware, capture_queries, query_budget,
+    statement_shape,
+)
+
+engine = create_engine("sqlite://")
+
+
+def make_client(profiler: SQLProfiler) -> TestClient:
+    profiler.install(engine)
+    app = FastAPI()
+    app.add_middleware(SQLProfilerMiddleware, profiler=profiler)
+
+    @app.get("/lazy", dependencies=[Depends(query_budget(3))])
+    def lazy() -> dict:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            for n in range(6):  # one query per row, like a lazy relationship in a loop
+                conn.execute(text("SELECT :n"), {"n": n})
+        return {}
+
+    @app.get("/batched", dependencies=[Depends(query_budget(3))])
+    def batched() -> dict:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return {}
+
+    return TestClient(app)
+
+
+def test_statement_shape() -> None:
+    assert statement_shape("SELECT * FROM client\n WHERE id = %(id_1)s::UUID") == (
+        "SELECT * FROM client WHERE id = ?"
+    )
+    assert statement_shape("SELECT 1 WHERE id IN (%(id_1_1)s, %(id_1_2)s)") == "SELECT 1 WHERE id IN (?)"
+
+
+def test_header_reports_repeated_statements() -> None:
+    client = make_client(SQLProfiler(repeat_threshold=5))
+    r = client.get("/lazy")
+    assert r.headers["X-SQL-Profile"].startswith("queries=7; ")
+    assert "repeated=1; budget=3" in r.headers["X-SQL-Profile"]
+    assert r.headers["X-SQL-Repeated"].startswith("6x app/tests/core/test_profiler.py:")
+
+    r = client.get("/batched")
+    assert "X-SQL-Repeated" not in r.headers
+
+
+def test_strict_budget_fails_the_request() -> None:
+    client = make_client(SQLProfiler(strict=True))
+    assert client.get("/batched").status_code == 200
+    with pytest.raises(QueryBudgetExceeded, match="GET /lazy ran 7 queries"):
+        client.get("/lazy")
+
+
+def test_capture_queries() -> None:
+    SQLProfiler().install(engine)
+    with capture_queries() as profile, engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert profile.count == 1
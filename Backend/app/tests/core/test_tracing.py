@@ -0,0 +1,49 @@
+import json
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app import ai_handler
+from app.core import tracing
+from app.tests.utils.ai import FakeGenerativeModel
+
+
+def test_spans_are_no_ops_until_tracing_is_set_up() -> None:
+    with tracing.span("smtp.send", {"smtp.host": None}) as current:
+        current.set_attribute("smtp.status_code", 250)
+        tracing.record_exception(current, RuntimeError("boom"))
+    tracing.start_span("gemini.generate_stream").end()
+
+
+def test_request_db_and_manual_spans_share_a_trace(
+    tmp_path: Path, fake_model: FakeGenerativeModel
+) -> None:
+    engine = create_engine("sqlite://")
+    app = FastAPI()
+
+    @app.get("/check-in")
+    def check_in() -> dict:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        with tracing.span("smtp.send", {"smtp.host": "localhost"}):
+            pass
+        ai_handler.generate([{"role": "user", "content": "hi"}], "prompt", use_cache=False)
+        return {}
+
+    path = tmp_path / "traces.jsonl"
+    assert tracing.setup_tracing(
+        app, engine, service_name="test", environment="local", exporter="file", file_path=str(path)
+    )
+    try:
+        assert TestClient(app).get("/check-in").status_code == 200
+    finally:
+        tracing.shutdown_tracing()
+
+    spans = [json.loads(line) for line in path.read_text().splitlines()]
+    by_name = {s["name"]: s for s in spans}
+    assert {"GET /check-in", "SELECT", "smtp.send", "gemini.generate"} <= by_name.keys()
+    assert len({s["context"]["trace_id"] for s in spans}) == 1
+    assert by_name["gemini.generate"]["attributes"]["gen_ai.request.model"] == ai_handler.DEFAULT_MODEL
+
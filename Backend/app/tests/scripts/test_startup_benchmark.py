@@ -0,0 +1,24 @@
+from app.benchmarks.startup import LAZY_MODULES, eager_lazy_modules, parse_importtime, profile_imports
+
+IMPORTTIME_OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:      3000 |       5000 |     sqlalchemy.sql
+import time:      1500 |       9000 | app.main
+"""
+
+
+def test_parse_importtime() -> None:
+    timings = parse_importtime(IMPORTTIME_OUTPUT)
+
+    assert [t.module for t in timings] == ["_io", "sqlalchemy.sql", "app.main"]
+    assert timings[1].self_us == 3000
+    assert timings[1].cumulative_us == 5000
+    assert [t.depth for t in timings] == [1, 2, 0]
+
+
+def test_heavy_dependencies_are_not_imported_at_startup() -> None:
+    timings = profile_imports()
+
+    assert "app.main" in {t.module for t in timings}
+    assert eager_lazy_modules(timings) == [], f"expected lazy: {LAZY_MODULES}"
@@ -0,0 +1,82 @@
+import json
+import time
+
+from app import ai_handler
+from app.tests.utils.ai import FakeGenerativeModel
+
+MESSAGES = [
+    {"role": "user", "content": "I want to open a  bakery"},
+    {"role": "assistant", "content": "Great, tell me more"},
+]
+
+
+def test_model_client_is_reused(fake_model: FakeGenerativeModel) -> None:
+    assert ai_handler.get_model("a") is ai_handler.get_model("a")
+
+
+def test_repeated_conversation_is_served_from_cache(fake_model: FakeGenerativeModel) -> None:
+    first = ai_handler.generate_objective_questions(MESSAGES)
+    # Whitespace differences in the history normalize to the same key
+    reworded = [dict(MESSAGES[0], content="I want to open a bakery"), MESSAGES[1]]
+    second = ai_handler.generate_objective_questions(reworded)
+
+    assert fake_model.calls == 1
+    assert first["cached"] is False
+    assert second["cached"] is True
+    assert second["content"] == first["content"]
+
+
+def test_cache_key_depends_on_schema_and_prompt(fake_model: FakeGenerativeModel) -> None:
+    ai_handler.generate(MESSAGES, "prompt one")
+    ai_handler.generate(MESSAGES, "prompt two")
+    ai_handler.generate(MESSAGES, "prompt one", schema={"type": "array"})
+
+    assert fake_model.calls == 3
+
+
+def test_cache_evicts_least_recently_used(fake_model: FakeGenerativeModel) -> None:
+    ai_handler.response_cache.max_entries = 2
+    for prompt in ["a", "b", "c"]:
+        ai_handler.generate(MESSAGES, prompt)
+    ai_handler.generate(MESSAGES, "a")
+
+    assert fake_model.calls == 4
+
+
+def test_cache_entries_expire(fake_model: FakeGenerativeModel) -> None:
+    ai_handler.response_cache.ttl = 0
+    ai_handler.generate(MESSAGES, "a")
+    ai_handler.generate(MESSAGES, "a")
+
+    assert fake_model.calls == 2
+
+
+def test_json_array_stream_parser_yields_items_as_they_complete() -> None:
+    items = [{"task_id": "1", "name": "a, [b] {c}", "deps": [{"name": "x"}]}, 2, "s\\\"", [3]]
+    text = json.dumps(items)
+    parser = ai_handler.JsonArrayStreamParser()
+
+    seen = []
+    for i in range(0, len(text), 3):
+        seen.extend(parser.feed(text[i:i + 3]))
+
+    assert seen == items
+
+
+def test_stream_tasks_time_to_first_task(fake_model: FakeGenerativeModel) -> None:
+    tasks = [{"task_id": str(i), "task_name": f"Task {i}"} for i in range(10)]
+    fake_model.payload = tasks
+    fake_model.chunk_delay = 0.01
+
+    started = time.perf_counter()
+    stream = ai_handler.generate_tasks_stream(MESSAGES)
+    first = next(stream)
+    time_to_first = time.perf_counter() - started
+    rest = list(stream)
+    total = time.perf_counter() - started
+
+    assert [first, *rest] == tasks
+    assert time_to_first < total / 3
+    # The completed list is cached for the non-streaming call
+    assert ai_handler.generate_tasks(MESSAGES) == tasks
+    assert fake_model.calls == 1
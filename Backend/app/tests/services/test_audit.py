@@ -0,0 +1,108 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, delete
+
+from app import crud
+from app.core.config import settings
+from app.old_models import AdminAction, Client, ClientGroup, Visit
+from app.services import audit
+from app.services.audit import AuditLog, query_actions
+
+
+def test_full_queue_drops_instead_of_blocking() -> None:
+    log = AuditLog(maxsize=2)
+    results = [log.record(uuid.uuid4(), "check_in", "visit", uuid.uuid4()) for _ in range(3)]
+    assert results == [True, True, False]
+    assert log.stats() == {"queued": 2, "written": 0, "dropped": 1}
+
+
+def test_failed_writes_count_as_dropped(monkeypatch: pytest.MonkeyPatch) -> None:
+    log = AuditLog()
+    for _ in range(3):
+        log.record(uuid.uuid4(), "check_in", "visit", uuid.uuid4())
+
+    def broken_write(session: Session, events: list) -> int:
+        raise RuntimeError("database is down")
+
+    monkeypatch.setattr(log, "write", broken_write)
+    assert log.flush() == 0
+    assert log.stats() == {"queued": 0, "written": 0, "dropped": 3}
+
+
+def test_events_wait_for_the_session_to_commit(db: Session, monkeypatch: pytest.MonkeyPatch) -> None:
+    log = AuditLog()
+    monkeypatch.setattr(audit, "audit_log", log)
+
+    audit.record(db, uuid.uuid4(), "check_in", "visit", uuid.uuid4())
+    assert log.stats()["queued"] == 0
+    db.rollback()
+    db.commit()
+    assert log.stats()["queued"] == 0
+
+    audit.record(db, uuid.uuid4(), "check_in", "visit", uuid.uuid4())
+    db.commit()
+    assert log.stats()["queued"] == 1
+
+
+def test_batch_audits_only_what_it_commits(
+    client: TestClient, db: Session, admin_token_headers: dict[str, str], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    log = AuditLog()
+    monkeypatch.setattr(audit, "audit_log", log)
+    group = ClientGroup(name="audited batch")
+    db.add(group)
+    db.commit()
+    member = Client(full_name="Member", group_id=group.id, identification="batch")
+    db.add(member)
+    db.commit()
+    operations = [
+        {"method": "POST", "path": "/visits/check-in", "params": {"client_id": str(member.id)}},
+        {"method": "GET", "path": f"/plans/{uuid.uuid4()}"},
+    ]
+    url = f"{settings.API_V1_STR}/admin/batch"
+
+    r = client.post(url, headers=admin_token_headers, json={"operations": operations})
+    assert r.json()["committed"] is False
+    assert log.stats()["queued"] == 0
+
+    r = client.post(url, headers=admin_token_headers, json={"operations": operations, "mode": "best_effort"})
+    assert r.json()["committed"] is True
+    assert log.stats()["queued"] == 1
+
+    db.exec(delete(Visit).where(Visit.client_id == member.id))
+    db.delete(member)
+    db.commit()
+    db.delete(group)
+    db.commit()
+
+
+def test_flush_writes_one_batch_and_skips_non_admins(
+    db: Session, admin_token_headers: dict[str, str]
+) -> None:
+    admin = crud.get_user_by_email(session=db, email=settings.FIRST_SUPERUSER)
+    entity_id = uuid.uuid4()
+    log = AuditLog(batch_size=100)
+    for n in range(5):
+        log.record(admin.id, "check_in", "visit", entity_id, f"visit {n}")
+    log.record(uuid.uuid4(), "check_in", "visit", entity_id)
+
+    assert log.flush() == 5
+    rows = query_actions(db, entity_type="visit", entity_id=entity_id)
+    assert [r.description for r in rows] == [f"visit {n}" for n in reversed(range(5))]
+    assert query_actions(db, entity_id=entity_id, end=datetime.utcnow() - timedelta(hours=1)) == []
+
+    db.exec(delete(AdminAction).where(AdminAction.entity_id == entity_id))
+    db.commit()
+
+
+def test_audit_log_endpoint(client: TestClient, admin_token_headers: dict[str, str]) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/admin/audit-log",
+        headers=admin_token_headers,
+        params={"action_type": "check_in", "limit": 10},
+    )
+    assert r.status_code == 200
+    assert all(row["action_type"] == "check_in" for row in r.json())
@@ -0,0 +1,179 @@
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.db import engine
+from app.old_models import Client, ClientGroup, Subscription, Visit
+from app.services.credits import (
+    UNCOVERED_KEY, allocate_fifo, balance_cache, charge_visit, get_balance, settle_visits,
+)
+from app.tests.utils.plan import create_random_plan
+from app.tests.utils.utils import random_lower_string
+
+
+def _family(db: Session) -> Client:
+    group = ClientGroup(name=random_lower_string())
+    db.add(group)
+    db.commit()
+    client = Client(full_name=random_lower_string(), group_id=group.id, qr_code=str(uuid.uuid4()))
+    db.add(client)
+    db.commit()
+    db.refresh(client)
+    return client
+
+
+def _subscription(
+    db: Session, group_id: uuid.UUID, remaining: Optional[float], expires_in: timedelta
+) -> Subscription:
+    now = datetime.utcnow()
+    subscription = Subscription(
+        client_group_id=group_id,
+        plan_id=create_random_plan(db).id,
+        start_date=now - timedelta(days=30),
+        end_date=now + expires_in,
+        remaining_time=remaining,
+        total_cost=100.0,
+    )
+    db.add(subscription)
+    db.commit()
+    db.refresh(subscription)
+    return subscription
+
+
+def _finished_visit(db: Session, client: Client, seconds: float) -> Visit:
+    end = datetime.utcnow()
+    visit = Visit(client_id=client.id, check_in=end - timedelta(seconds=seconds), check_out=end)
+    db.add(visit)
+    db.commit()
+    db.refresh(visit)
+    return visit
+
+
+def test_allocate_fifo_takes_soonest_expiring_first() -> None:
+    first = Subscription(id=uuid.uuid4(), remaining_time=600)
+    second = Subscription(id=uuid.uuid4(), remaining_time=3600)
+    assert allocate_fifo([first, second], 1000) == [(first.id, 600), (second.id, 400)]
+    assert allocate_fifo([first, second], 5000) == [(first.id, 600), (second.id, 3600)]
+    assert allocate_fifo([first, second], 0) == []
+
+
+def test_check_out_draws_soonest_expiring_and_skips_expired(db: Session) -> None:
+    client = _family(db)
+    expired = _subscription(db, client.group_id, 3600, timedelta(days=-1))
+    later = _subscription(db, client.group_id, 3600, timedelta(days=20))
+    sooner = _subscription(db, client.group_id, 1800, timedelta(days=2))
+    visit = _finished_visit(db, client, 2400)
+
+    debits = charge_visit(db, visit, client.group_id)
+
+    assert debits == [(sooner.id, 1800), (later.id, 600)]
+    for row in (expired, later, sooner):
+        db.refresh(row)
+    assert (expired.remaining_time, expired.is_active) == (3600, True)
+    assert (sooner.remaining_time, sooner.is_active) == (0, False)
+    assert later.remaining_time == 3000
+    assert charge_visit(db, visit, client.group_id) == []  # already charged
+
+
+def test_unlimited_subscription_covers_the_visit(db: Session) -> None:
+    client = _family(db)
+    timed = _subscription(db, client.group_id, 3600, timedelta(days=1))
+    _subscription(db, client.group_id, None, timedelta(days=30))
+    visit = _finished_visit(db, client, 1200)
+
+    assert charge_visit(db, visit, client.group_id) == []
+    db.refresh(timed)
+    assert timed.remaining_time == 3600
+
+
+def test_concurrent_check_outs_never_spend_the_same_time(db: Session) -> None:
+    client = _family(db)
+    pack = _subscription(db, client.group_id, 3600, timedelta(days=5))
+    visits = [_finished_visit(db, client, 3000) for _ in range(2)]
+    barrier = threading.Barrier(len(visits))
+    drawn = []
+
+    def check_out(visit_id: uuid.UUID) -> None:
+        with Session(engine) as session:
+            visit = session.get(Visit, visit_id)
+            barrier.wait()
+            drawn.append(sum(taken for _, taken in charge_visit(session, visit, client.group_id)))
+
+    threads = [threading.Thread(target=check_out, args=(v.id,)) for v in visits]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    db.refresh(pack)
+    assert sorted(drawn) == [600, 3000]
+    assert (pack.remaining_time, pack.is_active) == (0, False)
+    uncovered = []
+    for visit in visits:
+        db.refresh(visit)
+        uncovered.append(visit.details.get(UNCOVERED_KEY, 0))
+    assert sorted(uncovered) == [0, 2400]
+
+
+def test_settle_visits_in_one_transaction(db: Session) -> None:
+    family, other = _family(db), _family(db)
+    pack = _subscription(db, family.group_id, 1000, timedelta(days=5))
+    other_pack = _subscription(db, other.group_id, 1000, timedelta(days=5))
+    visits = [
+        _finished_visit(db, family, 300),
+        _finished_visit(db, family, 300),
+        _finished_visit(db, other, 500),
+    ]
+    open_visit = Visit(client_id=family.id)
+    db.add(open_visit)
+    db.commit()
+
+    result = settle_visits(db, visits + [open_visit])
+
+    assert result == {"settled": [v.id for v in visits], "skipped": [open_visit.id]}
+    db.refresh(pack)
+    db.refresh(other_pack)
+    assert (pack.remaining_time, other_pack.remaining_time) == (400, 500)
+    assert settle_visits(db, visits)["settled"] == []
+
+
+def test_balance_is_cached_until_the_group_is_charged(db: Session) -> None:
+    client = _family(db)
+    _subscription(db, client.group_id, 3600, timedelta(days=5))
+    _subscription(db, client.group_id, 600, timedelta(days=-1))
+    balance_cache.clear()
+
+    assert get_balance(db, client.group_id) == (3600, False)
+    _subscription(db, client.group_id, 100, timedelta(days=5))
+    assert get_balance(db, client.group_id).seconds == 3600  # served from the cache
+
+    charge_visit(db, _finished_visit(db, client, 60), client.group_id)
+    assert get_balance(db, client.group_id).seconds == 3640
+
+
+def test_check_out_route_charges_the_visit(
+    client: TestClient, db: Session, admin_token_headers: dict[str, str]
+) -> None:
+    member = _family(db)
+    pack = _subscription(db, member.group_id, 7200, timedelta(days=5))
+    visit = Visit(client_id=member.id, check_in=datetime.utcnow() - timedelta(minutes=30))
+    db.add(visit)
+    db.commit()
+
+    r = client.put(
+        f"{settings.API_V1_STR}/admin/visits/{visit.id}/check-out", headers=admin_token_headers
+    )
+    assert r.status_code == 200
+    db.refresh(pack)
+    assert 7200 - 1805 < pack.remaining_time < 7200 - 1795
+
+    r = client.get(
+        f"{settings.API_V1_STR}/admin/client-groups/{member.group_id}/time-balance",
+        headers=admin_token_headers,
+    )
+    assert r.json() == {"seconds": pack.remaining_time, "unlimited": False}
@@ -0,0 +1,110 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app import ai_handler
+from app.services.llm_dispatcher import DispatcherFull, DispatcherTimeout, LLMDispatcher
+from app.tests.utils.ai import FakeGenerativeModel
+
+
+class SlowCall:
+    """Blocking stand-in for a model call that records its peak concurrency."""
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.calls = 0
+        self.running = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, value: int) -> int:
+        with self.lock:
+            self.calls += 1
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(self.delay)
+        with self.lock:
+            self.running -= 1
+        return value
+
+
+def test_concurrency_is_capped() -> None:
+    dispatcher = LLMDispatcher(max_concurrency=3, rate=1000, burst=1000)
+    call = SlowCall()
+
+    async def run() -> list[int]:
+        return await asyncio.gather(*(dispatcher.submit(call, i) for i in range(12)))
+
+    assert asyncio.run(run()) == list(range(12))
+    assert call.peak == 3
+
+
+def test_rate_limit_spaces_out_starts() -> None:
+    dispatcher = LLMDispatcher(max_concurrency=10, rate=20, burst=1)
+    call = SlowCall(delay=0)
+
+    async def run() -> float:
+        started = time.perf_counter()
+        await asyncio.gather(*(dispatcher.submit(call, i) for i in range(6)))
+        return time.perf_counter() - started
+
+    # One token up front, then five more at 20 per second
+    assert asyncio.run(run()) >= 0.2
+
+
+def test_identical_requests_are_coalesced() -> None:
+    dispatcher = LLMDispatcher(max_concurrency=2, rate=1000, burst=1000)
+    call = SlowCall()
+
+    async def run() -> list[int]:
+        return await asyncio.gather(*(dispatcher.submit(call, 7, key="same") for _ in range(10)))
+
+    assert asyncio.run(run()) == [7] * 10
+    assert call.calls == 1
+
+
+def test_queue_is_bounded() -> None:
+    dispatcher = LLMDispatcher(max_concurrency=1, rate=1000, burst=1000, max_queue=2)
+    call = SlowCall(delay=0.1)
+
+    async def run() -> None:
+        jobs = [asyncio.ensure_future(dispatcher.submit(call, i)) for i in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(DispatcherFull):
+            await dispatcher.submit(call, 3)
+        await asyncio.gather(*jobs)
+
+    asyncio.run(run())
+
+
+def test_waiting_times_out() -> None:
+    dispatcher = LLMDispatcher(max_concurrency=1, rate=1000, burst=1000)
+    call = SlowCall(delay=0.3)
+
+    async def run() -> None:
+        with pytest.raises(DispatcherTimeout):
+            await dispatcher.submit(call, 1, timeout=0.05)
+
+    asyncio.run(run())
+
+
+def test_generate_and_stream_with_fake_model(fake_model: FakeGenerativeModel) -> None:
+    fake_model.payload = [{"task_id": "1"}, {"task_id": "2"}]
+    fake_model.chunk_delay = 0.01
+    dispatcher = LLMDispatcher(max_concurrency=2, rate=1000, burst=1000)
+    messages = [{"role": "user", "content": "Plan a party"}]
+
+    async def run() -> tuple[list, list]:
+        results = await asyncio.gather(*(
+            dispatcher.generate(messages, ai_handler.TASK_PROMPT, ai_handler.task_schema)
+            for _ in range(5)
+        ))
+        streamed = [t async for t in dispatcher.stream(ai_handler.generate_tasks_stream, messages)]
+        return results, streamed
+
+    results, streamed = asyncio.run(run())
+    assert all(r["content"] == fake_model.payload for r in results)
+    assert streamed == fake_model.payload
+    assert fake_model.calls == 1
@@ -0,0 +1,41 @@
+import asyncio
+
+from sqlmodel import Session, delete
+
+from app import crud
+from app.core.config import settings
+from app.old_models import Client, Notification, NotificationCreate, NotificationInbox
+from app.services.notifications import NotificationHub, create_notification
+
+
+def test_hub_pushes_committed_notifications_to_recipients(db: Session) -> None:
+    admin = crud.get_user_by_email(session=db, email=settings.FIRST_SUPERUSER)
+    recipient = Client(full_name="Recipient", identification="recipient")
+    bystander = Client(full_name="Bystander", identification="bystander")
+    db.add_all([recipient, bystander])
+    db.commit()
+
+    async def run() -> tuple:
+        hub = NotificationHub()
+        hub.start()
+        try:
+            mine, theirs = hub.subscribe(recipient.id), hub.subscribe(bystander.id)
+            await asyncio.sleep(0.5)  # let the listener connect
+            notification = await asyncio.to_thread(
+                create_notification, db,
+                NotificationCreate(message="your locker", target_client_id=recipient.id), admin.id,
+            )
+            pushed = await asyncio.wait_for(mine.get(), 5)
+            return notification, pushed, theirs.empty()
+        finally:
+            hub.stop()
+
+    notification, pushed, bystander_idle = asyncio.run(run())
+    assert pushed.id == notification.id and pushed.message == "your locker"
+    assert bystander_idle
+
+    db.exec(delete(NotificationInbox).where(NotificationInbox.notification_id == notification.id))
+    db.exec(delete(Notification).where(Notification.id == notification.id))
+    db.delete(recipient)
+    db.delete(bystander)
+    db.commit()
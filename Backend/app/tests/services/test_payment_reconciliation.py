@@ -0,0 +1,83 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+from sqlmodel import Session
+
+from app.old_models import PlanInstance
+from app.services.payment_reconciliation import reconcile_pending_payments
+from app.services.payment_webhooks import store_event
+from app.tests.utils.plan import create_pending_payment
+
+
+class MockGateway:
+    """In-process stand-in for the ePayco validation API, keyed on x_ref_payco."""
+
+    def __init__(self, transactions: dict[str, tuple[str, int]], latency: float = 0.005):
+        self.transactions = transactions  # ref_payco -> (invoice, response code)
+        self.latency = latency
+        self.calls = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        reference = request.url.path.rsplit("/", 1)[-1]
+        if reference not in self.transactions:
+            return httpx.Response(404, json={"success": False})
+        invoice, code = self.transactions[reference]
+        return httpx.Response(200, json={
+            "success": True,
+            "data": {
+                "x_ref_payco": reference,
+                "x_id_invoice": invoice,
+                "x_cod_response": code,
+                "x_transaction_id": f"tx-{reference}",
+            },
+        })
+
+
+def test_reconcile_pending_payments(db: Session) -> None:
+    accepted = [create_pending_payment(db, amount=30.0) for _ in range(40)]
+    rejected = [create_pending_payment(db, amount=30.0) for _ in range(10)]
+    never_notified = create_pending_payment(db, amount=30.0)
+    transactions = {}
+    # ePayco told us these were pending; the final confirmation never arrived
+    for n, (payment, code) in enumerate([(p, 1) for p in accepted] + [(p, 2) for p in rejected]):
+        ref_payco = f"{payment.id.hex[:8]}{n}"
+        store_event(db, {
+            "x_id_invoice": str(payment.id),
+            "x_ref_payco": ref_payco,
+            "x_transaction_id": f"tx-{ref_payco}",
+            "x_cod_response": "3",
+            "x_amount": "30.0",
+        })
+        transactions[ref_payco] = (str(payment.id), code)
+    gateway = MockGateway(transactions)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(gateway)) as client:
+            return await reconcile_pending_payments(
+                db,
+                client=client,
+                concurrency=10,
+                requests_per_second=1000,
+                page_size=16,
+                older_than=datetime.utcnow() + timedelta(seconds=1),
+            )
+
+    report = asyncio.run(run())
+
+    assert report.transitions.get("completed", 0) >= len(accepted)
+    assert report.transitions.get("failed", 0) >= len(rejected)
+    assert report.unmatched >= 1
+    assert report.throughput > 0
+    for payment in accepted:
+        db.refresh(payment)
+        assert payment.status == "completed"
+        assert payment.transaction_id.startswith("tx-")
+        assert db.get(PlanInstance, payment.plan_instance_id).is_active
+    for payment in rejected:
+        db.refresh(payment)
+        assert payment.status == "failed"
+    db.refresh(never_notified)
+    assert never_notified.status == "pending"
@@ -0,0 +1,69 @@
+import json
+import time
+from collections.abc import Iterator
+from types import SimpleNamespace
+from typing import Any
+
+
+def _response(text: str) -> SimpleNamespace:
+    part = SimpleNamespace(text=text)
+    candidate = SimpleNamespace(content=SimpleNamespace(parts=[part]))
+    return SimpleNamespace(text=text, candidates=[candidate])
+
+
+class FakeChat:
+    def __init__(self, model: "FakeGenerativeModel", history: list[dict[str, str]]):
+        self.model = model
+        self.history = history
+
+    def send_message(
+        self, prompt: str, generation_config: Any = None, stream: bool = False, **kwargs: Any
+    ) -> Any:
+        self.model.calls += 1
+        text = self.model.reply(prompt, self.history, generation_config)
+        if stream:
+            return self._stream(text)
+        time.sleep(self.model.chunk_delay * len(self._chunks(text)))
+        return _response(text)
+
+    def _chunks(self, text: str) -> list[str]:
+        size = self.model.chunk_size
+        return [text[i:i + size] for i in range(0, len(text), size)]
+
+    def _stream(self, text: str) -> Iterator[SimpleNamespace]:
+        for chunk in self._chunks(text):
+            time.sleep(self.model.chunk_delay)
+            yield SimpleNamespace(text=chunk)
+
+
+class FakeGenerativeModel:
+    """
+    Local stand-in for genai.GenerativeModel.
+
+    Replies with `payload` serialized as JSON when a schema is requested and
+    with a plain string otherwise, counting how often it was called. Output is
+    produced in `chunk_size` pieces, `chunk_delay` seconds apart, to mimic
+    token generation.
+    """
+
+    instances = 0
+
+    def __init__(
+        self, model_name: str, payload: Any = None, chunk_size: int = 16, chunk_delay: float = 0.0
+    ):
+        FakeGenerativeModel.instances += 1
+        self.model_name = model_name
+        self.payload = payload if payload is not None else [
+            {"type": "Text", "field": "goal", "label": "Goal", "description": "Main goal"}
+        ]
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.calls = 0
+
+    def reply(self, prompt: str, history: list[dict[str, str]], generation_config: Any) -> str:
+        if generation_config is not None:
+            return json.dumps(self.payload)
+        return f"echo: {prompt}"
+
+    def start_chat(self, history: list[dict[str, str]]) -> FakeChat:
+        return FakeChat(self, history)
@@ -0,0 +1,47 @@
+import random
+import uuid
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+
+
+class FakeEpaycoGateway:
+    """
+    Local stand-in for ePayco that sends confirmations to our webhook route.
+
+    Real gateways retry a confirmation several times and fire them in bursts,
+    so replay_burst sends every event `retries` times in shuffled order.
+    """
+
+    def __init__(self, client: TestClient, seed: int = 0):
+        self.client = client
+        self.random = random.Random(seed)
+
+    def confirmation(
+        self, payment_id: uuid.UUID, amount: float, response_code: int = 1,
+        transaction_id: str | None = None,
+    ) -> dict[str, str]:
+        return {
+            "x_id_invoice": str(payment_id),
+            "x_ref_payco": str(self.random.randint(10**7, 10**8)),
+            "x_transaction_id": transaction_id or uuid.uuid4().hex,
+            "x_cod_response": str(response_code),
+            "x_response": "Aceptada" if response_code == 1 else "Pendiente",
+            "x_amount": str(amount),
+            "x_currency_code": "COP",
+            "x_transaction_date": datetime.utcnow().isoformat(),
+        }
+
+    def send(self, event: dict[str, str]) -> dict:
+        response = self.client.post(
+            f"{settings.API_V1_STR}/payments/epayco/webhook", data=event
+        )
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    def replay_burst(self, events: list[dict[str, str]], total: int = 10_000) -> list[dict]:
+        deliveries = [events[i % len(events)] for i in range(total)]
+        self.random.shuffle(deliveries)
+        return [self.send(event) for event in deliveries]
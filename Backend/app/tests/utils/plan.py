@@ -0,0 +1,50 @@
+import uuid
+from datetime import datetime
+
+from sqlmodel import Session
+
+from app.old_models import ClientGroup, Payment, Plan, PlanInstance
+from app.tests.utils.utils import random_lower_string
+
+
+def create_random_plan(db: Session, price: float = 100.0, tags: list[str] | None = None) -> Plan:
+    plan = Plan(
+        name=random_lower_string(),
+        description=random_lower_string(),
+        price=price,
+        tags=tags or [],
+    )
+    db.add(plan)
+    db.commit()
+    db.refresh(plan)
+    return plan
+
+
+def create_pending_payment(db: Session, amount: float = 100.0) -> Payment:
+    """A credit-card purchase as left by client_plans.create_plan_instance."""
+    group = ClientGroup(name=random_lower_string())
+    plan = create_random_plan(db, price=amount)
+    db.add(group)
+    db.commit()
+    instance = PlanInstance(
+        client_group_id=group.id,
+        plan_id=plan.id,
+        start_date=datetime.utcnow(),
+        total_cost=amount,
+        is_active=False,
+    )
+    db.add(instance)
+    db.commit()
+    payment = Payment(
+        client_group_id=group.id,
+        amount=amount,
+        status="pending",
+        payment_method="credit_card",
+        transaction_id=str(uuid.uuid4()),
+        plan_id=plan.id,
+        plan_instance_id=instance.id,
+    )
+    db.add(payment)
+    db.commit()
+    db.refresh(payment)
+    return payment
@@ -1,9 +1,9 @@
 from fastapi.testclient import TestClient
-from sqlmodel import Session
+from sqlmodel import Session, select
 
 from app import crud
 from app.core.config import settings
-from app.old_models import User, UserCreate, UserUpdate
+from app.old_models import AdminUser, User, UserCreate, UserUpdate
 from app.tests.utils.utils import random_email, random_lower_string
 
 
@@ -47,3 +47,14 @@ def authentication_token_from_email(
         user = crud.update_user(session=db, db_user=user, user_in=user_in_update)
 
     return user_authentication_headers(client=client, email=email, password=password)
+
+
+def make_admin(db: Session, user: User) -> AdminUser:
+    """Give the user the AdminUser record the /admin routes require."""
+    admin = db.exec(select(AdminUser).where(AdminUser.user_id == user.id)).first()
+    if not admin:
+        admin = AdminUser(user_id=user.id)
+        db.add(admin)
+        db.commit()
+        db.refresh(admin)
+    return admin
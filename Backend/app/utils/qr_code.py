@@ -1,8 +1,10 @@
-import qrcode
 from io import BytesIO
 import base64
 
 def generate_qr_code(data: str) -> str:
+    # qrcode imports PIL; keep both out of worker startup
+    import qrcode
+
     qr = qrcode.QRCode(
         version=1,
         error_correction=qrcode.constants.ERROR_CORRECT_L,
@@ -0,0 +1,173 @@
+import sys
+import types
+import typing
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Type, Union
+
+import orjson
+from fastapi.responses import Response
+from pydantic.fields import FieldInfo
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import RelationshipDirection
+from sqlmodel import Session, SQLModel
+
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+_MISSING = object()
+
+
+class ORJSONResponse(Response):
+    """
+    JSON response encoded with orjson.
+
+    Content that is already bytes (from serialize_rows) is sent as is.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return orjson.dumps(content, option=_ORJSON_OPTIONS)
+
+
+def _schema_of(annotation: Any, module: str) -> Tuple[Optional[Type[SQLModel]], bool]:
+    # Returns (nested public schema, is_list) for Model, Optional[Model] and List[Model]
+    if isinstance(annotation, typing.ForwardRef):
+        annotation = annotation.__forward_arg__
+    if isinstance(annotation, str):
+        # e.g. List["Subscription"], resolved against the schema's module
+        annotation = getattr(sys.modules[module], annotation, None)
+    origin = typing.get_origin(annotation)
+    if origin in (Union, types.UnionType):
+        args = [a for a in typing.get_args(annotation) if a is not type(None)]
+        return _schema_of(args[0], module) if len(args) == 1 else (None, False)
+    if origin in (list, typing.List):
+        schema, _ = _schema_of(typing.get_args(annotation)[0], module)
+        return schema, True
+    if isinstance(annotation, type) and issubclass(annotation, SQLModel):
+        return annotation, False
+    return None, False
+
+
+_compiled: Dict[Type[SQLModel], Callable[[Any], Dict[str, Any]]] = {}
+
+
+def row_encoder(schema: Type[SQLModel]) -> Callable[[Any], Dict[str, Any]]:
+    """
+    Build a function turning an ORM row into a dict shaped like `schema`.
+
+    Only the fields declared on the public schema are read, nested public
+    schemas (e.g. PlanInstancePublic.plan) are followed, and values are left
+    as UUID/datetime/etc. for orjson to encode natively. Unlike response_model
+    the rows are not re-validated, so this is meant for rows already loaded
+    from the database.
+    """
+    encoder = _compiled.get(schema)
+    if encoder is not None:
+        return encoder
+
+    fields: List[Tuple[str, Optional[Callable[[Any], Any]], FieldInfo]] = []
+    for name, info in schema.model_fields.items():
+        nested, many = _schema_of(info.annotation, schema.__module__)
+        if nested is None:
+            fields.append((name, None, info))
+        elif many:
+            # Bind the nested encoder lazily so self-referencing schemas work
+            fields.append((name, lambda rows, s=nested: [row_encoder(s)(r) for r in rows or ()], info))
+        else:
+            fields.append((name, lambda row, s=nested: row_encoder(s)(row) if row is not None else None, info))
+
+    def encode(row: Any) -> Dict[str, Any]:
+        out = {}
+        for name, convert, info in fields:
+            value = getattr(row, name, _MISSING)
+            if value is _MISSING:
+                # Same as response_model for attributes the row doesn't have
+                value = None if info.is_required() else info.get_default(call_default_factory=True)
+            out[name] = convert(value) if convert else value
+        return out
+
+    _compiled[schema] = encode
+    return encode
+
+
+def serialize_rows(rows: Iterable[Any], schema: Type[SQLModel]) -> bytes:
+    """Encode ORM rows as a JSON array of `schema` objects."""
+    encode = row_encoder(schema)
+    return orjson.dumps([encode(row) for row in rows], option=_ORJSON_OPTIONS)
+
+
+def rows_response(rows: Iterable[Any], schema: Type[SQLModel]) -> ORJSONResponse:
+    return ORJSONResponse(serialize_rows(rows, schema))
+
+
+class Projection:
+    """
+    A `fields=` selection turned into a column-level SELECT.
+
+    Each field is a column of `model` that `schema` exposes, or
+    `relation.column` for a many-to-one relationship the schema nests (e.g.
+    `plan.name` on plan instances), which is fetched with an outer join.
+    Rows come back as plain tuples, so JSONB columns that weren't asked for
+    are never read and nothing goes through the ORM identity map.
+    """
+
+    def __init__(self, model: Type[SQLModel], schema: Type[SQLModel], fields: Sequence[str]):
+        mapper = sa_inspect(model)
+        self.model = model
+        self.keys: List[Tuple[str, ...]] = []
+        self.columns: List[Any] = []
+        self.joins: Dict[str, Any] = {}
+        for field in dict.fromkeys(fields):
+            name, _, nested_name = field.partition(".")
+            if name not in schema.model_fields:
+                raise ValueError(f"Unknown field: {field}")
+            if not nested_name:
+                if name not in mapper.columns:
+                    raise ValueError(f"Field can't be selected on its own: {field}")
+                self.keys.append((name,))
+                self.columns.append(getattr(model, name))
+                continue
+            relationship = mapper.relationships.get(name)
+            nested, many = _schema_of(schema.model_fields[name].annotation, schema.__module__)
+            if (
+                relationship is None or many or nested is None
+                or relationship.direction is not RelationshipDirection.MANYTOONE
+                or nested_name not in nested.model_fields
+                or nested_name not in relationship.mapper.columns
+            ):
+                raise ValueError(f"Unknown field: {field}")
+            self.joins.setdefault(name, relationship)
+            self.keys.append((name, nested_name))
+            self.columns.append(relationship.mapper.columns[nested_name])
+
+    def apply(self, statement: Any) -> Any:
+        """Swap the entity in `statement` for the selected columns, keeping filters and paging."""
+        statement = statement.with_only_columns(*self.columns, maintain_column_froms=False)
+        for relationship in self.joins.values():
+            statement = statement.join_from(
+                self.model, relationship.mapper.class_, getattr(self.model, relationship.key),
+                isouter=True,
+            )
+        return statement
+
+    def shape(self, row: Sequence[Any]) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        for key, value in zip(self.keys, row):
+            if len(key) == 1:
+                out[key[0]] = value
+            else:
+                out.setdefault(key[0], {})[key[1]] = value
+        return out
+
+
+def parse_fields(fields: str, model: Type[SQLModel], schema: Type[SQLModel]) -> Projection:
+    """Parse a comma-separated `fields=` value; raises ValueError for fields the schema doesn't offer."""
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    if not names:
+        raise ValueError("No fields given")
+    return Projection(model, schema, names)
+
+
+def projection_response(session: Session, statement: Any, projection: Projection) -> ORJSONResponse:
+    rows = session.execute(projection.apply(statement)).all()
+    return ORJSONResponse(orjson.dumps([projection.shape(r) for r in rows], option=_ORJSON_OPTIONS))
@@ -4,11 +4,10 @@ from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Any
 
-import emails  # type: ignore
 import jwt
-from jinja2 import Template
 from jwt.exceptions import InvalidTokenError
 
+from app.core import tracing
 from app.core.config import settings
 
 
@@ -22,6 +21,8 @@ def render_email_template(*, template_name: str, context: dict[str, Any]) -> str
     template_str = (
         Path(__file__).parent / "email-templates" / "build" / template_name
     ).read_text()
+    from jinja2 import Template
+
     html_content = Template(template_str).render(context)
     return html_content
 
@@ -33,6 +34,9 @@ def send_email(
     html_content: str = "",
 ) -> None:
     assert settings.emails_enabled, "no provided configuration for email variables"
+    # emails and its dependencies are only needed by the few routes that send mail
+    import emails  # type: ignore
+
     message = emails.Message(
         subject=subject,
         html=html_content,
@@ -47,7 +51,11 @@ def send_email(
         smtp_options["user"] = settings.SMTP_USER
     if settings.SMTP_PASSWORD:
         smtp_options["password"] = settings.SMTP_PASSWORD
-    response = message.send(to=email_to, smtp=smtp_options)
+    with tracing.span(
+        "smtp.send", {"smtp.host": settings.SMTP_HOST, "smtp.port": settings.SMTP_PORT}
+    ) as current:
+        response = message.send(to=email_to, smtp=smtp_options)
+        current.set_attribute("smtp.status_code", response.status_code or 0)
     logging.info(f"send email result: {response}")
 
 
@@ -1,5 +1,11 @@
 #! /usr/bin/env bash
 
+# Start every deploy with empty Prometheus multiprocess files
+if [ -n "$PROMETHEUS_MULTIPROC_DIR" ]; then
+    rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+    mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+fi
+
 # Let the DB start
 python /app/app/backend_pre_start.py
 